@@ -1,6 +1,6 @@
 import json
 import os
-from pathlib import Path
+import threading
 
 # Default configuration
 DEFAULT_CONFIG = {
@@ -9,26 +9,61 @@ DEFAULT_CONFIG = {
     "max_retries": 3,
     "timeout": 30,
     "ffmpeg_path": None,
-    "yt_dlp_path": None
+    "yt_dlp_path": None,
+    "use_download_archive": True,
+    "batch_jobs": 1,  # 'tud batch' es secuencial salvo --jobs
+    "parallel_jobs": 3,
+    "ytdlp_worker_pool": True,
+    "ytdlp_job_timeout": 600,  # s sin salida antes de descartar un trabajador (0 = sin límite)
+    "output_buffer_lines": 200,
+    "metadata_cache_ttl": 10800,
+    "metadata_cache_max_mb": 50,
+    "log_max_bytes": 5 * 1024 * 1024,
+    "log_backup_count": 5,
+    "log_max_message_chars": 8000,
+    "collect_metrics": True,
+    "media_probe_workers": 0,  # 0 = según los núcleos (máx. 4)
+    "verify_downloads": True,
+    "verify_workers": 2,
+    "batch_pipeline": False,
+    "pipeline_cpu_workers": 0,  # 0 = número de núcleos
+    "pipeline_queue_size": 2
 }
 
 CONFIG_FILE = os.path.join(os.path.expanduser("~/.termux_ultra_downloader"), "config.json")
 
 
+# Process-wide cache of the parsed config file. It is re-read only when the
+# file's modification time or size changes on disk.
+_cache = {"config": None, "stamp": None}
+_cache_lock = threading.Lock()
+
+
 def ensure_config_dir():
     """Ensure the config directory exists."""
     config_dir = os.path.dirname(CONFIG_FILE)
     os.makedirs(config_dir, exist_ok=True)
 
 
-def load_config():
-    """Load configuration from file, creating default if needed."""
+def _file_stamp():
+    """Return (mtime_ns, size) of the config file, or None if it is missing."""
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _read_config():
+    """Read the config file and merge it with the defaults."""
     ensure_config_dir()
-    
-    # Set default download path dynamically
-    from .settings import get_default_downloads_path
-    DEFAULT_CONFIG["default_download_path"] = get_default_downloads_path()
-    
+
+    # Set default download path dynamically (probes the filesystem, so only
+    # once per process)
+    if DEFAULT_CONFIG["default_download_path"] is None:
+        from .settings import get_default_downloads_path
+        DEFAULT_CONFIG["default_download_path"] = get_default_downloads_path()
+
     if os.path.exists(CONFIG_FILE):
         try:
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
@@ -47,22 +82,50 @@ def load_config():
         return DEFAULT_CONFIG.copy()
 
 
+def _cached_config():
+    """Return the cached config dict, reloading it if the file changed."""
+    stamp = _file_stamp()
+    with _cache_lock:
+        if _cache["config"] is not None and stamp is not None and stamp == _cache["stamp"]:
+            return _cache["config"]
+    config = _read_config()
+    with _cache_lock:
+        _cache["config"] = config
+        _cache["stamp"] = _file_stamp()
+    return config
+
+
+def load_config():
+    """Load configuration, re-reading the file only when it changed on disk."""
+    return dict(_cached_config())
+
+
+def reload_config():
+    """Drop the cached config so the next access reads the file again."""
+    with _cache_lock:
+        _cache["config"] = None
+        _cache["stamp"] = None
+    DEFAULT_CONFIG["default_download_path"] = None
+
+
 def save_config(config):
     """Save configuration to file."""
     ensure_config_dir()
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=4, ensure_ascii=False)
-        return True
     except IOError as e:
         print(f"Error saving config: {e}")
         return False
+    with _cache_lock:
+        _cache["config"] = dict(config)
+        _cache["stamp"] = _file_stamp()
+    return True
 
 
 def get_config_value(key, default=None):
     """Get a specific configuration value."""
-    config = load_config()
-    return config.get(key, default)
+    return _cached_config().get(key, default)
 
 
 def set_config_value(key, value):
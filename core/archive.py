@@ -0,0 +1,255 @@
+import bisect
+import hashlib
+import os
+import threading
+from array import array
+
+from config.config_manager import CONFIG_FILE, ensure_config_dir
+
+from .canonical import canonical_key
+
+# Archivos de descargas completadas en el formato de '--download-archive' de
+# yt-dlp ("<extractor> <id>" por línea). Video y audio usan archivos distintos
+# para que descargar el audio de un video ya bajado no se considere repetido.
+ARCHIVE_DIR = os.path.dirname(CONFIG_FILE)
+
+# Prefijos de get_video_filename -> clave de extractor de yt-dlp
+EXTRACTOR_KEYS = {
+    "youtube": "youtube",
+    "tiktok": "tiktok",
+    "instagram": "instagram",
+    "twitter": "twitter",
+    "facebook": "facebook",
+}
+
+# Cuántas entradas nuevas se acumulan en el set antes de fusionarlas al array
+_MERGE_THRESHOLD = 4096
+
+
+def _digest(entry):
+    """Huella de 64 bits de una entrada del archivo."""
+    return int.from_bytes(
+        hashlib.blake2b(entry.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _normalize_entry(line):
+    """Normaliza una línea del archivo de yt-dlp ('Extractor  id' -> 'extractor id')."""
+    parts = line.strip().split(None, 1)
+    if len(parts) != 2:
+        return None
+    return f"{parts[0].lower()} {parts[1].strip()}"
+
+
+def archive_id_for_url(url):
+    """
+    Retorna la entrada de archivo ('youtube dQw4w9WgXcQ') que yt-dlp registraría
+    para la URL, o None si el ID no puede deducirse sin extraer la página.
+    """
+    _, media_id = canonical_key(url)
+    prefix, _, video_id = media_id.partition("_")
+    extractor = EXTRACTOR_KEYS.get(prefix)
+    if not extractor or not video_id:
+        return None
+    return f"{extractor} {video_id}"
+
+
+class DownloadArchive:
+    """
+    Índice en memoria de un archivo de descargas de yt-dlp.
+
+    Guarda una huella de 64 bits por entrada en un array ordenado (8 bytes por
+    entrada, búsqueda binaria) más un set pequeño con las entradas añadidas
+    recientemente. El archivo se relee de forma incremental cuando crece, así
+    que las líneas que yt-dlp añade tras cada descarga se ven sin recargarlo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._sorted = array("Q")
+        self._recent = set()
+        self._offset = 0
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        self._refresh()
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, entry):
+        entry = _normalize_entry(entry)
+        if entry is None:
+            return False
+        self._refresh()
+        digest = _digest(entry)
+        return digest in self._recent or self._in_sorted(digest)
+
+    def _in_sorted(self, digest):
+        index = bisect.bisect_left(self._sorted, digest)
+        return index < len(self._sorted) and self._sorted[index] == digest
+
+    def _refresh(self):
+        """Relee el archivo si cambió desde la última lectura."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino) if stat else None
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            if stat is None or stat.st_size < self._offset or (
+                self._signature and stat.st_ino != self._signature[2]
+            ):
+                # Archivo borrado, truncado o reemplazado: carga completa.
+                self._sorted = array("Q")
+                self._recent = set()
+                self._offset = 0
+            if stat is not None:
+                self._read_from_offset()
+            self._signature = signature
+
+    def _read_from_offset(self):
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Solo se consumen líneas completas; una escritura a medias se
+        # leerá en la siguiente actualización.
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        digests = set()
+        for raw in data[:end].decode("utf-8", errors="replace").splitlines():
+            entry = _normalize_entry(raw)
+            if entry:
+                digests.add(_digest(entry))
+        if not self._sorted and len(digests) > _MERGE_THRESHOLD:
+            self._sorted = array("Q", sorted(digests))
+            return
+        self._recent.update(d for d in digests if not self._in_sorted(d))
+        if len(self._recent) > _MERGE_THRESHOLD:
+            self._sorted = array("Q", sorted(set(self._sorted) | self._recent))
+            self._recent = set()
+
+    def add(self, entry):
+        """Añade una entrada al archivo (si no estaba ya)."""
+        entry = _normalize_entry(entry)
+        if entry is None or entry in self:
+            return False
+        ensure_config_dir()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(entry + "\n")
+        return True
+
+    def remove(self, entry):
+        """
+        Quita una entrada del archivo (p. ej. un archivo descargado que resultó
+        corrupto, para que la siguiente ejecución lo vuelva a descargar).
+
+        El archivo se reescribe en un temporal y se reemplaza de forma atómica.
+        Si yt-dlp añadió líneas mientras tanto, se vuelve a leer y se reintenta
+        para no perderlas.
+
+        Returns:
+            bool: True si la entrada estaba en el archivo
+        """
+        entry = _normalize_entry(entry)
+        if entry is None or not os.path.exists(self.path):
+            return False
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            try:
+                for _ in range(5):
+                    with open(self.path, "rb") as f:
+                        data = f.read()
+                    lines = data.decode("utf-8", errors="replace").splitlines()
+                    kept = [line for line in lines if _normalize_entry(line) != entry]
+                    if len(kept) == len(lines):
+                        return False
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write("".join(line + "\n" for line in kept))
+                    if os.path.getsize(self.path) == len(data):
+                        os.replace(tmp_path, self.path)
+                        break
+                else:
+                    return False
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            # El archivo es otro (inodo nuevo): la próxima consulta lo recarga.
+            self._sorted = array("Q")
+            self._recent = set()
+            self._offset = 0
+            self._signature = None
+        return True
+
+    def import_file(self, source):
+        """
+        Importa las entradas de un archivo '--download-archive' de yt-dlp.
+
+        Returns:
+            int: Número de entradas nuevas añadidas
+        """
+        new_entries = []
+        seen = set()
+        with open(source, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                entry = _normalize_entry(line)
+                if entry and entry not in seen and entry not in self:
+                    seen.add(entry)
+                    new_entries.append(entry)
+        if new_entries:
+            ensure_config_dir()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(new_entries) + "\n")
+        return len(new_entries)
+
+    def export_file(self, destination):
+        """
+        Exporta el archivo sin duplicados, listo para '--download-archive'.
+
+        Returns:
+            int: Número de entradas exportadas
+        """
+        seen = set()
+        lines = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    entry = _normalize_entry(line)
+                    if entry and entry not in seen:
+                        seen.add(entry)
+                        lines.append(entry)
+        with open(destination, "w", encoding="utf-8") as f:
+            f.write("".join(entry + "\n" for entry in lines))
+        return len(lines)
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive_path(media_type):
+    """Ruta del archivo de descargas para 'video' o 'audio'."""
+    return os.path.join(ARCHIVE_DIR, f"download_archive_{media_type}.txt")
+
+
+def get_archive(media_type):
+    """Retorna el DownloadArchive compartido para 'video' o 'audio'."""
+    with _archives_lock:
+        if media_type not in _archives:
+            _archives[media_type] = DownloadArchive(get_archive_path(media_type))
+        return _archives[media_type]
+
+
+def forget(url, media_type):
+    """Quita la URL del archivo de descargas del tipo de media. Retorna True si estaba."""
+    entry = archive_id_for_url(url)
+    return entry is not None and get_archive(media_type).remove(entry)
+
+
+def is_downloaded(url, media_type):
+    """True si la URL ya figura en el archivo de descargas del tipo de media."""
+    entry = archive_id_for_url(url)
+    return entry is not None and entry in get_archive(media_type)
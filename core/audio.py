@@ -1,10 +1,13 @@
 import os
 import subprocess
+import tempfile
 
+from config.config_manager import get_config_value
 from utils.colors import Colors
 from utils.logger import log_message
 from utils.path_manager import create_directories
 
+from . import archive, audio_planner, metadata_cache, metrics, progress
 from .downloader import run_yt_dlp
 from .platforms import get_platform_name
 
@@ -18,6 +21,7 @@ def download_audio(
     verbose,
     cookies_file,
     dry_run=False,
+    use_archive=True,
 ):
     """
     Función para descargar audio desde YouTube.
@@ -31,11 +35,36 @@ def download_audio(
         verbose (bool): Mostrar información detallada
         cookies_file (str): Ruta al archivo de cookies
         dry_run (bool): Modo de prueba sin descargar realmente
+        use_archive (bool): Omitir las URLs ya registradas en el archivo de descargas
 
     Returns:
-        bool: True si la descarga fue exitosa, False en caso contrario
+        str | bool: Ruta exacta del archivo final si la descarga fue exitosa
+                    (True si no se generó un archivo nuevo, p. ej. en dry-run
+                    o playlists), False en caso contrario
     """
+    # Todos los intentos de esta descarga comparten el id de trabajo y un
+    # único registro de métricas (core.metrics).
+    job_id = progress.new_job_id()
+    job = metrics.start_job(job_id, url, "audio", get_platform_name(url))
+    result = False
+    try:
+        result = _download_audio(
+            job_id, job, url, output_path, format, bitrate, is_playlist, verbose,
+            cookies_file, dry_run, use_archive,
+        )
+        return result
+    finally:
+        if job:
+            job.finish(result)
+
+
+def _download_audio(
+    job_id, job, url, output_path, format, bitrate, is_playlist, verbose,
+    cookies_file, dry_run, use_archive,
+):
     platform = get_platform_name(url)
+    if job:
+        job.formats = format
 
     # Security validation: Check if output_path is safe to prevent directory traversal
     from .downloader import is_safe_path
@@ -47,6 +76,17 @@ def download_audio(
                 Colors.RESET}")
         return False
 
+    use_archive = use_archive and get_config_value("use_download_archive", True)
+    if use_archive and not is_playlist and archive.is_downloaded(url, "audio"):
+        print(
+            f"{Colors.GREEN}Audio ya descargado anteriormente (archivo de descargas). "
+            f"Se omite: {url}{Colors.RESET}"
+        )
+        log_message("Omitido: ya está en el archivo de descargas.", "INFO", url, platform)
+        if job:
+            job.status = "skipped"
+        return True
+
     if output_path == "/storage/emulated/0/Download" or output_path == "/data/data/com.termux/files/home/downloads":
         base_output_dir = output_path
     else:
@@ -71,6 +111,9 @@ def download_audio(
         "-o", output_template,
     ]
 
+    if use_archive and not dry_run:
+        base_args.extend(["--download-archive", archive.get_archive_path("audio")])
+
     if not is_playlist:
         base_args.append("--no-playlist")
     else:
@@ -80,19 +123,62 @@ def download_audio(
             f"{Colors.RESET}"
         )
 
+    # Metadatos compartidos con otras descargas del mismo medio
+    info, info_json = None, None
+    if not is_playlist:
+        with metrics.phase(job, "extract"):
+            info, info_json = metadata_cache.get_info(
+                url, verbose=verbose, cookies_file=cookies_file
+            )
+
+    # Pista de audio que evita recodificar cuando el formato pedido lo permite
+    # (yt-dlp solo copia el stream si ya tiene el códec de destino).
+    plan = audio_planner.plan_audio(info, format) if info else None
+    if plan:
+        base_args.extend(["-f", plan["selector"]])
+        print(
+            f"{Colors.CYAN}Audio elegido: "
+            f"{audio_planner.describe_plan(plan, format)}{Colors.RESET}"
+        )
+        if job:
+            job.audio_action = plan["action"]
+            job.media_duration = info.get("duration")
+
+    format_file = None
+    if plan and not dry_run:
+        # Formato realmente descargado: si el del plan ya no existía, yt-dlp
+        # tomó el de respaldo y la operación pudo ser otra.
+        fd, format_file = tempfile.mkstemp(prefix="tud-format-", suffix=".txt")
+        os.close(fd)
+        base_args.extend(["--print-to-file", "after_move:%(format_id)s", format_file])
+
     try:
-        run_yt_dlp(
+        process = run_yt_dlp(
             args=base_args,
             url=url,
             platform=platform,
             verbose=verbose,
             cookies_file=cookies_file,
             dry_run=dry_run,
+            stream=True,
+            job_id=job_id,
+            info_json=info_json,
+            report_paths=not is_playlist,
         )
         print(f"{Colors.GREEN}Descarga de audio exitosa.{Colors.RESET}")
+        action = _downloaded_action(format_file, info, format)
+        if action:
+            if job:
+                job.audio_action = action
+            audio_planner.record(plan, info.get("duration"), action)
+        if not is_playlist and process.filepaths:
+            print(f"{Colors.GREEN}[+] Archivo final: {process.filepaths[-1]}{Colors.RESET}")
+            return process.filepaths[-1]
         return True
     except subprocess.CalledProcessError as e:
         print(f"{Colors.RED}Error en la descarga de audio: {e}{Colors.RESET}")
+        # Los enlaces de formato guardados pueden haber caducado.
+        metadata_cache.invalidate(url)
         log_message(f"Error en la descarga de audio: {e}", "ERROR", url, platform)
         return False
     except Exception as e:
@@ -103,3 +189,27 @@ def download_audio(
             url,
             platform)
         return False
+    finally:
+        if format_file:
+            try:
+                os.remove(format_file)
+            except OSError:
+                pass
+
+
+def _downloaded_action(format_file, info, target):
+    """
+    Operación (core.audio_planner) que correspondió al formato que yt-dlp
+    escribió en format_file. None si no se descargó nada; TRANSCODE si el
+    formato no figura en los metadatos.
+    """
+    if not format_file:
+        return None
+    try:
+        with open(format_file, encoding="utf-8") as f:
+            format_ids = [line.strip() for line in f if line.strip()]
+    except OSError:
+        return None
+    if not format_ids:
+        return None
+    return audio_planner.downloaded_action(info, format_ids[-1], target) or audio_planner.TRANSCODE
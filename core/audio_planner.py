@@ -0,0 +1,234 @@
+import threading
+
+from utils.colors import Colors
+
+from . import metrics
+from .format_planner import has_video
+
+# Decide, a partir de la lista de formatos ya extraída, qué pista de audio
+# descargar para el formato pedido y si hace falta recodificarla. Si alguna
+# pista ya tiene el códec de destino (AAC para m4a, Opus para opus...) y su
+# calidad es comparable a la mejor, se elige esa: yt-dlp/ffmpeg solo copian
+# el stream ('copy') o lo cambian de contenedor ('remux'), sin pasar por el
+# codificador. Solo se recodifica ('transcode') cuando el destino lo exige.
+
+COPY = "copy"
+REMUX = "remux"
+TRANSCODE = "transcode"
+
+# Formato pedido -> (códec que puede conservarse, extensión del archivo final).
+# 'best' conserva el códec de la pista elegida.
+TARGETS = {
+    "m4a": ("aac", "m4a"),
+    "aac": ("aac", "aac"),
+    "mp3": ("mp3", "mp3"),
+    "opus": ("opus", "opus"),
+    "vorbis": ("vorbis", "ogg"),
+    "ogg": ("vorbis", "ogg"),
+    "flac": ("flac", "flac"),
+    "alac": ("alac", "m4a"),
+    "wav": ("pcm", "wav"),
+}
+
+# Extensión natural de cada códec cuando el destino es 'best'
+CODEC_EXTENSIONS = {
+    "aac": "m4a", "mp3": "mp3", "opus": "opus", "vorbis": "ogg",
+    "flac": "flac", "alac": "m4a", "pcm": "wav",
+}
+
+# Una pista con el códec de destino se prefiere a la mejor si tiene al menos
+# esta fracción de su bitrate (p. ej. AAC 128k frente a Opus 160k): recodificar
+# la mejor pista a ese códec no daría más calidad que copiar la compatible.
+COMPATIBLE_BITRATE_RATIO = 0.75
+
+# Segundos de CPU por segundo de audio recodificado si no hay historial
+DEFAULT_TRANSCODE_COST = 0.03
+
+_tally = {COPY: 0, REMUX: 0, TRANSCODE: 0, "avoided": 0, "avoided_seconds": 0.0}
+_tally_lock = threading.Lock()
+
+
+def normalize_codec(acodec):
+    """'mp4a.40.2' -> 'aac', 'pcm_s16le' -> 'pcm', 'none' -> None."""
+    codec = (acodec or "none").lower().split(".")[0]
+    if codec in ("none", ""):
+        return None
+    if codec in ("mp4a", "aac"):
+        return "aac"
+    if codec.startswith("pcm"):
+        return "pcm"
+    if codec in ("mp3", "mp2", "mp1"):
+        return codec
+    if codec == "ogg":
+        return "vorbis"
+    return codec
+
+
+def _bitrate(fmt):
+    value = fmt.get("abr") or fmt.get("tbr")
+    return value if isinstance(value, (int, float)) else 0
+
+
+def target_of(target, codec=None, default_ext="m4a"):
+    """
+    (códec, extensión) que exige el formato pedido. Con 'best' se conserva
+    codec, el de la pista de origen, con su extensión natural (o default_ext).
+    """
+    target = (target or "best").lower()
+    if target == "best":
+        return codec, CODEC_EXTENSIONS.get(codec, default_ext)
+    return TARGETS.get(target, (None, target))
+
+
+def action_for(codec, target, source_ext=None, with_video=False):
+    """
+    Operación necesaria para llevar al formato pedido un archivo cuyo códec
+    real es codec (ver normalize_codec): COPY, REMUX o TRANSCODE.
+    """
+    target_codec, target_ext = target_of(target, codec, source_ext or "m4a")
+    if not codec or codec != target_codec:
+        return TRANSCODE
+    if source_ext == target_ext and not with_video:
+        return COPY
+    return REMUX
+
+
+def plan_audio(info, target):
+    """
+    Elige la pista de audio y la operación necesaria para el formato pedido.
+
+    Args:
+        info (dict): Info JSON extraído por yt-dlp
+        target (str): Formato de audio_format_map ('mp3', 'm4a', ..., 'best')
+
+    Returns:
+        dict: 'format' (dict de formato), 'codec' (códec de origen), 'action'
+              (COPY, REMUX o TRANSCODE), 'ext' (extensión final), 'selector'
+              (ID concreto con 'bestaudio/best' de respaldo) y 'avoided' (True
+              si elegir esta pista evita una recodificación); None si no hay
+              pistas de audio en los metadatos
+    """
+    formats = [
+        f for f in (info or {}).get("formats") or []
+        if f.get("format_id") and normalize_codec(f.get("acodec"))
+    ]
+    if not formats:
+        return None
+    # Pistas solo de audio; si la plataforma no las ofrece, los combinados.
+    candidates = [f for f in formats if not has_video(f)] or formats
+    best = max(candidates, key=_bitrate)
+
+    target = (target or "best").lower()
+    target_codec, target_ext = target_of(
+        target, normalize_codec(best.get("acodec")), best.get("ext") or "m4a"
+    )
+    chosen = best
+    if target != "best" and target_codec:
+        compatible = [f for f in candidates if normalize_codec(f.get("acodec")) == target_codec]
+        if compatible:
+            best_compatible = max(compatible, key=_bitrate)
+            if _bitrate(best_compatible) >= COMPATIBLE_BITRATE_RATIO * _bitrate(best):
+                chosen = best_compatible
+
+    codec = normalize_codec(chosen.get("acodec"))
+    action = action_for(codec, target, chosen.get("ext"), has_video(chosen))
+    return {
+        "format": chosen,
+        "codec": codec,
+        "action": action,
+        "ext": target_ext,
+        "selector": f"{chosen['format_id']}/bestaudio/best",
+        # Sin el plan, yt-dlp habría tomado la pista 'best' y la habría
+        # recodificado.
+        "avoided": action != TRANSCODE and normalize_codec(best.get("acodec")) != target_codec,
+    }
+
+
+def downloaded_action(info, format_id, target):
+    """
+    Operación que corresponde a la pista que yt-dlp descargó realmente
+    (format_id), que puede no ser la del plan si ese formato ya no estaba
+    disponible. None si el formato no figura en los metadatos.
+    """
+    for fmt in (info or {}).get("formats") or []:
+        if fmt.get("format_id") == format_id:
+            return action_for(
+                normalize_codec(fmt.get("acodec")), target, fmt.get("ext"), has_video(fmt)
+            )
+    return None
+
+
+def describe_plan(plan, target):
+    """Texto corto con la pista elegida y la operación, para mostrar al usuario."""
+    fmt = plan["format"]
+    bitrate = f" {round(_bitrate(fmt))}k" if _bitrate(fmt) else ""
+    action = {
+        COPY: "copia directa",
+        REMUX: "cambio de contenedor, sin recodificar",
+        TRANSCODE: "recodificación",
+    }[plan["action"]]
+    return f"{fmt['format_id']} {plan['codec']}{bitrate} -> {target} ({action})"
+
+
+def record(plan, duration=None, action=None):
+    """
+    Cuenta la operación realmente ejecutada (action; por defecto la del plan)
+    para el informe del batch. Solo cuenta como evitada una recodificación
+    si el plan la evitaba y el archivo descargado no la necesitó.
+    """
+    if not plan:
+        return
+    action = action or plan["action"]
+    with _tally_lock:
+        _tally[action] += 1
+        if plan["avoided"] and action != TRANSCODE:
+            _tally["avoided"] += 1
+            _tally["avoided_seconds"] += duration or 0
+
+
+def snapshot():
+    """Copia de los contadores actuales (para restar al final de un batch)."""
+    with _tally_lock:
+        return dict(_tally)
+
+
+def estimate_transcode_cost(path=None):
+    """
+    Segundos de CPU por segundo de audio recodificado, según la mediana de
+    las recodificaciones registradas en las métricas (core.metrics); si no
+    hay, DEFAULT_TRANSCODE_COST.
+    """
+    ratios = []
+    for entry in metrics.read_records(path):
+        if entry.get("audio_action") != TRANSCODE or not entry.get("media_duration"):
+            continue
+        phases = entry.get("phases") or {}
+        # 'transcode' en el modo pipeline; 'postprocess' cuando convierte yt-dlp
+        seconds = phases.get("transcode") or phases.get("postprocess")
+        if seconds:
+            ratios.append(seconds / entry["media_duration"])
+    if not ratios:
+        return DEFAULT_TRANSCODE_COST
+    ratios.sort()
+    return ratios[len(ratios) // 2]
+
+
+def print_report(since):
+    """
+    Imprime cuántas recodificaciones se evitaron desde el snapshot 'since' y
+    el tiempo de CPU ahorrado aproximado.
+    """
+    now = snapshot()
+    counts = {key: now[key] - since.get(key, 0) for key in now}
+    planned = counts[COPY] + counts[REMUX] + counts[TRANSCODE]
+    if not planned:
+        return
+    saved = counts["avoided_seconds"] * estimate_transcode_cost()
+    print(
+        f"  {Colors.CYAN}Audio: {counts[TRANSCODE]} recodificados, {counts[COPY]} "
+        f"copiados y {counts[REMUX]} cambiados de contenedor de {planned}.{Colors.RESET}"
+    )
+    print(
+        f"  {Colors.CYAN}Recodificaciones evitadas: {counts['avoided']} "
+        f"(~{saved:.0f}s de CPU ahorrados).{Colors.RESET}"
+    )
@@ -1,6 +1,10 @@
+from config.config_manager import get_config_value
 from config.settings import get_audio_format_map, get_video_quality_map
+from core import archive, audio_planner, ledger, metadata_cache, pipeline, stats, verifier
 from core.audio import download_audio
+from core.canonical import dedupe_urls
 from core.video import download_video
+from core.workers import run_jobs
 from utils.colors import Colors
 from utils.logger import log_message
 from utils.path_manager import create_directories
@@ -14,8 +18,25 @@ def process_batch_download(
     verbose,
     cookies_file,
     dry_run=False,
+    jobs=None,
+    resume=True,
+    use_pipeline=None,
 ):
-    """Descarga masiva desde un archivo de texto."""
+    """
+    Descarga masiva desde un archivo de texto.
+
+    Con jobs > 1 las URLs se descargan en paralelo mediante un pool acotado
+    de trabajadores; la salida de cada descarga se muestra agrupada al terminar.
+    Sin jobs se usa el valor 'batch_jobs' de la configuración (1: secuencial).
+    Retorna la lista de resultados por URL (ver core.workers.run_jobs).
+
+    Con resume=True el progreso se guarda en el ledger persistente
+    (core.ledger): al volver a ejecutar el mismo archivo solo se procesan las
+    URLs que no terminaron, incluidas las líneas añadidas después.
+
+    Con use_pipeline=True (o 'batch_pipeline' en la configuración) la descarga
+    y el trabajo de ffmpeg se separan en dos etapas (core.pipeline).
+    """
     try:
         # Asegurarse de que el directorio de salida exista
         create_directories(output_path)
@@ -41,6 +62,13 @@ def process_batch_download(
         f"{Colors.GREEN}Se encontraron {len(urls)} URLs en el archivo."
         f"{Colors.RESET}"
     )
+    urls, duplicates = dedupe_urls(urls)
+    if duplicates:
+        print(
+            f"{Colors.CYAN}Se descartaron {duplicates} URLs duplicadas "
+            f"(mismo video pegado de distintas formas).{Colors.RESET}"
+        )
+        log_message(f"Batch: {duplicates} URLs duplicadas descartadas.")
     log_message(
         f"Iniciando descarga masiva de {len(urls)} URLs desde " f"'{file_path}'."
     )
@@ -67,13 +95,81 @@ def process_batch_download(
             )
             return
 
-    for i, url in enumerate(urls, 1):
-        print(
-            f"\n{Colors.BOLD}{Colors.MAGENTA}Procesando URL {i}/{len(urls)}: "
-            f"{url}{Colors.RESET}"
+    use_ledger = resume and not dry_run
+    if use_ledger:
+        pending = ledger.register_batch(file_path, media_type, urls)
+        skipped = len(urls) - len(pending)
+        if skipped:
+            print(
+                f"{Colors.CYAN}Reanudando lote: {skipped} URLs ya completadas "
+                f"se omiten, quedan {len(pending)}.{Colors.RESET}"
+            )
+            log_message(
+                f"Reanudando lote '{file_path}': {skipped} completadas, "
+                f"{len(pending)} pendientes."
+            )
+        urls = pending
+        if not urls:
+            print(
+                f"{Colors.GREEN}Todas las URLs de este archivo ya fueron "
+                f"descargadas.{Colors.RESET}"
+            )
+            return []
+
+    # Cada archivo terminado pasa al pool de verificación mientras siguen
+    # las descargas; el resultado queda en el ledger y en el resumen.
+    verification = None
+    if not dry_run and get_config_value("verify_downloads", True):
+        if verifier.ffprobe_available():
+            verification = verifier.VerificationPool(
+                on_result=_record_verification(file_path, media_type, use_ledger)
+            )
+        else:
+            log_message("ffprobe no encontrado: se omite la verificación del batch.", "WARNING")
+
+    def verify(url, result):
+        if verification and isinstance(result, str):
+            info, _ = metadata_cache.lookup(url)
+            expected = info.get("duration") if info else None
+            verification.submit(result, media_type, expected, key=url)
+
+    def finish_one(url, result, error=None):
+        if use_ledger:
+            if error is not None:
+                ledger.mark_failed(file_path, media_type, url, error=str(error))
+            elif result:
+                output_file = result if isinstance(result, str) else None
+                ledger.mark_done(file_path, media_type, url, output_path=output_file)
+            else:
+                ledger.mark_failed(file_path, media_type, url)
+        if error is None and result:
+            verify(url, result)
+
+    def download_one(url):
+        if use_ledger:
+            ledger.mark_running(file_path, media_type, url)
+        try:
+            result = _download(url)
+        except Exception as e:
+            finish_one(url, None, e)
+            raise
+        finish_one(url, result)
+        return result
+
+    def fetch_one(url):
+        if use_ledger:
+            ledger.mark_running(file_path, media_type, url)
+        if media_type == "video":
+            return pipeline.fetch_video(
+                url, config_option, output_path, cookies_file=cookies_file, verbose=verbose
+            )
+        return pipeline.fetch_audio(
+            url, output_path, config_option, "best", cookies_file=cookies_file, verbose=verbose
         )
+
+    def _download(url):
         if media_type == "video":
-            download_video(
+            return download_video(
                 url,
                 quality=config_option,
                 output_path=output_path,
@@ -82,14 +178,87 @@ def process_batch_download(
                 cookies_file=cookies_file,
                 dry_run=dry_run,
             )
-        elif media_type == "audio":
-            download_audio(
-                url,
-                output_path=output_path,
-                format=config_option,
-                bitrate="best",
-                is_playlist=False,
-                verbose=verbose,
-                cookies_file=cookies_file,
-                dry_run=dry_run,
+        return download_audio(
+            url,
+            output_path=output_path,
+            format=config_option,
+            bitrate="best",
+            is_playlist=False,
+            verbose=verbose,
+            cookies_file=cookies_file,
+            dry_run=dry_run,
+        )
+
+    jobs = max(1, int(jobs or get_config_value("batch_jobs", 1)))
+    if jobs > 1:
+        print(
+            f"{Colors.CYAN}Procesando con {jobs} descargas simultáneas."
+            f"{Colors.RESET}"
+        )
+    stats.print_batch_eta(urls, media_type, jobs)
+    audio_plans = audio_planner.snapshot()
+
+    if use_pipeline is None:
+        use_pipeline = get_config_value("batch_pipeline", False)
+    if use_pipeline and not dry_run:
+        print(
+            f"{Colors.CYAN}Modo pipeline: {jobs} descargas y hasta "
+            f"{pipeline.default_cpu_workers()} conversiones/fusiones simultáneas.{Colors.RESET}"
+        )
+        results = pipeline.run_pipeline(
+            urls,
+            fetch_one,
+            pipeline.process_video if media_type == "video" else pipeline.process_audio,
+            network_workers=jobs,
+            describe=lambda url: f"Procesando URL: {url}",
+            on_result=finish_one,
+        )
+    else:
+        results = run_jobs(
+            download_one,
+            urls,
+            max_workers=jobs,
+            describe=lambda url: f"Procesando URL: {url}",
+        )
+    reports = None
+    if verification:
+        reports = verification.wait()
+    print_batch_summary(results, reports)
+    if media_type == "audio":
+        audio_planner.print_report(audio_plans)
+    return results
+
+
+def _record_verification(file_path, media_type, use_ledger=True):
+    """
+    Callback del pool de verificación. Un archivo corrupto se aparta y su URL
+    sale del archivo de descargas; con el ledger, además, la entrada queda
+    'failed' para que el siguiente batch la descargue de nuevo.
+    """
+    def record(report):
+        if report["status"] == verifier.CORRUPT:
+            verifier.quarantine(report["path"])
+            archive.forget(report["key"], media_type)
+        if use_ledger:
+            ledger.mark_verification(
+                file_path, media_type, report["key"], report["status"],
+                detail="; ".join(report["problems"]) or None,
             )
+    return record
+
+
+def print_batch_summary(results, verification=None):
+    """Imprime el resumen final de una descarga masiva."""
+    failed = [r for r in results if r["error"] is not None or not r["result"]]
+    succeeded = len(results) - len(failed)
+
+    print(f"\n{Colors.BOLD}{Colors.CYAN}Resumen de la descarga masiva:{Colors.RESET}")
+    print(f"  {Colors.GREEN}Exitosas: {succeeded}{Colors.RESET}")
+    print(f"  {Colors.RED}Fallidas: {len(failed)}{Colors.RESET}")
+    for r in failed:
+        print(f"    - {r['item']}")
+    if verification:
+        verifier.print_verification_summary(verification)
+    log_message(
+        f"Descarga masiva finalizada: {succeeded} exitosas, {len(failed)} fallidas."
+    )
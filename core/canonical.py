@@ -0,0 +1,77 @@
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from .downloader import get_video_filename
+from .platforms import get_platform_name
+
+# Parámetros de seguimiento que se descartan en cualquier sitio (además de
+# los 'utm_*'): identificadores de clic de campañas y redes sociales
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "igshid",
+}
+
+# Parámetros que no cambian el medio solo en la plataforma indicada: en un
+# sitio genérico '?s=' o '?t=' pueden identificar recursos distintos
+PLATFORM_TRACKING_PARAMS = {
+    "YouTube": {"si", "t", "start", "feature", "pp", "ab_channel"},
+    "TikTok": {"is_from_webapp", "sender_device", "share_url", "app", "_r", "_t"},
+    "Instagram": {"igsh", "img_index"},
+    "Twitter-X": {"s", "t", "ref_src", "ref_url"},
+    "Facebook": {"mibextid", "rdid", "ref", "sfnsn", "share_url"},
+}
+
+
+def normalize_url(url):
+    """
+    Normaliza una URL: esquema y host en minúsculas, sin 'www.'/'m.', sin
+    fragmento y sin parámetros de seguimiento (los universales y los de su
+    plataforma). Los parámetros restantes se ordenan para que el resultado
+    sea estable.
+    """
+    dropped = TRACKING_PARAMS | PLATFORM_TRACKING_PARAMS.get(get_platform_name(url), set())
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    for prefix in ("www.", "m.", "mobile."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key not in dropped and not key.startswith("utm_")
+    ]
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse(
+        ("https", host, path, "", urlencode(sorted(query)), "")
+    )
+
+
+def canonical_key(url):
+    """
+    Reduce una URL a la clave (plataforma, id de medio).
+
+    Para URLs sin un ID reconocible el id es un hash de la URL normalizada, así
+    que dos URLs solo colapsan si apuntan al mismo recurso.
+
+    Returns:
+        tuple: (plataforma, id de medio), p. ej. ('YouTube', 'youtube_dQw4w9WgXcQ')
+    """
+    return get_platform_name(url), get_video_filename(normalize_url(url))
+
+
+def dedupe_urls(urls):
+    """
+    Elimina las URLs que apuntan al mismo medio, conservando la primera aparición.
+
+    Returns:
+        tuple: (lista de URLs únicas en su orden original, número de duplicados)
+    """
+    seen = set()
+    unique = []
+    for url in urls:
+        key = canonical_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(url)
+    return unique, len(urls) - len(unique)
@@ -0,0 +1,78 @@
+import os
+
+from utils.logger import log_message
+
+# Puntos de control por etapa de una descarga con fusión de video + audio.
+# Los componentes que yt-dlp deja en disco ('<id>.f<format_id>.<ext>' con la
+# plantilla '%(id)s.%(ext)s') son el punto de control de la etapa de descarga:
+# si están completos, los intentos siguientes solo repiten la fusión o el
+# postprocesado, nunca vuelven a descargar el medio.
+
+# Extensiones que yt-dlp usa para descargas a medias
+PARTIAL_SUFFIXES = (".part", ".ytdl")
+
+
+def component_path(base_output_dir, info, fmt):
+    """Ruta en la que yt-dlp guarda el componente 'fmt' antes de fusionarlo."""
+    return os.path.join(
+        base_output_dir, f"{info['id']}.f{fmt['format_id']}.{fmt.get('ext') or 'mp4'}"
+    )
+
+
+def final_path(base_output_dir, info, ext="mp4"):
+    """Ruta del archivo fusionado que produce yt-dlp con '--merge-output-format'."""
+    return os.path.join(base_output_dir, f"{info['id']}.{ext}")
+
+
+def verify_component(path, fmt):
+    """
+    Verifica que un componente descargado esté completo.
+
+    Se exige que exista, que no tenga restos de descarga parcial y, si el
+    formato declara un tamaño exacto ('filesize'), que coincida con él.
+
+    Returns:
+        bool: True si el componente puede reutilizarse
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    if size <= 0:
+        return False
+    if any(os.path.exists(path + suffix) for suffix in PARTIAL_SUFFIXES):
+        return False
+    expected = fmt.get("filesize")
+    if isinstance(expected, int) and expected > 0 and size != expected:
+        log_message(
+            f"Componente con tamaño inesperado ({size} de {expected} bytes): {path}",
+            "WARNING",
+        )
+        return False
+    return True
+
+
+def verified_components(base_output_dir, info, plan):
+    """
+    Componentes de video y audio del plan que ya están completos en disco.
+
+    Args:
+        base_output_dir (str): Directorio de descarga
+        info (dict): Info JSON de yt-dlp
+        plan (dict): Plan de core.format_planner.plan_formats
+
+    Returns:
+        dict: {'video': ruta, 'audio': ruta} si ambos están verificados, o None
+    """
+    if not info or not info.get("id") or not plan or plan.get("combined"):
+        return None
+    components = {}
+    for role in ("video", "audio"):
+        fmt = plan.get(role)
+        if not fmt:
+            return None
+        path = component_path(base_output_dir, info, fmt)
+        if not verify_component(path, fmt):
+            return None
+        components[role] = path
+    return components
@@ -1,12 +1,20 @@
 import os
 import subprocess
 import shutil
+import sys
 import hashlib
-from urllib.parse import urlparse
+import tempfile
+import re
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlparse
 
+from config.config_manager import get_config_value
 from utils.colors import Colors
 from utils.logger import log_message
 
+from . import metrics, progress, ytdlp_pool
+
 
 def is_safe_path(base_path, target_path):
     """
@@ -63,10 +71,32 @@ YT_DLP_PATH = shutil.which("yt-dlp")
 FFMPEG_PATH = shutil.which("ffmpeg")  # yt-dlp lo necesitará para la fusión
 
 
+YOUTUBE_ID_RE = re.compile(r"^[0-9A-Za-z_-]{11}$")
+
+# Patrones de ID de medio para plataformas distintas de YouTube
+MEDIA_ID_PATTERNS = {
+    "tiktok": re.compile(r"/video/(\d+)"),
+    "instagram": re.compile(r"/(?:p|reel|reels|tv)/([\w-]+)"),
+    "twitter": re.compile(r"/status(?:es)?/(\d+)"),
+    "facebook": re.compile(r"/(?:videos|reel)/(\d+)"),
+}
+
+MEDIA_ID_HOSTS = {
+    "tiktok": ("tiktok.com",),
+    "instagram": ("instagram.com",),
+    "twitter": ("twitter.com", "x.com"),
+    "facebook": ("facebook.com",),
+}
+
+
 def get_video_filename(url: str) -> str:
     """
     Genera un nombre de archivo base seguro para la URL.
 
+    Para YouTube y las plataformas con un ID de medio reconocible en la URL el
+    nombre es '<plataforma>_<id>', de modo que las distintas formas de pegar un
+    mismo video (shorts, youtu.be, watch?v=...&t=3) generan el mismo nombre.
+
     Args:
         url (str): La URL del video para generar el nombre de archivo
 
@@ -75,14 +105,20 @@ def get_video_filename(url: str) -> str:
     """
     # Simplifica el nombre del archivo para evitar caracteres especiales
     parsed_url = urlparse(url)
-    if "youtube.com" in parsed_url.hostname or "youtu.be" in parsed_url.hostname:
-        if "v=" in parsed_url.query:
-            video_id = parsed_url.query.split("v=")[1].split("&")[0]
-            return f"youtube_{video_id}"
-        elif parsed_url.path and parsed_url.path != '/':
+    hostname = (parsed_url.hostname or "").lower()
+    if "youtube.com" in hostname or "youtu.be" in hostname:
+        video_id = parse_qs(parsed_url.query).get("v", [""])[0]
+        if not video_id and parsed_url.path and parsed_url.path != '/':
             video_id = parsed_url.path.strip('/').split('/')[-1]
+        if YOUTUBE_ID_RE.match(video_id):
             return f"youtube_{video_id}"
 
+    for name, hosts in MEDIA_ID_HOSTS.items():
+        if any(hostname == host or hostname.endswith("." + host) for host in hosts):
+            match = MEDIA_ID_PATTERNS[name].search(parsed_url.path)
+            if match:
+                return f"{name}_{match.group(1)}"
+
     # Para otras URLs, un nombre más genérico o basado en el hash
     url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()[:10]
     return f"media_{url_hash}"
@@ -146,46 +182,138 @@ def download_and_merge_video_audio(
             url,
             "general",
             verbose=verbose,
-            cookies_file=cookies_file)
-
-        if process.returncode == 0:
-            # yt-dlp imprime el nombre del archivo final en stdout/stderr al finalizar
-            # la fusión
-            output_lines = (process.stdout + process.stderr).splitlines()
-            for line in reversed(output_lines):  # Buscamos desde el final
-                if "Destination:" in line and "mp4" in line:
-                    try:
-                        # Extraer el nombre de archivo de la línea de destino
-                        parts = line.split("Destination: ")
-                        if len(parts) > 1:
-                            downloaded_filename = parts[1].strip()
-                            full_path = os.path.join(output_path, downloaded_filename)
-                            if os.path.exists(full_path):
-                                return full_path
-                    except Exception:
-                        pass  # Si hay error al parsear, ignorar y seguir buscando
-
-            # Fallback: Si no encontramos el "Destination:", intentamos con el output_template
-            # yt-dlp casi siempre pondrá mp4 cuando se usa --merge-output-format mp4
-            final_filepath_guess = os.path.join(output_path, f"{base_filename}.mp4")
-            if os.path.exists(final_filepath_guess):
-                return final_filepath_guess
-
-            print(
-                f"{Colors.YELLOW}[ADVERTENCIA] No se pudo determinar la ruta exacta del archivo final, pero yt-dlp reportó éxito.{Colors.RESET}")
-            return None  # No se pudo verificar el archivo, pero yt-dlp dijo que sí
-        else:
-            print(
-                f"{
-                    Colors.RED}[FALLO] La descarga y fusión de yt-dlp falló con código de salida {
-                    process.returncode}.{
-                    Colors.RESET}")
-            return None
+            cookies_file=cookies_file,
+            stream=True,
+            report_paths=True)
+
+        # yt-dlp informa la ruta exacta del archivo ya fusionado y movido.
+        for final_path in reversed(process.filepaths):
+            if os.path.exists(final_path):
+                return final_path
+
+        print(
+            f"{Colors.YELLOW}[ADVERTENCIA] No se pudo determinar la ruta exacta del archivo final, pero yt-dlp reportó éxito.{Colors.RESET}")
+        return None  # No se pudo verificar el archivo, pero yt-dlp dijo que sí
+    except subprocess.CalledProcessError as e:
+        print(
+            f"{
+                Colors.RED}[FALLO] La descarga y fusión de yt-dlp falló con código de salida {
+                e.returncode}.{
+                Colors.RESET}")
+        return None
     except Exception as e:
         print(f"{Colors.RED}ERROR inesperado durante la descarga y fusión: {e}{Colors.RESET}")
         return None
 
 
+# Fragmentos de mensajes de error de yt-dlp que indican en qué etapa falló.
+# Los de post-procesado son prefijos concretos: palabras sueltas como
+# "thumbnail" también aparecen en errores de descarga o del extractor
+# ("Unable to download thumbnail") y los clasificarían mal.
+POSTPROCESS_ERROR_MARKERS = (
+    "ERROR: Postprocessing:",
+    "[EmbedThumbnail]",
+    "[ExtractAudio]",
+    "[Merger]",
+    "[Metadata]",
+)
+STALE_INFO_ERROR_MARKERS = (
+    "HTTP Error 403",
+    "HTTP Error 410",
+    "Requested format is not available",
+)
+
+
+def classify_yt_dlp_error(output):
+    """
+    Clasifica la etapa en la que falló una ejecución de yt-dlp a partir de
+    sus últimas líneas de salida.
+
+    Returns:
+        str: 'postprocess' (metadata/thumbnail/conversión), 'stale' (enlaces
+             de formato caducados o formato inexistente) o 'download'
+    """
+    errors = "\n".join(
+        line for line in (output or "").splitlines() if "ERROR" in line
+    )
+    if any(marker in errors for marker in POSTPROCESS_ERROR_MARKERS):
+        return "postprocess"
+    if any(marker in errors for marker in STALE_INFO_ERROR_MARKERS):
+        return "stale"
+    return "download"
+
+
+def build_termux_env():
+    """
+    Construye el entorno para ejecutar yt-dlp en Termux.
+
+    Esto es CRÍTICO. Un subproceso no hereda el entorno de un shell
+    interactivo (como fish o bash), causando fallos silenciosos.
+    """
+    env = os.environ.copy()
+
+    # PREFIX es la variable más importante de Termux, todo se basa en ella.
+    prefix = env.get('PREFIX')
+    if not prefix:
+        # Fallback por si no estuviera, aunque es muy raro.
+        prefix = '/data/data/com.termux/files/usr'
+
+    # 1. LD_LIBRARY_PATH: La causa más probable de fallos silenciosos.
+    #    Le dice al sistema dónde encontrar las librerías compartidas (.so).
+    env['LD_LIBRARY_PATH'] = f"{prefix}/lib"
+
+    # 2. HOME: Necesario para que yt-dlp encuentre su config, cache, etc.
+    env['HOME'] = os.path.expanduser('~')
+
+    # 3. PATH: Asegura que todos los binarios de Termux sean encontrables.
+    env['PATH'] = f"{prefix}/bin:{env.get('PATH', '')}"
+
+    # 4. TMPDIR: Ubicación para archivos temporales.
+    env['TMPDIR'] = f"{prefix}/tmp"
+    return env
+
+
+def _run_streaming(command, env, on_line, max_lines):
+    """
+    Ejecuta un comando leyendo stdout y stderr línea a línea.
+
+    Solo se conservan las últimas max_lines líneas de cada stream, así que la
+    memoria usada no depende de la duración de la ejecución. Las líneas para
+    las que on_line retorna True (progreso) no se guardan.
+
+    Returns:
+        tuple: (código de salida, stdout, stderr)
+    """
+    stdout_tail = deque(maxlen=max_lines)
+    stderr_tail = deque(maxlen=max_lines)
+
+    with subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        env=env,
+    ) as process:
+        def pump_stderr():
+            for line in process.stderr:
+                line = line.rstrip("\r\n")
+                if not on_line("err", line):
+                    stderr_tail.append(line)
+
+        stderr_thread = threading.Thread(target=pump_stderr, daemon=True)
+        stderr_thread.start()
+        for line in process.stdout:
+            line = line.rstrip("\r\n")
+            if not on_line("out", line):
+                stdout_tail.append(line)
+        stderr_thread.join()
+        returncode = process.wait()
+
+    return returncode, "\n".join(stdout_tail), "\n".join(stderr_tail)
+
+
 def run_yt_dlp(
     args,
     url,
@@ -193,9 +321,16 @@ def run_yt_dlp(
     verbose=False,  # Añadido
     cookies_file=None,
     dry_run=False,  # Añadido
+    stream=False,
+    job_id=None,
+    info_json=None,
+    report_paths=False,
 ):
     """
     Ejecuta un comando de yt-dlp y captura su salida.
+    Si el módulo yt_dlp está instalado, el trabajo se ejecuta en el pool de
+    procesos ya inicializados (core.ytdlp_pool) en lugar de lanzar un proceso
+    nuevo; se desactiva con la clave de configuración 'ytdlp_worker_pool'.
     Retorna el objeto CompletedProcess.
     Eleva subprocess.CalledProcessError si el comando falla (check=True).
 
@@ -206,19 +341,44 @@ def run_yt_dlp(
         verbose (bool): Mostrar información detallada
         cookies_file (str): Ruta al archivo de cookies
         dry_run (bool): Modo de prueba sin ejecutar realmente
+        stream (bool): Leer la salida línea a línea publicando eventos de
+                       progreso (core.progress) y conservando solo las últimas
+                       líneas ('output_buffer_lines' de la configuración)
+        job_id (str): Identificador del trabajo para los eventos de progreso;
+                      se genera uno si no se indica. Si el trabajo no tiene
+                      métricas abiertas (core.metrics), una ejecución con
+                      stream=True registra las suyas propias
+        info_json (str): Info JSON ya extraído (core.metadata_cache); se pasa
+                         con --load-info-json en lugar de la URL
+        report_paths (bool): Pedir a yt-dlp la ruta de cada archivo final ya
+                             movido a su destino ('after_move:filepath')
 
     Returns:
-        subprocess.CompletedProcess: Resultado de la ejecución del proceso
+        subprocess.CompletedProcess: Resultado de la ejecución del proceso;
+        con report_paths=True incluye el atributo 'filepaths' (lista de rutas
+        finales, vacía si yt-dlp no produjo ningún archivo)
 
     Raises:
         subprocess.CalledProcessError: Si yt-dlp falla
         FileNotFoundError: Si yt-dlp no se encuentra
         Exception: Para otros errores inesperados
     """
-    command = ["yt-dlp"] + args
+    stream_args = ["--newline"] + progress.PROGRESS_TEMPLATE_ARGS if stream else []
+    command = ["yt-dlp"] + stream_args + args
+    paths_file = None
+    if report_paths:
+        # '--print' implicaría '--quiet' y ocultaría el progreso; la ruta se
+        # escribe en un archivo aparte que se lee al terminar.
+        fd, paths_file = tempfile.mkstemp(prefix="tud-paths-", suffix=".txt")
+        os.close(fd)
+        command.extend(["--print-to-file", "after_move:filepath", paths_file])
     if cookies_file:
         command.extend(["--cookies", cookies_file])
-    command.append(url)  # La URL siempre al final
+    if info_json:
+        # Reutiliza la extracción guardada en lugar de volver a pedir la página.
+        command.extend(["--load-info-json", info_json])
+    else:
+        command.append(url)  # La URL siempre al final
 
     # Mostrar el comando que se va a ejecutar (para depuración y transparencia)
     # Escapar caracteres especiales para que sea seguro copiar y pegar en shell
@@ -245,40 +405,75 @@ def run_yt_dlp(
 
     log_message(f"Ejecutando yt-dlp: {full_command_str}", "INFO", url, platform)
 
+    job, own_job, result = None, False, False
+    if stream:
+        job_id = job_id or progress.new_job_id()
+        job = metrics.get_job(job_id)
+        if job is None:
+            # Ejecución suelta (p. ej. download_and_merge_video_audio): el
+            # registro de métricas corresponde a esta sola ejecución.
+            job = metrics.start_job(
+                job_id, url, "audio" if "-x" in args else "video", platform
+            )
+            own_job = job is not None
+
     try:
-        # --- Construcción del Entorno de Termux ---
-        # Esto es CRÍTICO. Un subproceso no hereda el entorno de un shell
-        # interactivo (como fish o bash), causando fallos silenciosos.
-        env = os.environ.copy()
-
-        # PREFIX es la variable más importante de Termux, todo se basa en ella.
-        prefix = env.get('PREFIX')
-        if not prefix:
-            # Fallback por si no estuviera, aunque es muy raro.
-            prefix = '/data/data/com.termux/files/usr'
-
-        # 1. LD_LIBRARY_PATH: La causa más probable de fallos silenciosos.
-        #    Le dice al sistema dónde encontrar las librerías compartidas (.so).
-        env['LD_LIBRARY_PATH'] = f"{prefix}/lib"
-
-        # 2. HOME: Necesario para que yt-dlp encuentre su config, cache, etc.
-        env['HOME'] = os.path.expanduser('~')
-
-        # 3. PATH: Asegura que todos los binarios de Termux sean encontrables.
-        env['PATH'] = f"{prefix}/bin:{env.get('PATH', '')}"
-
-        # 4. TMPDIR: Ubicación para archivos temporales.
-        env['TMPDIR'] = f"{prefix}/tmp"
-
-        # --- Ejecución del Proceso ---
-        process = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True,
-            encoding="utf-8",
-            env=env  # Usar el entorno recién construido
+        env = build_termux_env()
+        use_pool = (
+            get_config_value("ytdlp_worker_pool", True) and ytdlp_pool.is_available()
         )
+
+        if stream:
+            max_lines = get_config_value("output_buffer_lines", 200)
+            on_line = progress.make_line_parser(job_id, url)
+            finish_progress = None
+            if sys.stdout.isatty():
+                # En trabajos paralelos (salida capturada) no se dibuja el progreso.
+                render, finish_progress = progress.make_console_renderer(
+                    job_id, sys.stdout
+                )
+                unsubscribe = progress.subscribe(render)
+            try:
+                if use_pool:
+                    pool = ytdlp_pool.get_pool(env)
+                    returncode, stdout, stderr = pool.run(
+                        command[1:], on_line=on_line, max_lines=max_lines,
+                        timeout=get_config_value("ytdlp_job_timeout", 600),
+                    )
+                else:
+                    returncode, stdout, stderr = _run_streaming(
+                        command, env, on_line, max_lines
+                    )
+            finally:
+                if finish_progress:
+                    unsubscribe()
+                    finish_progress()
+        elif use_pool:
+            # --- Ejecución en el pool de procesos yt-dlp ya inicializados ---
+            pool = ytdlp_pool.get_pool(env)
+            returncode, stdout, stderr = pool.run(
+                command[1:], timeout=get_config_value("ytdlp_job_timeout", 600)
+            )
+        else:
+            # --- Ejecución del Proceso ---
+            process = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                check=True,
+                encoding="utf-8",
+                env=env  # Usar el entorno recién construido
+            )
+            returncode, stdout, stderr = 0, process.stdout, process.stderr
+
+        if returncode != 0:
+            raise subprocess.CalledProcessError(
+                returncode, command, output=stdout, stderr=stderr
+            )
+        process = subprocess.CompletedProcess(command, returncode, stdout, stderr)
+        if report_paths:
+            process.filepaths = _read_reported_paths(paths_file)
+        result = process.filepaths[-1] if report_paths and process.filepaths else True
         return process
     except subprocess.CalledProcessError as e:
         log_message(
@@ -300,3 +495,24 @@ def run_yt_dlp(
         )
         log_message(f"Error inesperado al ejecutar yt-dlp: {e}", "ERROR", url, platform)
         raise
+    finally:
+        if job:
+            job.end_run()
+            if own_job:
+                job.finish(result)
+        if paths_file:
+            try:
+                os.remove(paths_file)
+            except OSError:
+                pass
+
+
+def _read_reported_paths(paths_file):
+    """Lee las rutas escritas por '--print-to-file after_move:filepath'."""
+    if not paths_file:
+        return []
+    try:
+        with open(paths_file, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError:
+        return []
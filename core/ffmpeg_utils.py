@@ -3,8 +3,11 @@ import shutil
 import subprocess
 
 from utils.colors import Colors
+from utils.dependency_cache import probe
 from utils.logger import log_message
 
+from . import media_inspector
+
 
 def get_ffmpeg_path():
     """
@@ -37,49 +40,98 @@ def check_ffmpeg(ffmpeg_dir):
 
     ffmpeg_exec_path = os.path.join(ffmpeg_dir, "ffmpeg")
 
-    try:
-        process = subprocess.run(
-            [ffmpeg_exec_path, "-version"],
-            capture_output=True,
-            text=True,
-            check=False,  # No queremos que lance excepción si -version falla por alguna razón
-            encoding="utf-8",
-        )
-        if process.returncode == 0:
-            print(
-                f"{Colors.GREEN}[+] FFmpeg verificado y funcional en: {ffmpeg_dir}{Colors.RESET}"
-            )
-            log_message(f"FFmpeg verificado: {ffmpeg_dir}", "INFO")
-            return True
-        else:
-            print(
-                f"{
-                    Colors.RED}ERROR: FFmpeg encontrado pero falló la verificación: {
-                    process.stderr}{
-                    Colors.RESET}"
-            )
-            log_message(
-                f"ERROR: FFmpeg falló la verificación: {
-                    process.stderr}",
-                "ERROR",
-            )
-            return False
-    except FileNotFoundError:
+    if not os.path.isfile(ffmpeg_exec_path):
         print(
             f"{Colors.RED}ERROR: FFmpeg no encontrado en la ruta especificada: {ffmpeg_dir}{Colors.RESET}"
         )
         log_message(f"ERROR: FFmpeg no encontrado en: {ffmpeg_dir}", "ERROR")
         return False
-    except Exception as e:
-        print(f"{Colors.RED}ERROR inesperado al verificar FFmpeg: {e}{Colors.RESET}")
-        log_message(f"ERROR inesperado al verificar FFmpeg: {e}", "ERROR")
-        return False
+
+    # Solo se ejecuta 'ffmpeg -version' si el binario cambió desde la última
+    # verificación (utils.dependency_cache).
+    result = probe("ffmpeg", ffmpeg_exec_path)
+    if result["ok"]:
+        print(
+            f"{Colors.GREEN}[+] FFmpeg verificado y funcional en: {ffmpeg_dir}{Colors.RESET}"
+        )
+        log_message(f"FFmpeg verificado: {ffmpeg_dir} ({result['version']})", "INFO")
+        return True
+    print(
+        f"{Colors.RED}ERROR: FFmpeg encontrado pero falló la verificación: {result['error']}{Colors.RESET}"
+    )
+    log_message(f"ERROR: FFmpeg falló la verificación: {result['error']}", "ERROR")
+    return False
+
+
+# Códecs (nombres de ffprobe) que cada contenedor acepta sin recodificar;
+# los contenedores que no figuran (mkv) aceptan cualquiera.
+CONTAINER_CODECS = {
+    ".mp4": {
+        "video": ("h264", "hevc", "av1", "vp9", "mpeg4"),
+        "audio": ("aac", "mp3", "alac", "ac3", "eac3"),
+    },
+    ".webm": {
+        "video": ("vp8", "vp9", "av1"),
+        "audio": ("opus", "vorbis"),
+    },
+}
+
+# Recodificación de respaldo por contenedor, solo para el stream que no cabe
+FALLBACK_CODECS = {
+    ".mp4": {
+        "video": ["libx264", "-preset", "veryfast", "-crf", "20"],
+        "audio": ["aac", "-b:a", "192k"],
+    },
+    ".webm": {
+        "video": ["libvpx-vp9", "-b:v", "0", "-crf", "32"],
+        "audio": ["libopus", "-b:a", "160k"],
+    },
+}
+
+
+def _stream_codec(result, codec_type):
+    streams = [
+        s for s in media_inspector.streams_of(result, codec_type)
+        if s.get("codec_name") not in ("mjpeg", "png")
+    ]
+    return streams[0].get("codec_name") if streams else None
 
 
-def manual_merge_and_cleanup(video_file, audio_file, output_file, ffmpeg_dir):
+def merge_codec_args(video_result, audio_result, output_file):
     """
-    Fusiona video y audio manualmente usando ffmpeg.
+    Argumentos '-c:v'/'-c:a' para fusionar en output_file: copia de cada
+    stream cuyo códec admite el contenedor y recodificación solo del que no.
+    Si ffprobe no pudo leer un componente se copia (comportamiento anterior).
+
+    Returns:
+        tuple: (lista de argumentos, {'video': modo, 'audio': modo}) con modo
+               'copia' o 'recodificado (<códec>)'
+    """
+    container = os.path.splitext(output_file)[1].lower()
+    accepted = CONTAINER_CODECS.get(container)
+    args, modes = [], {}
+    for codec_type, result, flag in (
+        ("video", video_result, "-c:v"),
+        ("audio", audio_result, "-c:a"),
+    ):
+        codec = _stream_codec(result, codec_type)
+        if accepted and codec and codec not in accepted[codec_type]:
+            args += [flag] + FALLBACK_CODECS[container][codec_type]
+            modes[codec_type] = f"recodificado ({codec})"
+        else:
+            args += [flag, "copy"]
+            modes[codec_type] = "copia"
+    return args, modes
+
+
+def manual_merge_and_cleanup(video_file, audio_file, output_file, ffmpeg_dir, metadata=None,
+                             thumbnail=None):
+    """
+    Fusiona video y audio manualmente usando ffmpeg, copiando los streams
+    que el contenedor admite y recodificando solo el que no (merge_codec_args).
     Elimina los archivos de entrada (video_file, audio_file) si la fusión es exitosa.
+    metadata: argumentos '-metadata clave=valor' opcionales para el archivo final.
+    thumbnail: imagen opcional que se incrusta como carátula (attached_pic).
     """
     if not os.path.exists(video_file):
         print(
@@ -100,20 +152,33 @@ def manual_merge_and_cleanup(video_file, audio_file, output_file, ffmpeg_dir):
         )
         return False
 
+    # Cada stream se copia si su códec cabe en el contenedor de salida; solo
+    # el que no cabe se recodifica.
+    inspected = media_inspector.inspect_files(
+        [video_file, audio_file], os.path.join(ffmpeg_dir, "ffprobe")
+    )
+    codec_args, modes = merge_codec_args(
+        inspected[video_file], inspected[audio_file], output_file
+    )
+
     ffmpeg_exec_path = os.path.join(ffmpeg_dir, "ffmpeg")
-    command = [
-        ffmpeg_exec_path,
-        "-y",  # Sobrescribir archivo de salida sin preguntar
-        "-i",
-        video_file,
-        "-i",
-        audio_file,
-        "-c",
-        "copy",  # Copiar streams sin recodificar para mayor velocidad
-        output_file,
-    ]
+    inputs = ["-i", video_file, "-i", audio_file]
+    maps = ["-map", "0:v:0", "-map", "1:a:0"]
+    if thumbnail:
+        # La carátula entra como segundo stream de video en JPEG (MP4 no
+        # admite WebP), marcado como imagen adjunta.
+        inputs += ["-i", thumbnail]
+        maps += ["-map", "2:v:0"]
+        codec_args = codec_args + ["-c:v:1", "mjpeg", "-disposition:v:1", "attached_pic"]
+    command = (
+        [ffmpeg_exec_path, "-y"]  # Sobrescribir archivo de salida sin preguntar
+        + inputs + maps + codec_args + list(metadata or []) + [output_file]
+    )
 
-    print(f"\n{Colors.YELLOW}Iniciando fusión manual de video y audio...{Colors.RESET}")
+    print(
+        f"\n{Colors.YELLOW}Iniciando fusión manual de video y audio "
+        f"(video: {modes['video']}, audio: {modes['audio']})...{Colors.RESET}"
+    )
     log_message(f"Comando de fusión manual: {' '.join(command)}", "INFO")
 
     try:
@@ -189,53 +254,21 @@ def has_audio_stream(file_path, ffmpeg_dir):
         )
         return False
 
-    ffprobe_exec_path = os.path.join(ffmpeg_dir, "ffprobe")
-    command = [
-        ffprobe_exec_path,
-        "-v",
-        "error",
-        "-select_streams",
-        "a:0",
-        "-show_entries",
-        "stream=codec_type",
-        "-of",
-        "default=noprint_wrappers=1:nokey=1",
-        file_path,
-    ]
-
-    log_message(f"Comando ffprobe para verificar audio: {' '.join(command)}", "INFO")
-    try:
-        process = subprocess.run(
-            command, capture_output=True, text=True, check=False, encoding="utf-8"
-        )
-        if process.returncode == 0 and "audio" in process.stdout.strip():
-            print(
-                f"{Colors.GREEN}[+] Archivo '{file_path}' contiene stream de audio.{Colors.RESET}"
-            )
-            log_message(f"Archivo '{file_path}' contiene stream de audio.", "INFO")
-            return True
-        else:
-            print(
-                f"{
-                    Colors.YELLOW}ADVERTENCIA: Archivo '{file_path}' NO contiene stream de audio o ffprobe falló: {
-                    process.stderr}{
-                    Colors.RESET}")
-            log_message(
-                f"Archivo '{file_path}' NO contiene stream de audio o ffprobe falló: {
-                    process.stderr}",
-                "WARNING",
-            )
-            return False
-    except FileNotFoundError:
+    # core.media_inspector guarda el resultado: si el archivo no cambia,
+    # ffprobe no vuelve a ejecutarse.
+    result = media_inspector.inspect_file(file_path, os.path.join(ffmpeg_dir, "ffprobe"))
+    if media_inspector.has_audio(result):
         print(
-            f"{
-                Colors.RED}ERROR: ffprobe no encontrado. Asegúrate de que '{ffmpeg_dir}' es la ruta correcta.{
-                Colors.RESET}")
-        log_message(f"ERROR: ffprobe no encontrado en: {ffmpeg_dir}", "ERROR")
-        return False
-    except Exception as e:
-        print(
-            f"{Colors.RED}ERROR inesperado al verificar stream de audio: {e}{Colors.RESET}"
+            f"{Colors.GREEN}[+] Archivo '{file_path}' contiene stream de audio.{Colors.RESET}"
         )
-        log_message(f"ERROR inesperado al verificar stream de audio: {e}", "ERROR")
-        return False
+        log_message(f"Archivo '{file_path}' contiene stream de audio.", "INFO")
+        return True
+    reason = result["error"] or "sin stream de audio"
+    print(
+        f"{Colors.YELLOW}ADVERTENCIA: Archivo '{file_path}' NO contiene stream de audio o ffprobe falló: {reason}{Colors.RESET}"
+    )
+    log_message(
+        f"Archivo '{file_path}' NO contiene stream de audio o ffprobe falló: {reason}",
+        "WARNING",
+    )
+    return False
@@ -0,0 +1,162 @@
+import re
+
+from config.settings import get_video_quality_map
+
+# Decide de antemano, a partir de la lista de formatos ya extraída, qué par
+# video+audio (o formato combinado) se va a descargar. Así la descarga se
+# ejecuta una sola vez con IDs de formato concretos en lugar de probar
+# selectores distintos en cascada.
+
+HEIGHT_LIMIT_RE = re.compile(r"height\s*<=\s*(\d+)")
+
+# Códecs que se fusionan en MP4 sin recodificar y se reproducen en Android
+MP4_VIDEO_CODECS = ("avc1", "h264", "hev1", "hvc1", "av01")
+MP4_AUDIO_CODECS = ("mp4a", "aac")
+
+
+def get_height_limit(quality):
+    """
+    Altura máxima para una calidad ('720p', 'best'...), leída del selector de
+    get_video_quality_map para respetar la configuración del usuario.
+    """
+    selector = get_video_quality_map().get(quality) or ""
+    match = HEIGHT_LIMIT_RE.search(selector)
+    if match:
+        return int(match.group(1))
+    digits = re.match(r"(\d+)p$", quality or "")
+    return int(digits.group(1)) if digits else None
+
+
+def get_quality_selector(quality, is_short=False):
+    """Selector de yt-dlp para la calidad, usado cuando no hay plan posible."""
+    if is_short:
+        return "best[ext=mp4]/best"
+    return get_video_quality_map().get(quality) or "bv*+ba/b"
+
+
+def _codec(fmt, key):
+    """Códec en minúsculas; None si el info JSON no lo indica (desconocido)."""
+    codec = fmt.get(key)
+    return codec.lower() if isinstance(codec, str) and codec else None
+
+
+def _has_stream(fmt, codec_key, ext_key):
+    # Solo 'none' significa que falta el stream. Un códec ausente es
+    # desconocido, no ausente (como en yt-dlp): se miran 'video_ext' /
+    # 'audio_ext' y, si tampoco están, se supone que el stream existe.
+    codec = _codec(fmt, codec_key)
+    if codec is not None:
+        return codec != "none"
+    return fmt.get(ext_key) != "none"
+
+
+def has_video(fmt):
+    """True salvo que el formato declare que no tiene video."""
+    return _has_stream(fmt, "vcodec", "video_ext")
+
+
+def has_audio(fmt):
+    """True salvo que el formato declare que no tiene audio."""
+    return _has_stream(fmt, "acodec", "audio_ext")
+
+
+def _num(value):
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _video_rank(fmt):
+    mp4_friendly = (_codec(fmt, "vcodec") or "").startswith(MP4_VIDEO_CODECS)
+    return (
+        _num(fmt.get("height")),
+        mp4_friendly,
+        _num(fmt.get("fps")),
+        _num(fmt.get("tbr") or fmt.get("vbr")),
+    )
+
+
+def _audio_rank(fmt):
+    mp4_friendly = (_codec(fmt, "acodec") or "").startswith(MP4_AUDIO_CODECS)
+    return (
+        mp4_friendly,
+        _num(fmt.get("abr") or fmt.get("tbr")),
+        _num(fmt.get("asr")),
+    )
+
+
+def _within(fmt, height_limit):
+    height = fmt.get("height")
+    return height_limit is None or not height or height <= height_limit
+
+
+def plan_formats(info, quality, is_short=False):
+    """
+    Elige los formatos a descargar para un info JSON de yt-dlp.
+
+    Se prefiere la mejor pista de video que respete la calidad pedida (a
+    igual altura, códecs compatibles con MP4) junto con la mejor pista de
+    audio (a igual condición, AAC/M4A). Si la plataforma solo ofrece formatos
+    combinados, o es un short, se elige el mejor combinado.
+
+    Args:
+        info (dict): Info JSON extraído por yt-dlp
+        quality (str): Clave de get_video_quality_map ('480p', '720p', '1080p', 'best')
+        is_short (bool): Preferir un formato combinado (sin fusión)
+
+    Returns:
+        dict: 'video' y 'audio' (dicts de formato o None), 'combined' (dict o
+              None) y 'selector' (str con IDs concretos y, como respaldo, el
+              selector de la calidad); None si no hay formatos utilizables
+    """
+    formats = [
+        f for f in (info or {}).get("formats") or []
+        if f.get("format_id") and (has_video(f) or has_audio(f))
+        and f.get("protocol") != "mhtml"
+    ]
+    if not formats:
+        return None
+
+    height_limit = get_height_limit(quality)
+    fallback = get_quality_selector(quality, is_short)
+
+    videos = [f for f in formats if has_video(f) and not has_audio(f)
+              and _within(f, height_limit)]
+    audios = [f for f in formats if has_audio(f) and not has_video(f)]
+    combined = [f for f in formats if has_video(f) and has_audio(f)
+                and _within(f, height_limit)]
+
+    best_combined = max(combined, key=_video_rank) if combined else None
+    if videos and audios and not (is_short and best_combined):
+        video = max(videos, key=_video_rank)
+        audio = max(audios, key=_audio_rank)
+        # Un combinado de mayor resolución gana a la fusión.
+        if not best_combined or _video_rank(video)[0] >= _video_rank(best_combined)[0]:
+            return {
+                "video": video,
+                "audio": audio,
+                "combined": None,
+                "selector": f"{video['format_id']}+{audio['format_id']}/{fallback}",
+            }
+    if best_combined:
+        return {
+            "video": None,
+            "audio": None,
+            "combined": best_combined,
+            "selector": f"{best_combined['format_id']}/{fallback}",
+        }
+    return None
+
+
+def describe_plan(plan):
+    """Texto corto con los formatos elegidos, para mostrar al usuario."""
+    def describe(fmt):
+        parts = [fmt.get("format_id"), fmt.get("ext")]
+        if fmt.get("height"):
+            parts.append(f"{fmt['height']}p")
+        codec = _codec(fmt, "vcodec") if has_video(fmt) else _codec(fmt, "acodec")
+        if codec:
+            parts.append(codec.split(".")[0])
+        return " ".join(str(p) for p in parts if p)
+
+    if plan["combined"]:
+        return describe(plan["combined"])
+    return f"{describe(plan['video'])} + {describe(plan['audio'])}"
@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from config.config_manager import CONFIG_FILE, ensure_config_dir
+
+# Registro persistente de trabajos por lotes. Permite reanudar una descarga
+# masiva interrumpida (Termux cerrado por Android, reinicio del teléfono...)
+# procesando solo las entradas que no terminaron.
+LEDGER_FILE = os.path.join(os.path.dirname(CONFIG_FILE), "jobs.db")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Resultado de core.verifier para las entradas completadas (columna
+# 'verification'; NULL mientras no se haya verificado). Los problemas
+# encontrados van a 'verification_detail' para no pisar 'error'.
+VERIFIED = "verified"
+CORRUPT = "corrupt"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    batch_file TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    output_path TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    verification TEXT,
+    verification_detail TEXT,
+    PRIMARY KEY (batch_file, media_type, url)
+)
+"""
+
+
+_migrated = False
+
+
+def _connect():
+    """Abre una conexión al ledger creando la tabla si no existe."""
+    global _migrated
+    ensure_config_dir()
+    conn = sqlite3.connect(LEDGER_FILE, timeout=30)
+    conn.execute(_SCHEMA)
+    if not _migrated:
+        # Ledgers creados antes de las columnas de verificación
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        with conn:
+            for column in ("verification", "verification_detail"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        _migrated = True
+    return conn
+
+
+def _batch_key(batch_file):
+    """Normaliza la ruta del archivo de lotes para usarla como clave."""
+    return os.path.realpath(batch_file)
+
+
+def register_batch(batch_file, media_type, urls):
+    """
+    Registra las URLs de un archivo de lotes y retorna las que faltan por procesar.
+
+    Las URLs nuevas se insertan como pendientes; las ya conocidas conservan su
+    estado. Las entradas que quedaron en 'running' (ejecución interrumpida) o
+    'failed' (incluidas las completadas cuyo archivo resultó corrupto) se
+    vuelven a encolar.
+
+    Args:
+        batch_file (str): Ruta al archivo de lotes
+        media_type (str): Tipo de media ('video' o 'audio')
+        urls (list): URLs leídas del archivo, en orden
+
+    Returns:
+        list: URLs sin terminar, en el orden del archivo
+    """
+    key = _batch_key(batch_file)
+    now = time.time()
+    with closing(_connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO jobs "
+            "(batch_file, media_type, url, position, status, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(key, media_type, url, i, PENDING, now) for i, url in enumerate(urls)],
+        )
+        rows = conn.execute(
+            "SELECT url FROM jobs WHERE batch_file = ? AND media_type = ? "
+            "AND status != ? ORDER BY position",
+            (key, media_type, DONE),
+        ).fetchall()
+    wanted = set(urls)
+    return [url for (url,) in rows if url in wanted]
+
+
+def _update(batch_file, media_type, url, status, output_path=None, error=None,
+            count_attempt=False):
+    key = _batch_key(batch_file)
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, output_path = COALESCE(?, output_path), "
+            "error = ?, attempts = attempts + ?, updated_at = ?, verification = NULL, "
+            "verification_detail = NULL WHERE batch_file = ? AND media_type = ? AND url = ?",
+            (status, output_path, error, 1 if count_attempt else 0, time.time(),
+             key, media_type, url),
+        )
+
+
+def mark_running(batch_file, media_type, url):
+    """Marca una entrada como en ejecución."""
+    _update(batch_file, media_type, url, RUNNING, count_attempt=True)
+
+
+def mark_done(batch_file, media_type, url, output_path=None):
+    """Marca una entrada como completada, guardando la ruta de salida si se conoce."""
+    _update(batch_file, media_type, url, DONE, output_path=output_path)
+
+
+def mark_failed(batch_file, media_type, url, error=None):
+    """Marca una entrada como fallida."""
+    _update(batch_file, media_type, url, FAILED, error=error)
+
+
+def mark_verification(batch_file, media_type, url, verification, detail=None):
+    """
+    Guarda el resultado de la verificación (VERIFIED o CORRUPT) de una entrada.
+
+    Una entrada CORRUPT pasa a 'failed' para que el siguiente batch la vuelva
+    a descargar; el detalle se guarda en 'verification_detail' y la columna
+    'error' conserva el error de descarga, si lo hubo.
+    """
+    status = FAILED if verification == CORRUPT else None
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "UPDATE jobs SET verification = ?, verification_detail = ?, "
+            "status = COALESCE(?, status), updated_at = ? "
+            "WHERE batch_file = ? AND media_type = ? AND url = ?",
+            (verification, detail, status, time.time(),
+             _batch_key(batch_file), media_type, url),
+        )
+
+
+def reset_batch(batch_file, media_type):
+    """Olvida el progreso registrado de un archivo de lotes."""
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "DELETE FROM jobs WHERE batch_file = ? AND media_type = ?",
+            (_batch_key(batch_file), media_type),
+        )
+
+
+def get_batch_status(batch_file, media_type):
+    """Retorna un diccionario {estado: cantidad} para un archivo de lotes."""
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE batch_file = ? "
+            "AND media_type = ? GROUP BY status",
+            (_batch_key(batch_file), media_type),
+        ).fetchall()
+    return dict(rows)
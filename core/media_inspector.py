@@ -0,0 +1,309 @@
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config_manager import CONFIG_FILE, get_config_value
+from utils.logger import log_message
+
+# Inspección de archivos multimedia con 'ffprobe -print_format json': códecs,
+# duración, bitrate y disposición de streams. ffprobe solo acepta un archivo
+# por ejecución, así que inspect_files() reparte los archivos entre varios
+# procesos a la vez. Los resultados se guardan en disco por (ruta, tamaño,
+# fecha de modificación): un archivo que no ha cambiado no se vuelve a probar.
+#
+# La caché es un JSONL al que cada inspección solo añade sus resultados; al
+# cargarla, la última línea de cada ruta es la vigente. Se reescribe
+# compactada cuando las líneas obsoletas superan a las vigentes.
+CACHE_FILE = os.path.join(os.path.dirname(CONFIG_FILE), "media_probe_cache.jsonl")
+
+# Entradas máximas de la caché; al compactar se descartan las más antiguas
+MAX_CACHE_ENTRIES = 20000
+
+STREAM_FIELDS = (
+    "index", "codec_type", "codec_name", "profile", "bit_rate", "duration",
+    "width", "height", "pix_fmt", "channels", "sample_rate",
+)
+
+_cache = None
+_cache_lines = 0
+_cache_lock = threading.Lock()
+
+
+def _load_cache():
+    global _cache, _cache_lines
+    if _cache is None:
+        _cache, _cache_lines = {}, 0
+        try:
+            with open(CACHE_FILE, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        _cache[entry["path"]] = entry
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    _cache_lines += 1
+        except OSError:
+            pass
+    return _cache
+
+
+def _write_lines(entries, mode, expected_size=None):
+    """
+    Añade (mode 'a') o reescribe (mode 'w') el archivo de caché. Al
+    reescribir con expected_size, el archivo solo se reemplaza si aún tiene
+    ese tamaño; retorna False si otro proceso lo modificó entretanto.
+    """
+    data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    if mode == "a":
+        fd = os.open(CACHE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode("utf-8"))
+        finally:
+            os.close(fd)
+        return True
+    tmp_path = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    try:
+        current = os.path.getsize(CACHE_FILE)
+    except OSError:
+        current = 0
+    if expected_size is not None and current != expected_size:
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, CACHE_FILE)
+    return True
+
+
+def _merge_from_disk(cache):
+    """
+    Incorpora a cache las entradas del archivo que otros procesos añadieron
+    después de cargarlo (la más reciente por ruta gana).
+
+    Returns:
+        int: Tamaño en bytes del archivo leído (0 si no existe)
+    """
+    try:
+        with open(CACHE_FILE, "rb") as f:
+            data = f.read()
+    except OSError:
+        return 0
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        try:
+            entry = json.loads(line)
+            current = cache.get(entry["path"])
+            if current is None or entry.get("probed_at", 0) >= current.get("probed_at", 0):
+                cache[entry["path"]] = entry
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+    return len(data)
+
+
+def _compact(cache):
+    """
+    Reescribe el archivo con una línea por ruta. Antes se fusiona con lo que
+    haya en disco, y el reemplazo solo se hace si nadie añadió líneas
+    mientras tanto (si no, se vuelve a fusionar): así no se pierden los
+    resultados de otros procesos (batches en paralelo, 'tud verify').
+    """
+    global _cache_lines
+    for _ in range(5):
+        size = _merge_from_disk(cache)
+        entries = sorted(cache.values(), key=lambda entry: entry.get("probed_at", 0))
+        entries = entries[-MAX_CACHE_ENTRIES:]
+        if _write_lines(entries, "w", expected_size=size):
+            break
+    else:
+        return False
+    cache.clear()
+    cache.update((entry["path"], entry) for entry in entries)
+    _cache_lines = len(entries)
+    return True
+
+
+def _save_cache(cache, new_entries):
+    global _cache_lines
+    try:
+        if (_cache_lines + len(new_entries) > max(2 * len(cache), 1000)
+                or len(cache) > MAX_CACHE_ENTRIES) and _compact(cache):
+            return
+        _write_lines(new_entries, "a")
+        _cache_lines += len(new_entries)
+    except OSError as e:
+        log_message(f"No se pudo guardar la caché de ffprobe: {e}", "WARNING")
+
+def _number(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse(data):
+    fmt = data.get("format") or {}
+    streams = []
+    for stream in data.get("streams") or []:
+        entry = {name: stream.get(name) for name in STREAM_FIELDS if name in stream}
+        for name in ("bit_rate", "sample_rate"):
+            if name in entry:
+                entry[name] = _number(entry[name], int)
+        if "duration" in entry:
+            entry["duration"] = _number(entry["duration"])
+        streams.append(entry)
+    return {
+        "format_name": fmt.get("format_name"),
+        "duration": _number(fmt.get("duration")),
+        "bit_rate": _number(fmt.get("bit_rate"), int),
+        "streams": streams,
+        "error": None,
+    }
+
+
+def _run_ffprobe(ffprobe_path, path):
+    """Ejecuta ffprobe sobre un archivo. Retorna el resultado, o None si
+    ffprobe no pudo ejecutarse (en ese caso no se guarda en la caché)."""
+    command = [
+        ffprobe_path, "-v", "error", "-print_format", "json",
+        "-show_format", "-show_streams", path,
+    ]
+    try:
+        process = subprocess.run(
+            command, capture_output=True, text=True, encoding="utf-8",
+            errors="replace", check=False,
+        )
+    except OSError as e:
+        log_message(f"No se pudo ejecutar ffprobe ({ffprobe_path}): {e}", "ERROR")
+        return None
+    try:
+        data = json.loads(process.stdout or "{}")
+    except ValueError:
+        data = {}
+    result = _parse(data)
+    if process.returncode != 0 or not result["streams"]:
+        # Archivo corrupto o no multimedia: también se guarda, porque
+        # mientras no cambie volvería a dar el mismo resultado.
+        result["error"] = process.stderr.strip() or "sin streams"
+    return result
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _missing(path, error):
+    return {
+        "path": path, "size": None, "format_name": None, "duration": None,
+        "bit_rate": None, "streams": [], "error": error,
+    }
+
+
+def _workers(count):
+    workers = get_config_value("media_probe_workers", 0) or min(4, os.cpu_count() or 1)
+    return max(1, min(int(workers), count))
+
+
+def inspect_files(paths, ffprobe_path=None, workers=None):
+    """
+    Inspecciona varios archivos con ffprobe, usando la caché para los que no
+    han cambiado y varios procesos a la vez para el resto.
+
+    Args:
+        paths (list): Rutas de los archivos
+        ffprobe_path (str): Ejecutable de ffprobe (por defecto, el del PATH)
+        workers (int): Procesos de ffprobe simultáneos (por defecto
+                       'media_probe_workers', o según los núcleos)
+
+    Returns:
+        dict: {ruta: resultado}. Cada resultado tiene 'path', 'size',
+              'format_name', 'duration' (s), 'bit_rate' (bit/s), 'streams'
+              (lista de dicts con 'codec_type', 'codec_name', ...) y 'error'
+              (None si el archivo se pudo leer). Los archivos inexistentes o
+              que no se pudieron probar tienen 'streams' vacío y 'error'.
+    """
+    results = {}
+    pending = []
+    with _cache_lock:
+        cache = _load_cache()
+        for path in dict.fromkeys(paths):
+            stamp = _stamp(path)
+            if stamp is None:
+                results[path] = _missing(path, "archivo no encontrado")
+                continue
+            cached = cache.get(os.path.realpath(path))
+            if cached and cached.get("stamp") == stamp:
+                results[path] = dict(cached["result"], path=path, size=stamp[0])
+            else:
+                pending.append((path, stamp))
+
+    if not pending:
+        return results
+
+    ffprobe_path = ffprobe_path or shutil.which("ffprobe")
+    if not ffprobe_path:
+        for path, _ in pending:
+            results[path] = _missing(path, "ffprobe no encontrado")
+        return results
+
+    count = workers or _workers(len(pending))
+    with ThreadPoolExecutor(max_workers=max(1, count)) as executor:
+        probed = list(executor.map(lambda item: _run_ffprobe(ffprobe_path, item[0]), pending))
+
+    now = time.time()
+    new_entries = []
+    with _cache_lock:
+        cache = _load_cache()
+        for (path, stamp), result in zip(pending, probed):
+            if result is None:
+                results[path] = _missing(path, "ffprobe no pudo ejecutarse")
+                continue
+            entry = {
+                "path": os.path.realpath(path), "stamp": stamp,
+                "probed_at": now, "result": result,
+            }
+            cache[entry["path"]] = entry
+            new_entries.append(entry)
+            results[path] = dict(result, path=path, size=stamp[0])
+        if new_entries:
+            _save_cache(cache, new_entries)
+    return results
+
+
+def inspect_file(path, ffprobe_path=None):
+    """inspect_files() para un solo archivo."""
+    return inspect_files([path], ffprobe_path, workers=1)[path]
+
+
+def streams_of(result, codec_type):
+    """Streams de un tipo ('video', 'audio', 'subtitle') del resultado."""
+    return [s for s in result["streams"] if s.get("codec_type") == codec_type]
+
+
+def has_audio(result):
+    return bool(streams_of(result, "audio"))
+
+
+def has_video(result):
+    # Las carátulas incrustadas (mjpeg/png) aparecen como stream de video.
+    return any(
+        s.get("codec_name") not in ("mjpeg", "png") for s in streams_of(result, "video")
+    )
+
+
+def clear_cache():
+    """Vacía la caché de resultados (en memoria y en disco)."""
+    global _cache, _cache_lines
+    with _cache_lock:
+        _cache, _cache_lines = {}, 0
+        try:
+            os.remove(CACHE_FILE)
+        except OSError:
+            pass
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+from config.config_manager import CONFIG_FILE, get_config_value
+from utils.logger import log_message
+
+from .canonical import canonical_key
+from .downloader import run_yt_dlp
+from .platforms import get_platform_name
+
+# Caché del info JSON de yt-dlp ('-J') por URL canónica. Los intentos de una
+# misma descarga y las descargas posteriores del mismo medio usan
+# '--load-info-json' en lugar de volver a extraer la página.
+CACHE_DIR = os.path.join(os.path.dirname(CONFIG_FILE), "info_cache")
+
+# Entradas que se mantienen ya parseadas en memoria
+_MEMORY_ENTRIES = 32
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cache_path(url):
+    platform, media_id = canonical_key(url)
+    digest = hashlib.sha1(f"{platform}:{media_id}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+
+def _ttl():
+    return get_config_value("metadata_cache_ttl", 3 * 3600)
+
+
+def _max_bytes():
+    return int(get_config_value("metadata_cache_max_mb", 50) * 1024 * 1024)
+
+
+def _remember(path, info):
+    with _lock:
+        _memory[path] = info
+        _memory.move_to_end(path)
+        while len(_memory) > _MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def lookup(url):
+    """
+    Busca el info JSON de la URL en la caché.
+
+    Returns:
+        tuple: (info dict, ruta del archivo JSON) o (None, None) si no hay una
+               entrada vigente
+    """
+    path = _cache_path(url)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    if time.time() - stat.st_mtime > _ttl():
+        invalidate(url)
+        return None, None
+
+    with _lock:
+        info = _memory.get(path)
+    if info is None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            invalidate(url)
+            return None, None
+    # La fecha de modificación marca cuándo se extrajo (TTL) y la de acceso,
+    # fijada explícitamente porque Android suele montar con noatime, el
+    # último uso (LRU).
+    now = time.time()
+    if now - stat.st_atime > 60:
+        try:
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            pass
+    _remember(path, info)
+    return info, path
+
+
+def store(url, info_text):
+    """Guarda el info JSON (texto) de la URL y aplica el límite de tamaño."""
+    info = json.loads(info_text)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(url)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(info_text)
+    os.replace(tmp_path, path)
+    _remember(path, info)
+    prune()
+    return info, path
+
+
+def invalidate(url):
+    """Elimina la entrada de la URL (p. ej. si sus enlaces de formato caducaron)."""
+    _remove(_cache_path(url))
+
+
+def prune():
+    """Elimina entradas caducadas y las menos usadas hasta respetar el límite."""
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    ttl = _ttl()
+    now = time.time()
+    entries = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if now - stat.st_mtime > ttl:
+            _remove(path)
+            continue
+        entries.append((stat.st_atime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    limit = _max_bytes()
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path):
+    with _lock:
+        _memory.pop(path, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def get_info(url, verbose=False, cookies_file=None, refresh=False):
+    """
+    Retorna el info JSON de la URL, extrayéndolo con yt-dlp solo si no está en
+    la caché (o si refresh=True).
+
+    Returns:
+        tuple: (info dict, ruta del archivo JSON) o (None, None) si la
+               extracción falla
+    """
+    if not refresh:
+        info, path = lookup(url)
+        if info is not None:
+            log_message("Metadatos reutilizados de la caché.", "INFO", url)
+            return info, path
+
+    platform = get_platform_name(url)
+    try:
+        process = run_yt_dlp(
+            args=["-J", "--no-playlist", "--no-warnings"],
+            url=url,
+            platform=platform,
+            verbose=verbose,
+            cookies_file=cookies_file,
+        )
+        return store(url, process.stdout)
+    except (subprocess.CalledProcessError, ValueError, OSError) as e:
+        log_message(f"No se pudieron extraer los metadatos: {e}", "WARNING", url, platform)
+        return None, None
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from config.config_manager import get_config_value
+from config.settings import get_logs_dir
+from utils.logger import log_message
+
+from . import progress
+
+# Un registro JSONL por trabajo de descarga (metrics.jsonl, junto al log) con
+# los tiempos de cada fase, bytes, intentos y resultado. Los tiempos de fase
+# salen de los eventos de core.progress del trabajo; las fases que no pasan
+# por yt-dlp (extracción previa de metadatos, fusión manual) se miden con
+# JobMetrics.phase().
+
+METRICS_FILENAME = "metrics.jsonl"
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_subscribed = False
+
+
+def get_metrics_file():
+    """Ruta del archivo de métricas (en el directorio de logs)."""
+    return os.path.join(get_logs_dir(), METRICS_FILENAME)
+
+
+def is_enabled():
+    return bool(get_config_value("collect_metrics", True))
+
+
+class JobMetrics:
+    """Acumula las métricas de un trabajo hasta que se llama a finish()."""
+
+    def __init__(self, job_id, url, media_type, platform=None):
+        self.job_id = job_id
+        self.url = url
+        self.media_type = media_type
+        self.platform = platform
+        self.formats = None
+        self.audio_action = None
+        self.media_duration = None
+        self.status = None
+        self.attempts = 0
+        self.phases = {}
+        self._bytes = {}
+        self._current = None
+        self._current_since = None
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _close_phase(self, now):
+        if self._current:
+            elapsed = now - self._current_since
+            self.phases[self._current] = self.phases.get(self._current, 0.0) + elapsed
+        self._current = None
+
+    def on_event(self, event):
+        """Actualiza fases y bytes con un evento de progreso del trabajo."""
+        now = time.monotonic()
+        with self._lock:
+            if event.phase != self._current:
+                self._close_phase(now)
+                self._current, self._current_since = event.phase, now
+            if event.phase == "download" and event.status == "finished" and event.total_bytes:
+                self._bytes[event.filename or len(self._bytes)] = event.total_bytes
+
+    @contextmanager
+    def phase(self, name):
+        """Mide una fase que no se ejecuta dentro de yt-dlp."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.monotonic() - started
+
+    def end_run(self):
+        """Cierra la fase en curso al terminar una ejecución de yt-dlp."""
+        with self._lock:
+            self.attempts += 1
+            self._close_phase(time.monotonic())
+
+    def finish(self, result):
+        """
+        Escribe el registro del trabajo.
+
+        Args:
+            result: Resultado de la descarga (ruta final, True o False)
+        """
+        with _jobs_lock:
+            _jobs.pop(self.job_id, None)
+        with self._lock:
+            self._close_phase(time.monotonic())
+            output_path = result if isinstance(result, str) else None
+            status = self.status or ("ok" if result else "failed")
+            downloaded = sum(self._bytes.values())
+            if not downloaded and output_path and os.path.exists(output_path):
+                downloaded = os.path.getsize(output_path)
+            record = {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "job_id": self.job_id,
+                "url": self.url,
+                "platform": self.platform,
+                "media_id": _media_id(self.url),
+                "media_type": self.media_type,
+                "formats": self.formats,
+                "audio_action": self.audio_action,
+                "media_duration": self.media_duration,
+                "bytes": downloaded,
+                "wall_time": round(time.monotonic() - self._started, 3),
+                "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                "attempts": self.attempts,
+                "status": status,
+                "output_path": output_path,
+            }
+        _append_record(record)
+        return record
+
+
+def _media_id(url):
+    from .canonical import canonical_key  # canonical importa downloader
+    try:
+        return canonical_key(url)[1]
+    except Exception:
+        return None
+
+
+def _append_record(record):
+    path = get_metrics_file()
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Una sola escritura con O_APPEND: los registros de trabajos en
+        # paralelo no se mezclan.
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        log_message(f"No se pudo escribir el registro de métricas: {e}", "WARNING")
+
+
+def _dispatch(event):
+    with _jobs_lock:
+        job = _jobs.get(event.job_id)
+    if job:
+        job.on_event(event)
+
+
+def start_job(job_id, url, media_type, platform=None):
+    """
+    Empieza a medir un trabajo. Retorna su JobMetrics, o None si la
+    recolección de métricas está desactivada ('collect_metrics').
+    """
+    global _subscribed
+    if not is_enabled():
+        return None
+    job = JobMetrics(job_id, url, media_type, platform)
+    with _jobs_lock:
+        _jobs[job_id] = job
+        if not _subscribed:
+            progress.subscribe(_dispatch)
+            _subscribed = True
+    return job
+
+
+def phase(job, name):
+    """job.phase(name), o un contexto vacío si el trabajo no tiene métricas."""
+    return job.phase(name) if job else nullcontext()
+
+
+def get_job(job_id):
+    """JobMetrics activo para job_id, o None."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def read_records(path=None):
+    """Genera los registros del archivo de métricas (omite líneas corruptas)."""
+    path = path or get_metrics_file()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except OSError:
+        return
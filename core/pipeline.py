@@ -0,0 +1,595 @@
+import os
+import queue
+import re
+import subprocess
+import threading
+
+from config.config_manager import get_config_value
+from utils.colors import Colors
+from utils.logger import log_message
+from utils.path_manager import create_directories
+
+from . import (
+    archive, audio_planner, checkpoint, ffmpeg_utils, format_planner, media_inspector,
+    metadata_cache, metrics, progress,
+)
+from .downloader import is_safe_path, run_yt_dlp
+from .platforms import get_platform_name
+from .video import download_video_for_job
+from .workers import print_job_output, routed_stdout, run_captured
+
+# Batch en dos etapas: los trabajadores de red solo descargan los streams
+# originales (sin '-x' ni fusión) y un pool de CPU, del tamaño del número de
+# núcleos, hace con ffmpeg la conversión, la fusión y las etiquetas. Así la
+# red no espera a ffmpeg ni ffmpeg a la red. Entre las dos etapas hay una
+# cola acotada: si la CPU se retrasa, los trabajadores de red se bloquean al
+# entregar, y en disco nunca hay más de (red + cola + CPU) descargas sin
+# procesar.
+
+# Directorio (dentro del de salida) para los audios originales aún sin convertir
+STAGING_DIR = ".tud-pipeline"
+
+# Argumentos de ffmpeg por formato de audio de destino
+AUDIO_CODECS = {
+    "mp3": ["-c:a", "libmp3lame"],
+    "m4a": ["-c:a", "aac"],
+    "aac": ["-c:a", "aac"],
+    "opus": ["-c:a", "libopus"],
+    "ogg": ["-c:a", "libvorbis"],
+    "flac": ["-c:a", "flac"],
+    "wav": ["-c:a", "pcm_s16le"],
+}
+
+# Formatos sin pérdida: la calidad pedida no se aplica
+LOSSLESS_FORMATS = ("flac", "wav")
+
+# Contenedores de audio en los que ffmpeg puede incrustar la carátula
+COVER_AUDIO_EXTENSIONS = ("mp3", "m4a", "flac")
+
+# Sufijo de las miniaturas descargadas en la etapa de red ('<id>.thumb.<ext>'),
+# que la etapa de CPU incrusta como carátula
+THUMBNAIL_SUFFIX = ".thumb"
+
+_STOP = object()
+
+
+def default_cpu_workers():
+    return max(1, int(get_config_value("pipeline_cpu_workers", 0) or os.cpu_count() or 1))
+
+
+def _queue_size():
+    return max(1, int(get_config_value("pipeline_queue_size", 2)))
+
+
+def run_pipeline(items, fetch, process, network_workers=1, cpu_workers=None,
+                 queue_size=None, describe=None, on_result=None):
+    """
+    Ejecuta fetch (red) y process (CPU) sobre cada elemento en dos pools
+    unidos por una cola acotada.
+
+    Args:
+        items (list): Elementos a procesar
+        fetch (callable): fetch(item) -> (resultado, tarea). Si tarea es None,
+                          resultado es el final y no hay etapa de CPU
+        process (callable): process(tarea) -> resultado final
+        network_workers (int): Descargas simultáneas
+        cpu_workers (int): Procesos de ffmpeg simultáneos (por defecto
+                           'pipeline_cpu_workers' o el número de núcleos)
+        queue_size (int): Descargas terminadas que pueden esperar a la CPU
+                          (por defecto 'pipeline_queue_size')
+        describe (callable): Cabecera de cada elemento en la salida
+        on_result (callable): on_result(item, resultado, error) al terminar
+                              cada elemento (desde el hilo que lo terminó)
+
+    Returns:
+        list: Un diccionario por elemento (en el orden de entrada) con las
+              claves 'item', 'result' y 'error', como core.workers.run_jobs
+    """
+    items = list(items)
+    total = len(items)
+    results = [None] * total
+    outputs = [""] * total
+    cpu_workers = cpu_workers or default_cpu_workers()
+    handoff = queue.Queue(maxsize=queue_size or _queue_size())
+    pending = queue.Queue()
+    for index, item in enumerate(items):
+        pending.put((index, item))
+
+    def complete(index, result, error, output):
+        item = items[index]
+        results[index] = {"item": item, "result": result, "error": error}
+        if on_result:
+            try:
+                on_result(item, result, error)
+            except Exception as e:
+                log_message(f"Error al registrar el resultado de {item}: {e}", "ERROR")
+        label = describe(item) if describe else str(item)
+        print_job_output(stream, index, total, label, outputs[index] + output, error)
+
+    def network_worker():
+        while True:
+            try:
+                index, item = pending.get_nowait()
+            except queue.Empty:
+                return
+            fetched, error, output = run_captured(stream, fetch, item)
+            if error is not None or fetched[1] is None:
+                complete(index, None if error else fetched[0], error, output)
+                continue
+            outputs[index] = output
+            # Bloquea mientras la etapa de CPU tenga la cola llena.
+            handoff.put((index, fetched[1]))
+
+    def cpu_worker():
+        while True:
+            entry = handoff.get()
+            if entry is _STOP:
+                return
+            index, task = entry
+            result, error, output = run_captured(stream, process, task)
+            complete(index, result, error, output)
+
+    with routed_stdout() as stream:
+        cpu_threads = [
+            threading.Thread(target=cpu_worker, name=f"tud-cpu-{i}", daemon=True)
+            for i in range(cpu_workers)
+        ]
+        network_threads = [
+            threading.Thread(target=network_worker, name=f"tud-net-{i}", daemon=True)
+            for i in range(max(1, min(network_workers, total)))
+        ]
+        for thread in cpu_threads + network_threads:
+            thread.start()
+        for thread in network_threads:
+            thread.join()
+        for _ in cpu_threads:
+            handoff.put(_STOP)
+        for thread in cpu_threads:
+            thread.join()
+    return results
+
+
+# --- Etapas de audio y video ---
+
+def _base_output_dir(output_path, platform, media_type):
+    if output_path == "/storage/emulated/0/Download" or output_path == "/data/data/com.termux/files/home/downloads":
+        return output_path
+    return os.path.join(output_path, platform, media_type)
+
+
+def _archive_entry(info):
+    """Entrada del archivo de descargas tal como la escribiría yt-dlp."""
+    if info and info.get("extractor_key") and info.get("id"):
+        return f"{info['extractor_key'].lower()} {info['id']}"
+    return None
+
+
+def _title_stem(info, fallback):
+    """
+    Nombre del archivo final a partir del título (como '%(title)s' en las
+    descargas normales), sin caracteres que el almacenamiento compartido de
+    Android no admite.
+    """
+    title = (info or {}).get("title") or fallback
+    stem = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", title).strip(" .")
+    return stem[:200] or fallback
+
+
+def _thumbnail_args(directory):
+    """Argumentos de yt-dlp para guardar la miniatura sin incrustarla."""
+    return [
+        "--write-thumbnail",
+        "-o", "thumbnail:" + os.path.join(directory, f"%(id)s{THUMBNAIL_SUFFIX}.%(ext)s"),
+    ]
+
+
+def _find_thumbnail(directory, media_id):
+    """Miniatura guardada por _thumbnail_args() para media_id, o None."""
+    prefix = f"{media_id}{THUMBNAIL_SUFFIX}."
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return None
+    for name in sorted(names):
+        if name.startswith(prefix) and not name.endswith(".part"):
+            return os.path.join(directory, name)
+    return None
+
+
+def _remove_thumbnail(path):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _discard_staged(path):
+    """Borra un archivo de preparación y el directorio si queda vacío."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass  # Quedan otros trabajos en preparación
+
+
+def _metadata_args(info):
+    args = []
+    for key, value in (
+        ("title", info.get("title")),
+        ("artist", info.get("artist") or info.get("uploader")),
+        ("date", (info.get("upload_date") or "")[:4] or None),
+        ("comment", info.get("webpage_url")),
+    ):
+        if value:
+            args.extend(["-metadata", f"{key}={value}"])
+    return args
+
+
+def _start(url, media_type, output_path, use_archive):
+    """
+    Comprobaciones comunes antes de descargar.
+
+    Returns:
+        tuple: (resultado final o None para continuar, job_id, job, plataforma,
+                directorio de salida)
+    """
+    platform = get_platform_name(url)
+    job_id = progress.new_job_id()
+    job = metrics.start_job(job_id, url, media_type, platform)
+    if not is_safe_path(os.path.expanduser("~"), output_path):
+        print(f"{Colors.RED}ERROR: Ruta de salida insegura: {output_path}{Colors.RESET}")
+        return False, job_id, job, platform, None
+    if use_archive and archive.is_downloaded(url, media_type):
+        print(
+            f"{Colors.GREEN}Ya descargado anteriormente (archivo de descargas). "
+            f"Se omite: {url}{Colors.RESET}"
+        )
+        if job:
+            job.status = "skipped"
+        return True, job_id, job, platform, None
+    base_output_dir = _base_output_dir(output_path, platform, media_type)
+    if not create_directories(base_output_dir):
+        return False, job_id, job, platform, None
+    return None, job_id, job, platform, base_output_dir
+
+
+def _finish(job, result):
+    if job:
+        job.finish(result)
+    return result
+
+
+def fetch_audio(url, output_path, format, bitrate, cookies_file=None, verbose=False):
+    """
+    Etapa de red del audio: descarga el mejor stream de audio original en
+    el directorio de preparación, sin convertirlo.
+
+    Returns:
+        tuple: (resultado, tarea para process_audio o None si ya terminó)
+    """
+    use_archive = get_config_value("use_download_archive", True)
+    done, job_id, job, platform, base_output_dir = _start(url, "audio", output_path, use_archive)
+    if done is not None:
+        return _finish(job, done), None
+    if job:
+        job.formats = format
+
+    with metrics.phase(job, "extract"):
+        info, info_json = metadata_cache.get_info(url, verbose=verbose, cookies_file=cookies_file)
+    plan = audio_planner.plan_audio(info, format) if info else None
+    if plan:
+        print(f"{Colors.CYAN}Audio elegido: {audio_planner.describe_plan(plan, format)}{Colors.RESET}")
+        if job:
+            job.audio_action = plan["action"]
+            job.media_duration = info.get("duration")
+    staging_dir = os.path.join(base_output_dir, STAGING_DIR)
+    create_directories(staging_dir)
+    try:
+        process = run_yt_dlp(
+            args=[
+                "-f", plan["selector"] if plan else "bestaudio/best",
+                "--continue",
+                "--no-playlist",
+                # Por ID: dos trabajos con el mismo título no comparten archivo.
+                "-o", os.path.join(staging_dir, "%(id)s.%(ext)s"),
+            ] + _thumbnail_args(staging_dir),
+            url=url,
+            platform=platform,
+            verbose=verbose,
+            cookies_file=cookies_file,
+            stream=True,
+            job_id=job_id,
+            info_json=info_json,
+            report_paths=True,
+        )
+    except (subprocess.CalledProcessError, OSError) as e:
+        # Los restos '<id>.*.part' se conservan: con '--continue' el siguiente
+        # intento del mismo trabajo reanuda la descarga.
+        print(f"{Colors.RED}Error en la descarga de audio: {e}{Colors.RESET}")
+        metadata_cache.invalidate(url)
+        log_message(f"Error en la descarga de audio (pipeline): {e}", "ERROR", url, platform)
+        return _finish(job, False), None
+    if not process.filepaths:
+        print(f"{Colors.RED}yt-dlp no reportó el archivo descargado.{Colors.RESET}")
+        return _finish(job, False), None
+
+    source = process.filepaths[-1]
+    media_id = os.path.splitext(os.path.basename(source))[0]
+    stem = _title_stem(info, media_id)
+    return None, {
+        "kind": "audio",
+        "url": url,
+        "platform": platform,
+        "job": job,
+        "info": info or {},
+        "source": source,
+        "thumbnail": _find_thumbnail(staging_dir, media_id),
+        "output": os.path.join(base_output_dir, f"{stem}.{plan['ext'] if plan else format}"),
+        "format": format,
+        "plan": plan,
+        "bitrate": bitrate,
+        "archive": use_archive,
+    }
+
+
+def _audio_quality_args(format, bitrate):
+    if format in LOSSLESS_FORMATS:
+        return []
+    bitrate = str(bitrate or "best")
+    if bitrate.lower() in ("best", "0"):
+        return ["-q:a", "0"] if format in ("mp3", "ogg") else ["-b:a", "256k"]
+    return ["-b:a", bitrate.lower()]
+
+
+def _run_ffmpeg(command, output_file):
+    """Ejecuta ffmpeg escribiendo en un temporal que se renombra al terminar."""
+    root, ext = os.path.splitext(output_file)
+    tmp_file = f"{root}.tud-tmp{ext}"
+    try:
+        completed = subprocess.run(
+            command + [tmp_file], capture_output=True, text=True,
+            encoding="utf-8", errors="replace", check=False,
+        )
+    except OSError as e:
+        return False, str(e)
+    if completed.returncode != 0:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        return False, completed.stderr.strip()[-2000:]
+    os.replace(tmp_file, output_file)
+    return True, None
+
+
+def _source_action(task, ffmpeg_dir):
+    """
+    Operación para el archivo realmente descargado y ruta final.
+
+    La decisión sale del códec que ffprobe lee en el archivo, no del plan:
+    si el formato planificado ya no estaba disponible, yt-dlp pudo descargar
+    otro códec. El plan solo se usa si ffprobe no puede leerlo.
+
+    Returns:
+        tuple: (COPY, REMUX o TRANSCODE, ruta del archivo final)
+    """
+    source, output, plan = task["source"], task["output"], task["plan"]
+    result = media_inspector.inspect_file(
+        source, os.path.join(ffmpeg_dir, "ffprobe") if ffmpeg_dir else None
+    )
+    streams = media_inspector.streams_of(result, "audio")
+    codec = audio_planner.normalize_codec(streams[0].get("codec_name")) if streams else None
+    if not codec:
+        return (plan["action"] if plan else audio_planner.TRANSCODE), output
+
+    source_ext = os.path.splitext(source)[1].lstrip(".").lower()
+    action = audio_planner.action_for(
+        codec, task["format"], source_ext, media_inspector.has_video(result)
+    )
+    if task["format"] == "best":
+        # 'best' conserva el códec descargado, con su extensión natural.
+        _, ext = audio_planner.target_of("best", codec, source_ext)
+        output = f"{os.path.splitext(output)[0]}.{ext}"
+    if plan and action != plan["action"]:
+        print(
+            f"{Colors.YELLOW}Se descargó {codec} en lugar de la pista planificada "
+            f"({plan['codec']}); operación: {action}.{Colors.RESET}"
+        )
+    return action, output
+
+
+def _with_cover(command, cover):
+    """
+    command (sin archivo de salida) con cover como entrada adicional,
+    incrustada como carátula JPEG (attached_pic), igual que '--embed-thumbnail'.
+    """
+    first_map = command.index("-map")
+    return (
+        command[:first_map] + ["-i", cover] + command[first_map:]
+        + ["-map", "1:v:0", "-c:v", "mjpeg", "-disposition:v:0", "attached_pic"]
+    )
+
+
+def process_audio(task):
+    """Etapa de CPU del audio: convierte y etiqueta el stream descargado."""
+    job = task["job"]
+    plan = task["plan"]
+    ffmpeg_dir = ffmpeg_utils.get_ffmpeg_path()
+    action, output = _source_action(task, ffmpeg_dir)
+    thumbnail = task.get("thumbnail")
+    if os.path.exists(output):
+        print(f"{Colors.GREEN}[+] Ya existe: {output}{Colors.RESET}")
+        for path in (task["source"], thumbnail):
+            if path:
+                _discard_staged(path)
+        return _finish(job, output)
+    if job:
+        job.audio_action = action
+
+    cover = thumbnail if os.path.splitext(output)[1].lstrip(".") in COVER_AUDIO_EXTENSIONS else None
+    command = [
+        os.path.join(ffmpeg_dir, "ffmpeg") if ffmpeg_dir else "ffmpeg",
+        "-y", "-v", "error", "-i", task["source"], "-map", "0:a:0",
+    ]
+    if action != audio_planner.TRANSCODE:
+        # El códec descargado ya es el de destino: solo se copia el stream.
+        command += ["-c:a", "copy"]
+        phase = "remux"
+    else:
+        command += AUDIO_CODECS.get(task["format"], [])
+        command += _audio_quality_args(task["format"], task["bitrate"])
+        phase = "transcode"
+    command += _metadata_args(task["info"])
+    with metrics.phase(job, phase):
+        if cover:
+            ok, error = _run_ffmpeg(_with_cover(command, cover), output)
+            if not ok:
+                log_message(f"No se pudo incrustar la carátula: {error}", "WARNING",
+                            task["url"], task["platform"])
+        if not cover or not ok:
+            ok, error = _run_ffmpeg(command + ["-vn"], output)
+    # El original descargado no se reutiliza: se borra también si ffmpeg falla
+    # para que no se acumule en el directorio de preparación.
+    for path in (task["source"], thumbnail):
+        if path:
+            _discard_staged(path)
+    if not ok:
+        print(f"{Colors.RED}Error al convertir el audio: {error}{Colors.RESET}")
+        log_message(f"Error de ffmpeg al convertir {task['source']}: {error}", "ERROR",
+                    task["url"], task["platform"])
+        return _finish(job, False)
+
+    audio_planner.record(plan, task["info"].get("duration"), action)
+    if task["archive"]:
+        entry = _archive_entry(task["info"])
+        if entry:
+            archive.get_archive("audio").add(entry)
+    print(f"{Colors.GREEN}[+] Archivo final: {output}{Colors.RESET}")
+    return _finish(job, output)
+
+
+def fetch_video(url, quality, output_path, cookies_file=None, verbose=False):
+    """
+    Etapa de red del video: descarga por separado las pistas de video y de
+    audio del plan de formatos (como componentes '<id>.f<format_id>.<ext>',
+    ver core.checkpoint), sin fusionarlas. Si el plan es un formato combinado
+    no hay nada que fusionar y se usa la descarga normal.
+
+    Returns:
+        tuple: (resultado, tarea para process_video o None si ya terminó)
+    """
+    use_archive = get_config_value("use_download_archive", True)
+    is_short = "/shorts/" in url
+    done, job_id, job, platform, base_output_dir = _start(url, "video", output_path, use_archive)
+    if done is not None:
+        return _finish(job, done), None
+
+    with metrics.phase(job, "extract"):
+        info, info_json = metadata_cache.get_info(url, verbose=verbose, cookies_file=cookies_file)
+    plan = format_planner.plan_formats(info, quality, is_short) if info else None
+    if not plan or plan["combined"]:
+        # Sin pistas separadas no hay nada que fusionar: descarga normal, que
+        # registra sus métricas en este mismo trabajo.
+        result = download_video_for_job(
+            job_id, job, url, quality, output_path, False, verbose, cookies_file,
+            False, use_archive,
+        )
+        return _finish(job, result), None
+
+    print(
+        f"{Colors.CYAN}Formatos elegidos ({quality}): "
+        f"{format_planner.describe_plan(plan)}{Colors.RESET}"
+    )
+    if job:
+        job.formats = f"{plan['video']['format_id']}+{plan['audio']['format_id']}"
+
+    task = {
+        "kind": "video",
+        "url": url,
+        "platform": platform,
+        "job": job,
+        "info": info,
+        "video": checkpoint.component_path(base_output_dir, info, plan["video"]),
+        "audio": checkpoint.component_path(base_output_dir, info, plan["audio"]),
+        "output": checkpoint.final_path(base_output_dir, info),
+        "archive": use_archive,
+    }
+    if os.path.exists(task["output"]) or checkpoint.verified_components(base_output_dir, info, plan):
+        print(f"{Colors.GREEN}Componentes ya descargados; solo falta fusionar.{Colors.RESET}")
+        return None, task
+
+    try:
+        run_yt_dlp(
+            args=[
+                # La coma descarga cada formato por separado, sin fusionar.
+                "-f", f"{plan['video']['format_id']},{plan['audio']['format_id']}",
+                "--continue",
+                "--no-playlist",
+                "-o", os.path.join(base_output_dir, "%(id)s.f%(format_id)s.%(ext)s"),
+            # Los shorts no llevan carátula, como en la descarga normal.
+            ] + ([] if is_short else _thumbnail_args(base_output_dir)),
+            url=url,
+            platform=platform,
+            verbose=verbose,
+            cookies_file=cookies_file,
+            stream=True,
+            job_id=job_id,
+            info_json=info_json,
+        )
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"{Colors.RED}Error en la descarga de video: {e}{Colors.RESET}")
+        metadata_cache.invalidate(url)
+        log_message(f"Error en la descarga de video (pipeline): {e}", "ERROR", url, platform)
+        return _finish(job, False), None
+    if not checkpoint.verified_components(base_output_dir, info, plan):
+        print(f"{Colors.RED}Las pistas descargadas están incompletas.{Colors.RESET}")
+        return _finish(job, False), None
+    return None, task
+
+
+def process_video(task):
+    """Etapa de CPU del video: fusiona las pistas, añade las etiquetas e
+    incrusta la miniatura descargada en la etapa de red."""
+    job = task["job"]
+    output = task["output"]
+    thumbnail = _find_thumbnail(os.path.dirname(output), task["info"]["id"])
+    if os.path.exists(output):
+        print(f"{Colors.GREEN}[+] Ya existe: {output}{Colors.RESET}")
+        _remove_thumbnail(thumbnail)
+        return _finish(job, output)
+
+    # Sin ffprobe get_ffmpeg_path() retorna None: se usa el ffmpeg del PATH
+    # (ruta relativa 'ffmpeg') y la fusión copia los streams sin inspeccionarlos.
+    ffmpeg_dir = ffmpeg_utils.get_ffmpeg_path() or ""
+    root, ext = os.path.splitext(output)
+    tmp_file = f"{root}.tud-tmp{ext}"
+    with metrics.phase(job, "merge"):
+        merged = ffmpeg_utils.manual_merge_and_cleanup(
+            task["video"], task["audio"], tmp_file, ffmpeg_dir,
+            metadata=_metadata_args(task["info"]), thumbnail=thumbnail,
+        )
+        if not merged and thumbnail:
+            # Como en la descarga normal, un fallo de la carátula no impide
+            # obtener el video: se repite la fusión sin ella.
+            print(f"{Colors.YELLOW}Se repite la fusión sin la miniatura...{Colors.RESET}")
+            merged = ffmpeg_utils.manual_merge_and_cleanup(
+                task["video"], task["audio"], tmp_file, ffmpeg_dir,
+                metadata=_metadata_args(task["info"]),
+            )
+    if merged:
+        _remove_thumbnail(thumbnail)
+    if not merged:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return _finish(job, False)
+    os.replace(tmp_file, output)
+    if task["archive"]:
+        entry = _archive_entry(task["info"])
+        if entry:
+            archive.get_archive("video").add(entry)
+    print(f"{Colors.GREEN}[+] Archivo final: {output}{Colors.RESET}")
+    return _finish(job, output)
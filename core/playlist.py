@@ -1,22 +1,200 @@
+import json
+import subprocess
+
+from config.config_manager import get_config_value
 from core.audio import download_audio
 from core.video import download_video
+from core.workers import run_jobs
+from utils.colors import Colors
+from utils.logger import log_message
+
+from .downloader import run_yt_dlp
+from .platforms import get_platform_name
+
+# Títulos con los que yt-dlp marca entradas que no se pueden descargar
+UNAVAILABLE_TITLES = {"[Private video]", "[Deleted video]", "[Unavailable video]"}
+
+# URL de una entrada a partir de su extractor ('ie_key') e ID, para las
+# entradas planas que yt-dlp devuelve sin URL completa
+ENTRY_URL_TEMPLATES = {
+    "Youtube": "https://www.youtube.com/watch?v={id}",
+    "Instagram": "https://www.instagram.com/p/{id}/",
+    "Twitter": "https://twitter.com/i/status/{id}",
+}
+
+
+def _entry_url(entry):
+    """URL descargable de una entrada plana, o None si no puede construirse."""
+    entry_url = entry.get("url") or entry.get("webpage_url")
+    if entry_url and "://" in entry_url:
+        return entry_url
+    # Algunos extractores dan como 'url' solo el ID del medio
+    media_id = entry.get("id") or entry_url
+    template = ENTRY_URL_TEMPLATES.get(entry.get("ie_key"))
+    if media_id and template:
+        return template.format(id=media_id)
+    return None
+
+
+def extract_playlist_entries(url, verbose, cookies_file):
+    """
+    Extrae la lista plana de entradas de una playlist sin descargar nada.
+
+    Returns:
+        list: Diccionarios con 'index', 'url', 'title' y 'available', ordenados
+              por posición en la playlist; None si la extracción falla
+    """
+    platform = get_platform_name(url)
+    try:
+        process = run_yt_dlp(
+            args=["--flat-playlist", "-J", "--no-warnings"],
+            url=url,
+            platform=platform,
+            verbose=verbose,
+            cookies_file=cookies_file,
+        )
+        info = json.loads(process.stdout)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        log_message(f"No se pudo expandir la playlist: {e}", "WARNING", url, platform)
+        return None
+
+    entries = []
+    for position, entry in enumerate(info.get("entries") or [], 1):
+        if not entry:
+            continue
+        entry_url = _entry_url(entry)
+        if not entry_url:
+            print(
+                f"{Colors.YELLOW}Entrada {position} sin URL descargable "
+                f"({entry.get('ie_key') or 'extractor desconocido'}), se omite.{Colors.RESET}"
+            )
+            log_message(
+                f"Entrada de playlist sin URL: id={entry.get('id')} ie_key={entry.get('ie_key')}",
+                "WARNING", url, platform,
+            )
+            continue
+        title = entry.get("title") or entry_url
+        entries.append({
+            "index": entry.get("playlist_index") or position,
+            "url": entry_url,
+            "title": title,
+            "available": title not in UNAVAILABLE_TITLES
+            and entry.get("availability") not in ("private", "needs_auth"),
+        })
+    entries.sort(key=lambda e: e["index"])
+    return entries
+
+
+def _download_entries(entries, download_entry, jobs, attempts=1):
+    """
+    Descarga las entradas de una playlist en un pool de trabajadores e
+    imprime un informe ordenado por posición.
+
+    Los reintentos se hacen en un solo nivel: attempts es 1 cuando
+    download_entry ya reintenta por su cuenta (download_video), y
+    'max_retries' cuando no (download_audio).
+
+    Returns:
+        bool: True si todas las entradas disponibles se descargaron
+    """
+    attempts = max(1, int(attempts))
+
+    def run_entry(entry):
+        if not entry["available"]:
+            print(f"{Colors.YELLOW}Entrada no disponible, se omite.{Colors.RESET}")
+            return "unavailable"
+        for attempt in range(1, attempts + 1):
+            if attempt > 1:
+                print(
+                    f"{Colors.YELLOW}Reintento {attempt}/{attempts} de la entrada "
+                    f"{entry['index']}...{Colors.RESET}"
+                )
+            if download_entry(entry["url"]):
+                return "ok"
+        return "failed"
+
+    results = run_jobs(
+        run_entry,
+        entries,
+        max_workers=max(1, jobs),
+        describe=lambda e: f"#{e['index']} {e['title']}",
+    )
+
+    counts = {"ok": 0, "failed": 0, "unavailable": 0}
+    print(f"\n{Colors.BOLD}{Colors.CYAN}Informe de la playlist:{Colors.RESET}")
+    for r in results:
+        status = r["result"] if r["error"] is None else "failed"
+        counts[status] += 1
+        color = {"ok": Colors.GREEN, "failed": Colors.RED}.get(status, Colors.YELLOW)
+        print(f"  {color}#{r['item']['index']:>3} [{status}]{Colors.RESET} {r['item']['title']}")
+    print(
+        f"  {Colors.GREEN}{counts['ok']} descargadas{Colors.RESET}, "
+        f"{Colors.RED}{counts['failed']} fallidas{Colors.RESET}, "
+        f"{Colors.YELLOW}{counts['unavailable']} no disponibles{Colors.RESET}"
+    )
+    log_message(
+        f"Playlist finalizada: {counts['ok']} descargadas, {counts['failed']} "
+        f"fallidas, {counts['unavailable']} no disponibles."
+    )
+    return counts["failed"] == 0
 
 
 def download_playlist_video(
-    url, quality, output_path, verbose, cookies_file, dry_run=False
+    url, quality, output_path, verbose, cookies_file, dry_run=False, jobs=None
 ):
-    """Descarga una playlist de videos."""
-    # is_playlist se establece en True dentro de download_video
-    return download_video(
-        url, quality, output_path, True, verbose, cookies_file, dry_run=dry_run
+    """
+    Descarga una playlist de videos.
+
+    La playlist se expande primero en entradas individuales que se descargan
+    en paralelo (jobs trabajadores, por defecto el valor 'parallel_jobs' de la
+    configuración). Si la expansión falla se usa una única invocación de yt-dlp.
+    """
+    entries = extract_playlist_entries(url, verbose, cookies_file)
+    if not entries:
+        # is_playlist se establece en True dentro de download_video
+        return download_video(
+            url, quality, output_path, True, verbose, cookies_file, dry_run=dry_run
+        )
+
+    print(
+        f"{Colors.GREEN}Playlist con {len(entries)} entradas.{Colors.RESET}"
+    )
+    return _download_entries(
+        entries,
+        lambda entry_url: download_video(
+            entry_url, quality, output_path, False, verbose, cookies_file,
+            dry_run=dry_run,
+        ),
+        jobs or get_config_value("parallel_jobs", 3),
+        attempts=1,  # download_video ya reintenta hasta 'max_retries'
     )
 
 
 def download_playlist_audio(
-    url, format, bitrate, output_path, verbose, cookies_file, dry_run=False
+    url, format, bitrate, output_path, verbose, cookies_file, dry_run=False, jobs=None
 ):
-    """Descarga una playlist de audios."""
-    # is_playlist se establece en True dentro de download_audio
-    return download_audio(
-        url, output_path, format, bitrate, True, verbose, cookies_file, dry_run=dry_run
+    """
+    Descarga una playlist de audios.
+
+    Igual que download_playlist_video: una descarga por entrada, en paralelo.
+    """
+    entries = extract_playlist_entries(url, verbose, cookies_file)
+    if not entries:
+        # is_playlist se establece en True dentro de download_audio
+        return download_audio(
+            url, output_path, format, bitrate, True, verbose, cookies_file,
+            dry_run=dry_run,
+        )
+
+    print(
+        f"{Colors.GREEN}Playlist con {len(entries)} entradas.{Colors.RESET}"
+    )
+    return _download_entries(
+        entries,
+        lambda entry_url: download_audio(
+            entry_url, output_path, format, bitrate, False, verbose, cookies_file,
+            dry_run=dry_run,
+        ),
+        jobs or get_config_value("parallel_jobs", 3),
+        attempts=get_config_value("max_retries", 3),
     )
@@ -0,0 +1,232 @@
+import json
+import re
+import threading
+import uuid
+from collections import namedtuple
+
+from utils.colors import Colors
+from utils.logger import log_message
+
+# Eventos de progreso tipados emitidos por run_yt_dlp. Cualquier consumidor
+# (la TUI, un sink de log, un exportador de métricas) puede suscribirse con
+# subscribe(callback) y recibirá los eventos de todos los trabajos.
+
+PHASES = ("extract", "download", "merge", "postprocess", "move")
+
+ProgressEvent = namedtuple(
+    "ProgressEvent",
+    [
+        "job_id",
+        "url",
+        "phase",
+        "status",
+        "downloaded_bytes",
+        "total_bytes",
+        "percent",
+        "speed",
+        "eta",
+        "filename",
+    ],
+    defaults=(None,) * 8,
+)
+ProgressEvent.__doc__ = """
+Evento de progreso de un trabajo.
+
+job_id: identificador del trabajo; url: URL procesada; phase: una de PHASES;
+status: 'started', 'downloading', 'finished', 'error'...; downloaded_bytes y
+total_bytes: bytes (int) o None; percent: 0-100 o None; speed: bytes/s (float)
+o None; eta: segundos (int) o None; filename: archivo en curso o None.
+"""
+
+# Marcadores de las plantillas '--progress-template' que añade run_yt_dlp
+DOWNLOAD_MARKER = "[tud-progress] "
+POSTPROCESS_MARKER = "[tud-pp] "
+
+PROGRESS_TEMPLATE_ARGS = [
+    "--progress-template",
+    "download:" + DOWNLOAD_MARKER + "%(progress.{status,downloaded_bytes,"
+    "total_bytes,total_bytes_estimate,speed,eta,filename})j",
+    "--progress-template",
+    "postprocess:" + POSTPROCESS_MARKER + "%(progress.{status,postprocessor})j",
+]
+
+# Postprocesadores de yt-dlp que corresponden a las fases de fusión y de
+# traslado del archivo final a su destino
+MERGE_POSTPROCESSORS = {"Merger", "FFmpegMerger"}
+MOVE_POSTPROCESSORS = {"MoveFiles"}
+
+# Línea de progreso de yt-dlp sin plantilla, p. ej.:
+# [download]  42.3% of ~  10.00MiB at    1.20MiB/s ETA 00:05 (frag 3/20)
+PROGRESS_RE = re.compile(
+    r"\[download\]\s+(?P<percent>[\d.]+)%\s+of\s+~?\s*(?P<total>\S+)"
+    r"(?:\s+at\s+(?P<speed>\S+))?(?:\s+ETA\s+(?P<eta>\S+))?"
+)
+
+# Línea de un extractor, p. ej. "[youtube] dQw4w9WgXcQ: Downloading webpage"
+EXTRACT_RE = re.compile(r"^\[(?!download\]|Merger\]|info\])[\w:]+\] ")
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+
+
+def new_job_id():
+    """Genera un identificador corto de trabajo."""
+    return uuid.uuid4().hex[:8]
+
+
+def subscribe(callback):
+    """
+    Suscribe callback(event) a todos los eventos de progreso.
+
+    Returns:
+        callable: Función sin argumentos que cancela la suscripción
+    """
+    with _subscribers_lock:
+        _subscribers.append(callback)
+    return lambda: unsubscribe(callback)
+
+
+def unsubscribe(callback):
+    """Cancela la suscripción de callback (si estaba suscrito)."""
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def publish(event):
+    """Entrega un evento a todos los suscriptores."""
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(event)
+        except Exception as e:  # Un consumidor roto no debe romper la descarga
+            log_message(f"Error en un suscriptor de progreso: {e}", "WARNING")
+
+
+def parse_progress_line(line):
+    """
+    Interpreta una línea de progreso de yt-dlp sin plantilla.
+
+    Returns:
+        dict: Claves 'percent' (float), 'total', 'speed' y 'eta' (str o None),
+              o None si la línea no es de progreso
+    """
+    match = PROGRESS_RE.search(line)
+    if not match:
+        return None
+    progress = match.groupdict()
+    progress["percent"] = float(progress["percent"])
+    return progress
+
+
+def make_line_parser(job_id, url):
+    """
+    Crea un manejador de líneas de salida de yt-dlp que publica eventos.
+
+    El manejador retorna True para las líneas de progreso, que el llamador
+    puede descartar en lugar de guardarlas en su buffer de salida.
+    """
+    state = {"phase": None}
+
+    def emit(phase, **fields):
+        state["phase"] = phase
+        publish(ProgressEvent(job_id=job_id, url=url, phase=phase, **fields))
+
+    def handle(kind, line):
+        if line.startswith(DOWNLOAD_MARKER):
+            try:
+                data = json.loads(line[len(DOWNLOAD_MARKER):])
+            except ValueError:
+                return True
+            total = data.get("total_bytes") or data.get("total_bytes_estimate")
+            done = data.get("downloaded_bytes")
+            percent = 100.0 * done / total if done is not None and total else None
+            if data.get("status") == "finished":
+                percent = 100.0
+            emit(
+                "download",
+                status=data.get("status"),
+                downloaded_bytes=done,
+                total_bytes=total,
+                percent=percent,
+                speed=data.get("speed"),
+                eta=data.get("eta"),
+                filename=data.get("filename"),
+            )
+            return True
+        if line.startswith(POSTPROCESS_MARKER):
+            try:
+                data = json.loads(line[len(POSTPROCESS_MARKER):])
+            except ValueError:
+                return True
+            postprocessor = data.get("postprocessor")
+            if postprocessor in MERGE_POSTPROCESSORS:
+                phase = "merge"
+            elif postprocessor in MOVE_POSTPROCESSORS:
+                phase = "move"
+            else:
+                phase = "postprocess"
+            emit(phase, status=data.get("status"))
+            return True
+        progress = parse_progress_line(line)
+        if progress:
+            emit("download", status="downloading", percent=progress["percent"])
+            return True
+        if state["phase"] is None and kind == "out" and EXTRACT_RE.match(line):
+            emit("extract", status="started")
+        return False
+
+    return handle
+
+
+def _format_bytes(value):
+    if value is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:.1f}{unit}" if unit != "B" else f"{int(value)}B"
+        value /= 1024.0
+
+
+def log_sink(event):
+    """Suscriptor que registra en el log los cambios de fase de cada trabajo."""
+    if event.status in ("started", "finished", "error"):
+        log_message(
+            f"[{event.job_id}] {event.phase}: {event.status}", "INFO", event.url
+        )
+
+
+def make_console_renderer(job_id, stream):
+    """
+    Crea un suscriptor que muestra en una línea de la terminal el progreso de
+    un trabajo concreto.
+
+    Returns:
+        tuple: (callback, finish) donde finish() cierra la línea de progreso
+    """
+    state = {"shown": False}
+
+    def render(event):
+        if event.job_id != job_id or event.phase not in ("download", "merge", "postprocess"):
+            return
+        if event.phase == "download":
+            percent = f"{event.percent:5.1f}%" if event.percent is not None else "  ?  "
+            speed = f"{_format_bytes(event.speed)}/s" if event.speed else "?"
+            eta = f"{event.eta}s" if event.eta is not None else "?"
+            text = (
+                f"[descarga] {percent} de {_format_bytes(event.total_bytes)} "
+                f"a {speed} ETA {eta}"
+            )
+        else:
+            text = f"[{'fusión' if event.phase == 'merge' else 'postproceso'}] {event.status}"
+        stream.write(f"\r{Colors.CYAN}{text}{Colors.RESET}\033[K")
+        stream.flush()
+        state["shown"] = True
+
+    def finish():
+        if state["shown"]:
+            stream.write("\n")
+            stream.flush()
+
+    return render, finish
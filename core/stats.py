@@ -0,0 +1,295 @@
+import json
+import math
+import os
+import time
+
+from utils.colors import Colors
+
+from . import metrics
+from .platforms import get_platform_name
+
+# Resúmenes del historial de métricas (core.metrics): percentiles de
+# duración y de velocidad por plataforma y tipo de medio, y la estimación
+# del tiempo de un batch nuevo. Con numpy instalado la agregación es
+# vectorizada; sin él se usa una versión en Python puro con los mismos
+# resultados. Las columnas ya leídas del JSONL se guardan en una caché
+# (metrics.columns.json) y solo se parsean los registros añadidos después.
+
+PERCENTILES = (50, 90, 99)
+
+# Clave de plataforma para las filas que agregan todas las plataformas
+ALL_PLATFORMS = "*"
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+COLUMNS = ("platform", "media_type", "duration", "throughput")
+
+
+def _columns_cache_path(path):
+    root, _ = os.path.splitext(path)
+    return f"{root}.columns.json"
+
+
+def _empty_columns():
+    return {name: [] for name in COLUMNS}
+
+
+def _append_records(columns, lines):
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") != "ok":
+            continue
+        wall_time = record.get("wall_time") or 0
+        if wall_time <= 0:
+            continue
+        download_time = (record.get("phases") or {}).get("download") or wall_time
+        downloaded = record.get("bytes") or 0
+        columns["platform"].append(record.get("platform") or "general")
+        columns["media_type"].append(record.get("media_type") or "video")
+        columns["duration"].append(wall_time)
+        # NaN (no None) para que la columna siga siendo numérica
+        columns["throughput"].append(downloaded / download_time if downloaded else math.nan)
+
+
+def load_history(path=None, media_type=None):
+    """
+    Lee los trabajos completados del archivo de métricas en columnas.
+
+    Returns:
+        dict: listas paralelas 'platform', 'media_type', 'duration' (s) y
+              'throughput' (bytes/s de la fase de descarga, NaN si no se
+              descargaron bytes)
+    """
+    path = path or metrics.get_metrics_file()
+    cache_path = _columns_cache_path(path)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return _empty_columns()
+
+    columns, offset = _empty_columns(), 0
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["offset"] <= size:
+            columns, offset = cached["columns"], cached["offset"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    if offset < size:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Solo registros completos; una línea a medio escribir queda para después.
+        complete = data[:data.rfind(b"\n") + 1]
+        _append_records(columns, complete.decode("utf-8", errors="replace").splitlines())
+        offset += len(complete)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"offset": offset, "columns": columns}, f, allow_nan=True)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    if media_type:
+        keep = [i for i, kind in enumerate(columns["media_type"]) if kind == media_type]
+        columns = {name: [values[i] for i in keep] for name, values in columns.items()}
+    return columns
+
+
+def _interpolate(sorted_values, percentile):
+    """Percentil con interpolación lineal (el método por defecto de numpy)."""
+    position = (len(sorted_values) - 1) * percentile / 100.0
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    fraction = position - low
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * fraction
+
+
+def _group_percentiles_python(keys, values):
+    groups = {}
+    for key, value in zip(keys, values):
+        if value == value:  # Descarta NaN
+            groups.setdefault(key, []).append(value)
+    result = {}
+    for key, group in groups.items():
+        group.sort()
+        result[key] = (len(group), tuple(_interpolate(group, p) for p in PERCENTILES))
+    return result
+
+
+def _group_percentiles_numpy(np, keys, values):
+    # Códigos enteros por grupo: agrupar enteros es mucho más barato que
+    # ordenar cadenas con np.unique.
+    codes = {}
+    key_ids = np.fromiter(
+        (codes.setdefault(key, len(codes)) for key in keys), dtype=np.intp, count=len(keys)
+    )
+    labels = list(codes)
+    data = np.asarray(values, dtype=float)
+    mask = ~np.isnan(data)
+    if not mask.any():
+        return {}
+    data = data[mask]
+    group_ids = key_ids[mask]
+
+    # Ordenar por grupo y, dentro de cada grupo, por valor; cada grupo queda
+    # en un tramo contiguo y sus percentiles se calculan por índice.
+    order = np.lexsort((data, group_ids))
+    data = data[order]
+    counts = np.bincount(group_ids, minlength=len(labels))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    columns = []
+    for percentile in PERCENTILES:
+        position = (counts - 1) * percentile / 100.0
+        low = np.floor(position).astype(int)
+        high = np.minimum(low + 1, counts - 1)
+        fraction = position - low
+        columns.append(data[starts + low] + (data[starts + high] - data[starts + low]) * fraction)
+    table = np.stack(columns, axis=1)
+    return {
+        label: (int(count), tuple(float(v) for v in row))
+        for label, count, row in zip(labels, counts.tolist(), table)
+        if count
+    }
+
+
+def _group_key(platform, media_type):
+    return f"{platform}\t{media_type}"
+
+
+def summarize(history):
+    """
+    Percentiles (PERCENTILES) de duración y velocidad por (plataforma, tipo),
+    más filas ALL_PLATFORMS con el total de cada tipo de medio.
+
+    Returns:
+        dict: {(plataforma, tipo): {'count': int, 'duration': (p50, p90, p99),
+               'throughput': (p50, p90, p99) o None}}
+    """
+    keys = [_group_key(p, m) for p, m in zip(history["platform"], history["media_type"])]
+    keys += [_group_key(ALL_PLATFORMS, m) for m in history["media_type"]]
+    durations = history["duration"] * 2
+    throughputs = history["throughput"] * 2
+
+    np = _numpy()
+    if np is not None:
+        duration_stats = _group_percentiles_numpy(np, keys, durations)
+        throughput_stats = _group_percentiles_numpy(np, keys, throughputs)
+    else:
+        duration_stats = _group_percentiles_python(keys, durations)
+        throughput_stats = _group_percentiles_python(keys, throughputs)
+
+    summary = {}
+    for key, (count, duration) in duration_stats.items():
+        platform, media_type = key.split("\t")
+        throughput = throughput_stats.get(key)
+        summary[(platform, media_type)] = {
+            "count": count,
+            "duration": duration,
+            "throughput": throughput[1] if throughput else None,
+        }
+    return summary
+
+
+def _format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+def _format_rate(rate):
+    for unit in ("B/s", "KiB/s", "MiB/s"):
+        if rate < 1024 or unit == "MiB/s":
+            return f"{rate:.1f}{unit}"
+        rate /= 1024.0
+
+
+def print_stats(media_type=None, path=None):
+    """Imprime la tabla de percentiles del historial (subcomando 'tud stats')."""
+    started = time.perf_counter()
+    summary = summarize(load_history(path, media_type))
+    elapsed = time.perf_counter() - started
+    if not summary:
+        print(f"{Colors.YELLOW}No hay descargas completadas registradas en: "
+              f"{path or metrics.get_metrics_file()}{Colors.RESET}")
+        return False
+
+    labels = "/".join(f"p{p}" for p in PERCENTILES)
+    print(f"{Colors.BOLD}{Colors.CYAN}"
+          f"{'Plataforma':<12} {'Tipo':<6} {'N':>6}  {'Duración ' + labels:<30} "
+          f"{'Velocidad ' + labels}{Colors.RESET}")
+    # Primero cada plataforma y al final el total de cada tipo.
+    ordered = sorted(summary, key=lambda k: (k[0] == ALL_PLATFORMS, k[1], k[0]))
+    for platform, kind in ordered:
+        row = summary[(platform, kind)]
+        duration = " / ".join(_format_seconds(v) for v in row["duration"])
+        throughput = (
+            " / ".join(_format_rate(v) for v in row["throughput"])
+            if row["throughput"] else "-"
+        )
+        name = "(todas)" if platform == ALL_PLATFORMS else platform
+        color = Colors.BOLD if platform == ALL_PLATFORMS else ""
+        print(f"{color}{name:<12} {kind:<6} {row['count']:>6}  {duration:<30} "
+              f"{throughput}{Colors.RESET if color else ''}")
+    print(f"{Colors.CYAN}Calculado en {elapsed * 1000:.0f} ms"
+          f"{'' if _numpy() else ' (sin numpy)'}.{Colors.RESET}")
+    return True
+
+
+def estimate_batch_eta(urls, media_type, jobs=1, summary=None):
+    """
+    Estima la duración de un batch a partir de la mediana histórica de cada
+    plataforma (o la del tipo de medio si la plataforma no tiene historial).
+
+    Returns:
+        tuple: (segundos estimados, URLs con historial) o (None, 0) si no hay
+               datos suficientes
+    """
+    if not urls:
+        return None, 0
+    if summary is None:
+        summary = summarize(load_history(media_type=media_type))
+    fallback = summary.get((ALL_PLATFORMS, media_type))
+    if not fallback:
+        return None, 0
+
+    total = 0.0
+    known = 0
+    for url in urls:
+        row = summary.get((get_platform_name(url), media_type))
+        if row:
+            known += 1
+        total += (row or fallback)["duration"][0]
+    # Con varias descargas a la vez el tiempo total se reparte entre ellas.
+    return total / max(1, min(jobs, len(urls))), known
+
+
+def print_batch_eta(urls, media_type, jobs=1):
+    """Muestra la estimación de duración de un batch antes de empezarlo."""
+    try:
+        seconds, known = estimate_batch_eta(urls, media_type, jobs)
+    except Exception:  # La estimación nunca debe impedir la descarga
+        return
+    if seconds is None:
+        return
+    print(
+        f"{Colors.CYAN}Tiempo estimado: ~{_format_seconds(seconds)} para "
+        f"{len(urls)} URLs ({known} con historial de su plataforma).{Colors.RESET}"
+    )
@@ -1,27 +1,23 @@
-import subprocess
 import sys
 
 from utils.colors import Colors
+from utils.dependency_cache import probe
 
 
 def check_dependencies():
     """Verifica si yt-dlp y ffmpeg están instalados."""
     print(f"{Colors.CYAN}[*] Verificando dependencias...{Colors.RESET}")
     missing = []
-    try:
-        subprocess.run(
-            ["yt-dlp", "--version"], capture_output=True, check=True, text=True
-        )
-        print(f"{Colors.GREEN}[+] yt-dlp encontrado.{Colors.RESET}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    yt_dlp = probe("yt-dlp")
+    if yt_dlp["ok"]:
+        print(f"{Colors.GREEN}[+] yt-dlp encontrado ({yt_dlp['version']}).{Colors.RESET}")
+    else:
         missing.append("yt-dlp (instalar con: pip install -r " "requirements.txt)")
 
-    try:
-        subprocess.run(
-            ["ffmpeg", "-version"], capture_output=True, check=True, text=True
-        )
-        print(f"{Colors.GREEN}[+] ffmpeg encontrado.{Colors.RESET}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    ffmpeg = probe("ffmpeg")
+    if ffmpeg["ok"]:
+        print(f"{Colors.GREEN}[+] ffmpeg encontrado ({ffmpeg['version']}).{Colors.RESET}")
+    else:
         missing.append("ffmpeg (instalar con: pkg install ffmpeg)")
 
     if missing:
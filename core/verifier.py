@@ -0,0 +1,221 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config_manager import get_config_value
+from utils.colors import Colors
+from utils.logger import log_message
+
+from . import media_inspector
+
+# Verificación de integridad de los archivos descargados: contenedor legible,
+# streams esperados presentes y duración coherente con la de los metadatos
+# extraídos (archivo truncado) y entre streams (fusión defectuosa). En un
+# batch se ejecuta en su propio pool (VerificationPool), en paralelo con las
+# descargas que siguen en curso.
+
+VERIFIED = "verified"
+CORRUPT = "corrupt"
+
+# Sufijo con el que se apartan los archivos corruptos de un batch: dejan de
+# ocupar el nombre final (yt-dlp usa --no-overwrites) y no se borran por si
+# el usuario quiere revisarlos.
+QUARANTINE_SUFFIX = ".corrupt"
+
+AUDIO_EXTENSIONS = (".m4a", ".mp3", ".opus", ".ogg", ".flac", ".wav", ".aac")
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".mov")
+
+
+def _tolerance(duration):
+    """Diferencia de duración admitida: 2 s o el 2 %, lo que sea mayor."""
+    return max(2.0, 0.02 * duration)
+
+
+def check(result, media_type, expected_duration=None):
+    """
+    Evalúa un resultado de core.media_inspector.
+
+    Args:
+        result (dict): Resultado de media_inspector.inspect_files()
+        media_type (str): 'video' (exige video y audio) o 'audio'
+        expected_duration (float): Duración según los metadatos, si se conoce
+
+    Returns:
+        list: Problemas encontrados (vacía si el archivo es correcto)
+    """
+    if result["error"]:
+        return [f"no se puede leer: {result['error'].splitlines()[-1]}"]
+
+    problems = []
+    if media_type == "video" and not media_inspector.has_video(result):
+        problems.append("sin stream de video")
+    if not media_inspector.has_audio(result):
+        problems.append("sin stream de audio")
+
+    duration = result["duration"]
+    if not duration or duration <= 0:
+        problems.append("duración desconocida o cero")
+        return problems
+    if expected_duration and duration < expected_duration - _tolerance(expected_duration):
+        problems.append(
+            f"truncado: dura {duration:.1f}s de {expected_duration:.1f}s esperados"
+        )
+
+    stream_durations = [
+        s["duration"] for s in result["streams"]
+        if s.get("codec_type") in ("video", "audio") and s.get("duration")
+        and s.get("codec_name") not in ("mjpeg", "png")
+    ]
+    if len(stream_durations) > 1:
+        spread = max(stream_durations) - min(stream_durations)
+        if spread > _tolerance(max(stream_durations)):
+            problems.append(f"streams desalineados: difieren {spread:.1f}s")
+    return problems
+
+
+def media_type_for(path):
+    """Tipo de medio que se espera de un archivo según su extensión."""
+    return "audio" if path.lower().endswith(AUDIO_EXTENSIONS) else "video"
+
+
+def quarantine(path):
+    """
+    Renombra un archivo corrupto añadiendo QUARANTINE_SUFFIX.
+
+    Returns:
+        str: Nueva ruta, o None si no se pudo mover
+    """
+    target = path + QUARANTINE_SUFFIX
+    try:
+        os.replace(path, target)
+    except OSError as e:
+        log_message(f"No se pudo apartar el archivo corrupto {path}: {e}", "ERROR")
+        return None
+    log_message(f"Archivo corrupto apartado: {target}", "WARNING")
+    return target
+
+
+def ffprobe_available():
+    return shutil.which("ffprobe") is not None
+
+
+class VerificationPool:
+    """
+    Pool de verificación que avanza en paralelo con las descargas.
+
+    submit() encola un archivo terminado y retorna de inmediato; cada
+    resultado se pasa a on_result (desde un hilo del pool) y se acumula
+    en results. wait() espera a que terminen todas las verificaciones.
+    """
+
+    def __init__(self, workers=None, on_result=None):
+        workers = workers or get_config_value("verify_workers", 2)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(workers)), thread_name_prefix="tud-verify"
+        )
+        self._on_result = on_result
+        self._futures = []
+        self._lock = threading.Lock()
+        self.results = []
+
+    def submit(self, path, media_type, expected_duration=None, key=None):
+        future = self._executor.submit(
+            self._verify, path, media_type, expected_duration, key
+        )
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def _verify(self, path, media_type, expected_duration, key):
+        result = media_inspector.inspect_file(path)
+        problems = check(result, media_type, expected_duration)
+        report = {
+            "key": key,
+            "path": path,
+            "status": CORRUPT if problems else VERIFIED,
+            "problems": problems,
+        }
+        if problems:
+            log_message(f"Archivo corrupto: {path}: {'; '.join(problems)}", "WARNING")
+        with self._lock:
+            self.results.append(report)
+        if self._on_result:
+            try:
+                self._on_result(report)
+            except Exception as e:
+                log_message(f"Error al registrar la verificación de {path}: {e}", "ERROR")
+        return report
+
+    def wait(self):
+        """Espera a que terminen todas las verificaciones y retorna los resultados."""
+        self._executor.shutdown(wait=True)
+        return self.results
+
+
+def print_verification_summary(reports):
+    """Imprime el recuento de verificados/corruptos y los problemas encontrados."""
+    corrupt = [r for r in reports if r["status"] == CORRUPT]
+    print(f"  {Colors.GREEN}Verificados: {len(reports) - len(corrupt)}{Colors.RESET}")
+    if corrupt:
+        print(f"  {Colors.RED}Corruptos: {len(corrupt)}{Colors.RESET}")
+        for report in corrupt:
+            print(f"    - {report['path']}: {'; '.join(report['problems'])}")
+
+
+def find_media_files(directory):
+    """Archivos multimedia bajo directory (recursivo), en orden estable."""
+    extensions = AUDIO_EXTENSIONS + VIDEO_EXTENSIONS
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                found.append(os.path.join(root, name))
+    return found
+
+
+def verify_directory(directory, media_type=None, workers=None):
+    """
+    Verifica una biblioteca existente (subcomando 'tud verify').
+
+    Sin metadatos de origen solo se comprueban el contenedor, los streams y
+    la coherencia de duración entre ellos.
+
+    Returns:
+        list: Informes de verificación, o None si no se pudo verificar
+    """
+    if not os.path.isdir(directory):
+        print(f"{Colors.RED}ERROR: No existe el directorio: {directory}{Colors.RESET}")
+        return None
+    if not ffprobe_available():
+        print(f"{Colors.RED}ERROR: ffprobe no está instalado; no se puede verificar.{Colors.RESET}")
+        return None
+
+    paths = find_media_files(directory)
+    if not paths:
+        print(f"{Colors.YELLOW}No se encontraron archivos multimedia en: {directory}{Colors.RESET}")
+        return []
+    print(f"{Colors.CYAN}Verificando {len(paths)} archivos...{Colors.RESET}")
+
+    # Una sola pasada por el inspector (en paralelo y con caché) y después
+    # la comprobación de cada resultado.
+    inspected = media_inspector.inspect_files(
+        paths, workers=workers or get_config_value("verify_workers", 2)
+    )
+    reports = []
+    for path in paths:
+        problems = check(inspected[path], media_type or media_type_for(path))
+        reports.append({
+            "key": None,
+            "path": path,
+            "status": CORRUPT if problems else VERIFIED,
+            "problems": problems,
+        })
+    print(f"\n{Colors.BOLD}{Colors.CYAN}Resultado de la verificación:{Colors.RESET}")
+    print_verification_summary(reports)
+    log_message(
+        f"Verificación de '{directory}': {len(reports)} archivos, "
+        f"{sum(r['status'] == CORRUPT for r in reports)} corruptos."
+    )
+    return reports
@@ -1,40 +1,18 @@
-import glob  # Para buscar archivos por patrón
 import os
 import subprocess
-import time
 
+from config.config_manager import get_config_value
 from utils.colors import Colors
 from utils.logger import log_message
 from utils.path_manager import create_directories
 
+from . import archive, checkpoint
 from . import ffmpeg_utils  # Importar el nuevo módulo de utilidades de ffmpeg
-from .downloader import run_yt_dlp
+from . import format_planner, media_inspector, metadata_cache, metrics, progress
+from .downloader import classify_yt_dlp_error, run_yt_dlp
 from .platforms import get_platform_name
 
 
-def wait_for_file_creation(file_path, timeout=10):
-    """
-    Wait for a file to be fully created and written to disk.
-
-    Args:
-        file_path (str): Path to the file to wait for
-        timeout (int): Maximum time to wait in seconds
-
-    Returns:
-        bool: True if file exists and is stable, False otherwise
-    """
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        if os.path.exists(file_path):
-            # Check if file size is stable (not changing)
-            initial_size = os.path.getsize(file_path)
-            time.sleep(0.5)  # Wait a bit
-            if os.path.exists(file_path) and os.path.getsize(file_path) == initial_size:
-                return True
-        time.sleep(0.5)
-    return False
-
-
 def download_video(
     url,
     quality,
@@ -43,10 +21,18 @@ def download_video(
     verbose,
     cookies_file,
     dry_run=False,
+    use_archive=True,
 ):
     """
     Función para descargar video desde YouTube con manejo de fusión de audio/video.
 
+    Los formatos se deciden una sola vez (core.format_planner) respetando la
+    calidad pedida, y la descarga se ejecuta con ese plan; ante un fallo solo
+    se repite la etapa afectada (postprocesado, metadatos caducados o la
+    descarga, que se reanuda). Si los componentes de video y audio ya están
+    completos en disco solo se rehace la fusión o el postprocesado, sin
+    volver a descargar el medio.
+
     Args:
         url (str): URL del video a descargar
         quality (str): Calidad del video (480p, 720p, 1080p, best)
@@ -55,11 +41,39 @@ def download_video(
         verbose (bool): Mostrar información detallada
         cookies_file (str): Ruta al archivo de cookies
         dry_run (bool): Modo de prueba sin descargar realmente
+        use_archive (bool): Omitir las URLs ya registradas en el archivo de descargas
 
     Returns:
-        bool: True si la descarga fue exitosa, False en caso contrario
+        str | bool: Ruta exacta del archivo final si la descarga fue exitosa
+                    (True si no se generó un archivo nuevo, p. ej. en dry-run,
+                    playlists o videos ya descargados), False en caso contrario
     """
+    # Todos los intentos de esta descarga comparten el id de trabajo y un
+    # único registro de métricas (core.metrics).
+    job_id = progress.new_job_id()
+    job = metrics.start_job(job_id, url, "video", get_platform_name(url))
+    result = False
+    try:
+        result = download_video_for_job(
+            job_id, job, url, quality, output_path, is_playlist, verbose,
+            cookies_file, dry_run, use_archive,
+        )
+        return result
+    finally:
+        if job:
+            job.finish(result)
+
 
+def download_video_for_job(
+    job_id, job, url, quality, output_path, is_playlist, verbose, cookies_file,
+    dry_run, use_archive,
+):
+    """
+    Cuerpo de download_video dentro de un trabajo de métricas ya abierto
+    (job_id/job de core.progress y core.metrics), que el llamador cierra.
+    Lo usa también la etapa de red de core.pipeline para los formatos
+    combinados. Mismos argumentos y retorno que download_video.
+    """
     platform = get_platform_name(url)
     is_short = "/shorts/" in url
 
@@ -73,6 +87,17 @@ def download_video(
                 Colors.RESET}")
         return False
 
+    use_archive = use_archive and get_config_value("use_download_archive", True)
+    if use_archive and not is_playlist and archive.is_downloaded(url, "video"):
+        print(
+            f"{Colors.GREEN}Video ya descargado anteriormente (archivo de descargas). "
+            f"Se omite: {url}{Colors.RESET}"
+        )
+        log_message("Omitido: ya está en el archivo de descargas.", "INFO", url, platform)
+        if job:
+            job.status = "skipped"
+        return True
+
     if output_path == "/storage/emulated/0/Download" or output_path == "/data/data/com.termux/files/home/downloads":
         base_output_dir = output_path
     else:
@@ -92,13 +117,36 @@ def download_video(
         )
         return False
 
-    # --- 2. Construcción de argumentos de yt-dlp ---
-    temp_output_template = os.path.join(base_output_dir, "%(id)s.%(ext)s")
+    # --- 2. Metadatos y plan de formatos ---
+    # Extracción única de metadatos, compartida por todos los intentos (y por
+    # descargas posteriores del mismo video mientras la caché sea válida).
+    info, info_json = None, None
+    if not is_playlist:
+        with metrics.phase(job, "extract"):
+            info, info_json = metadata_cache.get_info(
+                url, verbose=verbose, cookies_file=cookies_file
+            )
 
-    if is_short:
-        format_selector = "best[ext=mp4]/best"
-    else:
-        format_selector = "bv*+ba/b"
+    def make_plan(info):
+        plan = format_planner.plan_formats(info, quality, is_short) if info else None
+        if plan:
+            print(
+                f"{Colors.CYAN}Formatos elegidos ({quality}): "
+                f"{format_planner.describe_plan(plan)}{Colors.RESET}"
+            )
+            if job:
+                job.formats = plan["selector"].split("/")[0]
+        return plan
+
+    def format_selector(plan):
+        if plan:
+            return plan["selector"]
+        return format_planner.get_quality_selector(quality, is_short)
+
+    plan = make_plan(info)
+
+    # --- 3. Construcción de argumentos de yt-dlp ---
+    temp_output_template = os.path.join(base_output_dir, "%(id)s.%(ext)s")
 
     base_args = [
         "--ignore-errors",
@@ -111,8 +159,12 @@ def download_video(
         "-o",
         temp_output_template,
         "-f",
-        format_selector,
+        format_selector(plan),
     ]
+    format_index = base_args.index("-f") + 1
+
+    if use_archive and not dry_run:
+        base_args.extend(["--download-archive", archive.get_archive_path("video")])
 
     if not is_playlist:
         base_args.append("--no-playlist")
@@ -129,149 +181,140 @@ def download_video(
     else:
         post_process_args = ["--add-metadata", "--embed-thumbnail"]
 
-    # --- 3. Intento de descarga inicial (con post-procesado) ---
-    print(
-        f"{Colors.YELLOW}Intentando descarga (con metadata/thumbnail)...{Colors.RESET}"
-    )
-    final_args_with_post = base_args + post_process_args
-
-    initial_success = False
-    try:
-        run_yt_dlp(
-            args=final_args_with_post,
-            url=url,
-            platform=platform,
-            verbose=verbose,
-            cookies_file=cookies_file,
-            dry_run=dry_run,
-        )
-        initial_success = True
-    except subprocess.CalledProcessError:
-        print(
-            f"{Colors.YELLOW}Descarga inicial falló con metadata/thumbnail.{Colors.RESET}"
-        )
-    if initial_success:
-        print(f"{Colors.GREEN}Descarga y fusión inicial exitosa.{Colors.RESET}")
-    else:
+    # --- 4. Ejecución del plan: solo se repite la etapa que falla ---
+    max_attempts = max(1, int(get_config_value("max_retries", 3)))
+    use_post_process = bool(post_process_args)
+    refreshed_info = False
+    success = False
+    final_files = []
+    for attempt in range(1, max_attempts + 1):
         print(
-            f"{
-                Colors.YELLOW}Reintentando sin metadata/thumbnail (problemas Android)...{
-                Colors.RESET}"
+            f"{Colors.YELLOW}Intento {attempt}/{max_attempts}"
+            f"{' (con metadata/thumbnail)' if use_post_process else ''}...{Colors.RESET}"
         )
-        final_args_no_post = base_args
-        second_success = False
         try:
-            run_yt_dlp(
-                args=final_args_no_post,
+            process = run_yt_dlp(
+                args=base_args + (post_process_args if use_post_process else []),
                 url=url,
                 platform=platform,
                 verbose=verbose,
                 cookies_file=cookies_file,
                 dry_run=dry_run,
+                stream=True,
+                job_id=job_id,
+                info_json=info_json,
+                report_paths=True,
             )
-            second_success = True
-        except subprocess.CalledProcessError:
+            final_files = process.filepaths
+            success = True
+            break
+        except subprocess.CalledProcessError as e:
+            stage = classify_yt_dlp_error(f"{e.stdout}\n{e.stderr}")
+
+        components = None
+        if not dry_run:
+            components = checkpoint.verified_components(base_output_dir, info, plan)
+        merged_file = checkpoint.final_path(base_output_dir, info) if components else None
+        if components and not os.path.exists(merged_file):
+            # La descarga terminó y falló la fusión: se fusionan aquí los
+            # componentes ya verificados en lugar de volver a pedirlos.
             print(
-                f"{Colors.RED}Segundo intento de descarga falló sin metadata/thumbnail.{Colors.RESET}"
+                f"{Colors.YELLOW}Video y audio ya descargados y verificados. "
+                f"Se repite solo la fusión...{Colors.RESET}"
             )
-
-        if not second_success:
-            print(f"{Colors.RED}Ambos intentos de descarga fallaron.{Colors.RESET}")
-            # Solo intenta esto para videos que NO son shorts, ya que los shorts ya
-            # tienen un formato simple
+            log_message("Reutilizando componentes descargados para la fusión.", "INFO", url, platform)
+            with metrics.phase(job, "merge"):
+                merged = ffmpeg_utils.manual_merge_and_cleanup(
+                    components["video"], components["audio"], merged_file, ffmpeg_dir
+                )
+            if merged:
+                final_files = [merged_file]
+                if not use_post_process or attempt == max_attempts:
+                    success = True
+                    break
+                # El siguiente intento encuentra el archivo fusionado y solo
+                # añade metadata/thumbnail.
+                continue
+        elif stage == "postprocess" and use_post_process:
+            # El video ya está descargado y fusionado: el siguiente intento lo
+            # reutiliza y solo omite el paso que falló.
             print(
-                f"{Colors.YELLOW}Tercer intento: Fallback a formato robusto (bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best)...{Colors.RESET}"
+                f"{Colors.YELLOW}Falló metadata/thumbnail (problemas Android). "
+                f"Se reintenta solo sin ese paso...{Colors.RESET}"
             )
-            # Creamos una copia de base_args y reemplazamos el selector de formato
-            robust_format_selector = (
-                "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
-            )
-            third_attempt_args = []
-            found_f_flag = False
-            for arg in base_args:
-                if arg == "-f":
-                    third_attempt_args.append(arg)
-                    third_attempt_args.append(robust_format_selector)
-                    found_f_flag = True
-                    continue
-                if (
-                    found_f_flag and arg == format_selector
-                ):  # Skip the old format_selector after -f
-                    found_f_flag = False
-                    continue
-                third_attempt_args.append(arg)
-
-            third_success = False
-            try:
-                run_yt_dlp(
-                    args=third_attempt_args,
-                    url=url,
-                    platform=platform,
-                    verbose=verbose,
-                    cookies_file=cookies_file,
-                    dry_run=dry_run,
-                )
-                third_success = True
-            except subprocess.CalledProcessError:
-                print(
-                    f"{Colors.RED}Tercer intento de descarga falló.{Colors.RESET}"
-                )
-
-            if not third_success:
-                print(
-                    f"{Colors.RED}Todos los intentos de descarga fallaron.{Colors.RESET}"
-                )
-                return False
-    # --- 5. Búsqueda y Validación del Archivo Final ---
-    print(
-        f"{Colors.CYAN}Verificando archivos descargados y fusionados...{Colors.RESET}"
-    )
-    # Extraer ID de video de forma más robusta
-    import re
-    video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url.split('?')[0])
-    if video_id_match:
-        video_id_pattern = video_id_match.group(1)
-    else:
-        # Fallback: intentar obtener el último segmento de la URL
-        video_id_pattern = url.split("/")[-1].split("?")[0]
-
-    # Wait a bit for file system to settle after yt-dlp completes
-    time.sleep(1)
-
-    final_output_glob = os.path.join(base_output_dir, f"{video_id_pattern}*.mp4")
-    final_merged_files = glob.glob(final_output_glob)
-
-    actual_final_file = None
-    if final_merged_files:
-        # Wait for the file to be fully written to disk
-        first_file = final_merged_files[0]
-        if wait_for_file_creation(first_file):
-            actual_final_file = first_file  # Tomar el primero que coincida
+            use_post_process = False
+        elif stage == "stale" and info_json and not refreshed_info:
             print(
-                f"{Colors.GREEN}[+] Archivo MP4 final encontrado: {actual_final_file}{Colors.RESET}"
+                f"{Colors.YELLOW}Los enlaces de formato caducaron. "
+                f"Volviendo a extraer los metadatos...{Colors.RESET}"
             )
+            with metrics.phase(job, "extract"):
+                info, info_json = metadata_cache.get_info(
+                    url, verbose=verbose, cookies_file=cookies_file, refresh=True
+                )
+            plan = make_plan(info)
+            base_args[format_index] = format_selector(plan)
+            refreshed_info = True
         else:
             print(
-                f"{
-                    Colors.YELLOW}ADVERTENCIA: El archivo encontrado no está completamente escrito: {first_file}{
-                    Colors.RESET}")
-    else:
-        print(
-            f"{
-                Colors.YELLOW}ADVERTENCIA: No se encontró un archivo MP4 final usando el patrón '{video_id_pattern}'.{
-                Colors.RESET}")
-        # Podría ser un nombre diferente o yt-dlp no lo fusionó.
-        # Buscaremos los componentes separados para el modo rescate.
+                f"{Colors.YELLOW}La descarga falló; el siguiente intento continúa "
+                f"desde lo ya descargado.{Colors.RESET}"
+            )
 
-    # --- 6. MODO RESCATE: Fusión manual si existen componentes separados ---
-    video_glob = os.path.join(base_output_dir, f"{video_id_pattern}*.mp4")
-    audio_glob_webm = os.path.join(base_output_dir, f"{video_id_pattern}*.webm")
-    audio_glob_m4a = os.path.join(base_output_dir, f"{video_id_pattern}*.m4a")
+    if not success and final_files and os.path.exists(final_files[-1]):
+        # La fusión local salió bien y solo fallaron los intentos posteriores
+        # de metadata/thumbnail: el archivo fusionado es válido.
+        print(
+            f"{Colors.YELLOW}No se pudo añadir metadata/thumbnail; se conserva "
+            f"el archivo fusionado.{Colors.RESET}"
+        )
+        success = True
 
-    separate_video_files = glob.glob(video_glob)
-    separate_audio_files = glob.glob(audio_glob_webm) + glob.glob(audio_glob_m4a)
+    if success:
+        print(f"{Colors.GREEN}Descarga y fusión exitosa.{Colors.RESET}")
+    else:
+        print(f"{Colors.RED}Todos los intentos de descarga fallaron.{Colors.RESET}")
+        if dry_run or not checkpoint.verified_components(base_output_dir, info, plan):
+            # Los enlaces de formato guardados pueden haber caducado.
+            metadata_cache.invalidate(url)
+            return False
+        # Los componentes están completos: el modo rescate solo fusiona.
+    # --- 5. Archivo final reportado por yt-dlp ---
+    if success and (dry_run or is_playlist):
+        return True
+    actual_final_file = final_files[-1] if final_files else None
+    if success and not actual_final_file:
+        # yt-dlp no movió ningún archivo: lo omitió por su archivo de descargas.
+        print(
+            f"{Colors.GREEN}yt-dlp no generó un archivo nuevo "
+            f"(ya figuraba en el archivo de descargas).{Colors.RESET}"
+        )
+        return True
+    if actual_final_file:
+        print(
+            f"{Colors.GREEN}[+] Archivo final: {actual_final_file}{Colors.RESET}"
+        )
 
-    if separate_video_files and separate_audio_files and not actual_final_file:
+    # --- 6. MODO RESCATE: Fusión manual de los componentes verificados ---
+    components = None
+    if not actual_final_file:
+        components = checkpoint.verified_components(base_output_dir, info, plan)
+    if components:
+        # El tamaño coincide con el formato; ffprobe confirma además que cada
+        # componente tiene el stream que se va a mapear.
+        inspected = media_inspector.inspect_files(
+            [components["video"], components["audio"]],
+            os.path.join(ffmpeg_dir, "ffprobe"),
+        )
+        if not (media_inspector.has_video(inspected[components["video"]])
+                and media_inspector.has_audio(inspected[components["audio"]])):
+            print(
+                f"{Colors.RED}ERROR: Los componentes descargados no tienen los "
+                f"streams esperados; no se pueden fusionar.{Colors.RESET}"
+            )
+            log_message(f"Componentes sin streams válidos: {components}", "ERROR")
+            metadata_cache.invalidate(url)
+            return False
         print(
             f"{Colors.RED}"
             "MODO RESCATE ACTIVADO 🔥: "
@@ -279,75 +322,32 @@ def download_video(
             f"{Colors.RESET}"
         )
 
-        video_file = separate_video_files[0]
-        audio_file = separate_audio_files[0]
+        video_file = components["video"]
+        audio_file = components["audio"]
 
         rescued_output = os.path.join(
-            base_output_dir, f"{video_id_pattern}_RESCATADO.mp4"
+            base_output_dir, f"{info['id']}_RESCATADO.mp4"
         )
 
-        rescue_cmd = [
-            ffmpeg_dir,
-            "-y",
-            "-i",
-            video_file,
-            "-i",
-            audio_file,
-            "-c:v",
-            "copy",
-            "-c:a",
-            "aac",
-            "-map",
-            "0:v:0",
-            "-map",
-            "1:a:0",
-            rescued_output,
-        ]
-
-        try:
-            subprocess.run(
-                rescue_cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True,
-            )
-            print(
-                f"{Colors.GREEN}"
-                "✔ FUSIÓN DE RESCATE COMPLETADA CON ÉXITO"
-                f"{Colors.RESET}"
+        # Copia los streams que caben en MP4 y recodifica solo el que no
+        # (p. ej. audio Opus -> AAC); los componentes se borran si sale bien.
+        with metrics.phase(job, "merge"):
+            merged = ffmpeg_utils.manual_merge_and_cleanup(
+                video_file, audio_file, rescued_output, ffmpeg_dir
             )
-            return True
-
-        except subprocess.CalledProcessError:
+        if not merged:
             print(
                 f"{Colors.RED}"
-                "❌ ERROR: Falló la fusión manual con FFmpeg"
+                "❌ ERROR: Falló la fusión de rescate. El video puede estar incompleto o sin audio."
                 f"{Colors.RESET}"
             )
-            # Si falla la fusión directa, intentamos con la función de utilidad
-            # Asumimos que el primer video y el primer audio son los correctos para
-            # fusionar.
-            video_component = separate_video_files[0]
-            audio_component = separate_audio_files[0]
-
-            # Nombre para el archivo fusionado manualmente
-            manual_merged_filename = os.path.join(
-                base_output_dir, f"{video_id_pattern}_merged.mp4"
-            )
-
-            if ffmpeg_utils.manual_merge_and_cleanup(
-                video_component, audio_component, manual_merged_filename, ffmpeg_dir
-            ):
-                actual_final_file = manual_merged_filename
-                print(
-                    f"{Colors.GREEN}Fusión manual exitosa. Archivo final: {actual_final_file}{Colors.RESET}"
-                )
-            else:
-                print(
-                    f"{
-                        Colors.RED}ERROR: La fusión manual falló. El video puede estar incompleto o sin audio.{
-                        Colors.RESET}")
-                return False
+            return False
+        print(
+            f"{Colors.GREEN}"
+            "✔ FUSIÓN DE RESCATE COMPLETADA CON ÉXITO"
+            f"{Colors.RESET}"
+        )
+        actual_final_file = rescued_output
 
     # --- 7. Validación Final: Verificación de stream de audio ---
     if actual_final_file and ffmpeg_utils.has_audio_stream(
@@ -356,7 +356,7 @@ def download_video(
         print(
             f"{Colors.GREEN}¡Descarga de video con audio completada exitosamente!{Colors.RESET}"
         )
-        return True
+        return actual_final_file
     elif actual_final_file:
         print(
             f"{
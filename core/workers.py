@@ -0,0 +1,146 @@
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from utils.colors import Colors
+
+_print_lock = threading.Lock()
+
+
+class ThreadRoutedStream:
+    """
+    Envoltorio de sys.stdout que desvía la salida de cada hilo de trabajo a
+    su propio buffer, para que los trabajos concurrentes no se mezclen en la
+    consola. Los hilos sin buffer asignado escriben en el stream original.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @property
+    def original(self):
+        """Stream envuelto, para imprimir sin pasar por la captura."""
+        return self._stream
+
+    def _target(self):
+        return getattr(self._local, "buffer", None) or self._stream
+
+    def start_capture(self):
+        self._local.buffer = io.StringIO()
+
+    def stop_capture(self):
+        buffer = getattr(self._local, "buffer", None)
+        self._local.buffer = None
+        return buffer.getvalue() if buffer else ""
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def isatty(self):
+        # La salida capturada nunca es una terminal interactiva.
+        if getattr(self._local, "buffer", None) is not None:
+            return False
+        return self._stream.isatty()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def routed_stdout():
+    """Instala un ThreadRoutedStream como sys.stdout mientras dure el bloque."""
+    original = sys.stdout
+    stream = ThreadRoutedStream(original)
+    sys.stdout = stream
+    try:
+        yield stream
+    finally:
+        sys.stdout = original
+
+
+def run_captured(stream, func, item):
+    """Ejecuta func(item) capturando su salida. Retorna (resultado, error, salida)."""
+    stream.start_capture()
+    result = None
+    error = None
+    try:
+        result = func(item)
+    except Exception as e:  # Un trabajo fallido no debe detener el pool
+        error = e
+    finally:
+        output = stream.stop_capture()
+    return result, error, output
+
+
+def job_header(index, total, label):
+    """Cabecera '[n/total] etiqueta' con la que se presenta cada trabajo."""
+    return f"\n{Colors.BOLD}{Colors.MAGENTA}[{index + 1}/{total}] {label}{Colors.RESET}"
+
+
+def print_job_output(stream, index, total, label, output, error=None):
+    """
+    Imprime de una vez la cabecera, la salida capturada y el error (si lo
+    hubo) de un trabajo terminado, sin mezclarse con los demás.
+    """
+    with _print_lock:
+        stream.original.write(job_header(index, total, label) + "\n")
+        stream.original.write(output)
+        if error is not None:
+            stream.original.write(
+                f"{Colors.RED}Error inesperado en el trabajo: {error}{Colors.RESET}\n"
+            )
+        stream.original.flush()
+
+
+def run_jobs(func, items, max_workers=1, describe=None):
+    """
+    Ejecuta func sobre cada elemento de items usando un pool acotado de hilos.
+
+    Con max_workers <= 1 los trabajos se ejecutan en serie y su salida va
+    directamente a la consola. Con más trabajadores, la salida de cada trabajo
+    se captura y se imprime como un bloque completo cuando el trabajo termina.
+
+    Args:
+        func (callable): Función a ejecutar para cada elemento
+        items (list): Elementos a procesar
+        max_workers (int): Número máximo de trabajos simultáneos
+        describe (callable): Función opcional que genera la cabecera de cada trabajo
+
+    Returns:
+        list: Un diccionario por elemento (en el orden de entrada) con las claves
+              'item', 'result' y 'error'
+    """
+    items = list(items)
+    total = len(items)
+    results = [None] * total
+
+    def label(item):
+        return describe(item) if describe else str(item)
+
+    if max_workers <= 1 or total <= 1:
+        for index, item in enumerate(items):
+            print(job_header(index, total, label(item)))
+            try:
+                results[index] = {"item": item, "result": func(item), "error": None}
+            except Exception as e:
+                print(f"{Colors.RED}Error inesperado en el trabajo: {e}{Colors.RESET}")
+                results[index] = {"item": item, "result": None, "error": e}
+        return results
+
+    with routed_stdout() as stream, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_captured, stream, func, item): index
+            for index, item in enumerate(items)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            result, error, output = future.result()
+            results[index] = {"item": items[index], "result": result, "error": error}
+            print_job_output(stream, index, total, label(items[index]), output, error)
+    return results
@@ -0,0 +1,263 @@
+import atexit
+import importlib.util
+import io
+import os
+import queue
+import re
+import threading
+from collections import deque
+
+# Pool de procesos de larga duración que importan yt_dlp una sola vez y
+# ejecutan trabajos (lista de argumentos de yt-dlp) enviados por un Pipe.
+# Evita pagar el arranque de Python y la carga de extractores en cada
+# descarga, que en un teléfono cuesta un segundo o más por intento.
+
+# Trabajos que ejecuta un proceso antes de reciclarse (limita fugas de memoria)
+MAX_JOBS_PER_WORKER = 50
+
+_LINE_SPLIT_RE = re.compile(r"\r\n|\r|\n")
+_VERSION_RE = re.compile(r"^__version__\s*=\s*['\"]([^'\"]+)['\"]", re.M)
+
+
+class _PipeWriter(io.TextIOBase):
+    """
+    Stream de texto que envía cada línea completa al proceso padre.
+
+    yt-dlp escribe desde más de un hilo (p. ej. descargas de fragmentos), y
+    los writers de stdout y stderr comparten la conexión: send_lock serializa
+    los mensajes para que no se intercalen en el Pipe.
+    """
+
+    def __init__(self, conn, kind, send_lock):
+        super().__init__()
+        self._conn = conn
+        self._kind = kind
+        self._send_lock = send_lock
+        self._pending = ""
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, text):
+        with self._send_lock:
+            self._pending += text
+            *lines, self._pending = _LINE_SPLIT_RE.split(self._pending)
+            for line in lines:
+                if line:
+                    self._conn.send((self._kind, line))
+        return len(text)
+
+    def flush_pending(self):
+        with self._send_lock:
+            if self._pending:
+                self._conn.send((self._kind, self._pending))
+                self._pending = ""
+
+
+def _worker_main(conn, env):
+    """Bucle del proceso trabajador: importa yt_dlp y atiende trabajos."""
+    import sys
+
+    os.environ.update(env)
+    import yt_dlp
+
+    send_lock = threading.Lock()
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            break
+        if args is None:
+            break
+
+        out = _PipeWriter(conn, "out", send_lock)
+        err = _PipeWriter(conn, "err", send_lock)
+        sys.stdout, sys.stderr = out, err
+        try:
+            yt_dlp.main(list(args))
+            returncode = 0
+        except SystemExit as e:
+            if e.code is None:
+                returncode = 0
+            elif isinstance(e.code, int):
+                returncode = e.code
+            else:
+                err.write(f"{e.code}\n")
+                returncode = 1
+        except Exception as e:
+            err.write(f"ERROR: {e}\n")
+            returncode = 1
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        out.flush_pending()
+        err.flush_pending()
+        with send_lock:
+            conn.send(("exit", returncode))
+
+
+class _Worker:
+    def __init__(self, context, env):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, env), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, timeout=2):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class YtDlpPool:
+    """
+    Pool de procesos yt-dlp 'calientes'.
+
+    Los trabajadores se crean bajo demanda y se reutilizan entre trabajos:
+    una llamada a run() sin trabajador ocioso arranca uno nuevo, así que el
+    pool crece hasta el número de descargas simultáneas que realmente se
+    usan (--jobs, 'batch_jobs', 'parallel_jobs') sin esperar a que otro
+    trabajo termine. Es seguro llamar a run() desde varios hilos a la vez.
+    """
+
+    def __init__(self, env=None):
+        self._env = dict(env or {})
+        import multiprocessing  # Solo al crear el pool: su importación es costosa
+
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.LifoQueue()
+        self._closed = False
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _Worker(self._context, self._env)
+
+    def _discard(self, worker):
+        worker.stop(timeout=0)
+
+    def run(self, args, on_line=None, max_lines=None, timeout=None):
+        """
+        Ejecuta yt-dlp con los argumentos dados en un trabajador del pool.
+
+        Args:
+            args (list): Argumentos de yt-dlp (incluida la URL)
+            on_line (callable): Llamada opcional on_line(kind, line) por cada
+                                línea de salida, con kind 'out' o 'err'; si
+                                retorna True la línea no se guarda
+            max_lines (int): Si se indica, solo se conservan las últimas
+                             max_lines líneas de cada stream
+            timeout (float): Segundos sin ninguna salida del trabajador tras
+                             los que se da por colgado (p. ej. un extractor
+                             bloqueado): se descarta y el trabajo falla
+
+        Returns:
+            tuple: (código de salida, stdout, stderr)
+        """
+        if self._closed:
+            raise RuntimeError("El pool de yt-dlp está cerrado")
+        worker = self._checkout()
+        stdout, stderr = deque(maxlen=max_lines), deque(maxlen=max_lines)
+        try:
+            worker.conn.send(list(args))
+            while True:
+                if timeout and not worker.conn.poll(timeout):
+                    self._discard(worker)
+                    stderr.append(
+                        f"ERROR: yt-dlp no respondió en {timeout:g} s; se detuvo el trabajo"
+                    )
+                    return 1, "\n".join(stdout), "\n".join(stderr)
+                kind, payload = worker.conn.recv()
+                if kind == "exit":
+                    returncode = payload
+                    break
+                if on_line and on_line(kind, payload):
+                    continue
+                (stdout if kind == "out" else stderr).append(payload)
+        except (EOFError, OSError):
+            # El trabajador murió a mitad de trabajo (EOF, conexión reiniciada
+            # o tubería rota): se descarta y el trabajo falla como una
+            # ejecución de yt-dlp con código 1, que run_yt_dlp convierte en
+            # CalledProcessError.
+            self._discard(worker)
+            stderr.append("ERROR: el proceso trabajador de yt-dlp terminó inesperadamente")
+            return 1, "\n".join(stdout), "\n".join(stderr)
+        except BaseException:
+            self._discard(worker)
+            raise
+
+        worker.jobs += 1
+        if worker.jobs >= MAX_JOBS_PER_WORKER:
+            self._discard(worker)
+        else:
+            self._idle.put(worker)
+        return returncode, "\n".join(stdout), "\n".join(stderr)
+
+    def close(self):
+        """Detiene todos los trabajadores ociosos."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _module_version():
+    """Versión del paquete yt_dlp de este intérprete, sin importarlo."""
+    spec = importlib.util.find_spec("yt_dlp")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], "version.py")
+    try:
+        with open(path, encoding="utf-8") as f:
+            match = _VERSION_RE.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def is_available():
+    """
+    True si el pool ejecutaría el mismo yt-dlp que el modo subproceso: el
+    módulo yt_dlp de este intérprete debe tener la versión del 'yt-dlp' del
+    PATH (el que comprueba check_dependencies y actualiza update_yt_dlp). Si
+    son instalaciones distintas se usa el del PATH.
+    """
+    from utils.dependency_cache import probe
+
+    module_version = _module_version()
+    if not module_version:
+        return False
+    binary = probe("yt-dlp")
+    return binary["ok"] and binary["version"] == module_version
+
+
+def get_pool(env=None):
+    """Retorna el pool compartido del proceso, creándolo la primera vez."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = YtDlpPool(env)
+            atexit.register(_pool.close)
+        return _pool
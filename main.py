@@ -1,16 +1,10 @@
 import argparse
 import os
 import sys
-import time  # Import the time module
 
-from config import user_settings
-from config.config_manager import get_default_path
-# Importa el nuevo módulo downloader
-from core import audio, batch, playlist, downloader
-from ui import tui  # Importa el módulo tui completo
-from ui.tui import get_random_urlvideo_logo  # Importar la nueva función de logo
-from utils.path_manager import create_directories
-from utils.validator import check_dependencies, update_yt_dlp
+# Los módulos de descarga y la TUI se importan dentro de cada comando: así
+# 'tud --help' o 'tud audio ...' solo cargan lo que usan
+# (scripts/bench_startup.py vigila el coste de arranque).
 
 # Agrega el directorio raíz del proyecto al sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -21,6 +15,8 @@ def get_output_path_from_user():
     Muestra la ruta de descarga predeterminada y pregunta al usuario si desea
     usarla o introducir una nueva.
     """
+    from config.config_manager import get_default_path
+
     default_path = get_default_path()
     print(f"La ruta de descarga predeterminada es: {default_path}")
     choice = input("¿Usar esta ruta? (s/n): ").lower()
@@ -63,6 +59,14 @@ def get_output_path_from_user():
 
 
 def interactive_mode():
+    import time
+
+    from config import user_settings
+    from core import audio, batch, downloader, playlist
+    from ui import tui
+    from ui.tui import get_random_urlvideo_logo
+    from utils.validator import update_yt_dlp
+
     main_menu_options = {
         "1": "Descargar Video",
         "2": "Descargar Solo Audio",
@@ -239,8 +243,7 @@ def main():
     video_parser.add_argument(
         "--route",
         dest="output_path",
-        default=get_default_path(),
-        help="Ruta de salida para la descarga")
+        help="Ruta de salida para la descarga (por defecto: la ruta configurada)")
     video_parser.add_argument(
         "--cookies",
         dest="cookies_file",
@@ -268,8 +271,7 @@ def main():
     audio_parser.add_argument(
         "--route",
         dest="output_path",
-        default=get_default_path(),
-        help="Ruta de salida para la descarga")
+        help="Ruta de salida para la descarga (por defecto: la ruta configurada)")
     audio_parser.add_argument(
         "--cookies",
         dest="cookies_file",
@@ -286,12 +288,15 @@ def main():
     playlist_parser.add_argument(
         "--route",
         dest="output_path",
-        default=get_default_path(),
-        help="Ruta de salida para la descarga")
+        help="Ruta de salida para la descarga (por defecto: la ruta configurada)")
     playlist_parser.add_argument(
         "--cookies",
         dest="cookies_file",
         help="Ruta al archivo de cookies")
+    playlist_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Número de entradas descargadas a la vez (por defecto: 'parallel_jobs' de la configuración)")
 
     # Batch command
     batch_parser = subparsers.add_parser("batch", help="Descarga masiva desde archivo")
@@ -307,27 +312,109 @@ def main():
     batch_parser.add_argument(
         "--route",
         dest="output_path",
-        default=get_default_path(),
-        help="Ruta de salida para la descarga")
+        help="Ruta de salida para la descarga (por defecto: la ruta configurada)")
     batch_parser.add_argument(
         "--cookies",
         dest="cookies_file",
         help="Ruta al archivo de cookies")
+    batch_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Número de descargas simultáneas (por defecto: 'batch_jobs' de la configuración, 1)")
+    batch_parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignora el progreso guardado y procesa el archivo desde el principio")
+    batch_parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        default=None,
+        help="Separar descargas y conversión/fusión con ffmpeg en dos etapas paralelas")
+
+    # Archive command
+    archive_parser = subparsers.add_parser(
+        "archive", help="Importar/exportar el archivo de descargas (formato yt-dlp)")
+    archive_parser.add_argument(
+        "action", choices=["import", "export"], help="Acción a realizar")
+    archive_parser.add_argument(
+        "archive_file", help="Archivo en formato --download-archive de yt-dlp")
+    archive_parser.add_argument(
+        "--type",
+        dest="media_type",
+        choices=["video", "audio"],
+        default="video",
+        help="Archivo de descargas de video o de audio (por defecto: video)")
+
+    # Logs command
+    logs_parser = subparsers.add_parser(
+        "logs", help="Consultar downloader.log (incluidos los segmentos rotados)")
+    logs_parser.add_argument(
+        "--level",
+        action="append",
+        type=str.upper,
+        help="Nivel a mostrar (ERROR, WARNING, INFO...); se puede repetir")
+    logs_parser.add_argument("--url", help="Solo entradas cuya URL contenga este texto")
+    logs_parser.add_argument("--platform", help="Solo entradas de esta plataforma")
+    logs_parser.add_argument(
+        "--since", help="Desde una fecha ('YYYY-mm-dd[ HH:MM]') o hace un tiempo ('2h', '1d')")
+    logs_parser.add_argument("--until", help="Hasta una fecha (mismo formato que --since)")
+    logs_parser.add_argument(
+        "-n", "--limit", type=int, help="Mostrar solo las últimas N entradas")
+    logs_parser.add_argument(
+        "-f", "--follow",
+        action="store_true",
+        help="Seguir mostrando las entradas nuevas (Ctrl+C para salir)")
+
+    # Stats command
+    stats_parser = subparsers.add_parser(
+        "stats", help="Percentiles de duración y velocidad de las descargas registradas")
+    stats_parser.add_argument(
+        "--type",
+        dest="media_type",
+        choices=["video", "audio"],
+        help="Limitar a un tipo de medio")
+
+    # Verify command
+    verify_parser = subparsers.add_parser(
+        "verify", help="Verificar la integridad de los archivos de un directorio")
+    verify_parser.add_argument("directory", help="Directorio a verificar (recursivo)")
+    verify_parser.add_argument(
+        "--type",
+        dest="media_type",
+        choices=["video", "audio"],
+        help="Tipo de medio esperado (por defecto: según la extensión)")
+    verify_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Archivos verificados a la vez (por defecto: 'verify_workers' de la configuración)")
 
     if len(sys.argv) == 1:
+        from config.config_manager import get_default_path
+        from utils.path_manager import create_directories
+        from utils.validator import check_dependencies
+
         check_dependencies()
         create_directories(get_default_path())
         interactive_mode()
         return
 
     args = parser.parse_args()
+    if getattr(args, "output_path", "") is None:
+        from config.config_manager import get_default_path
+        args.output_path = get_default_path()
 
     if args.command == "setup":
+        from config.config_manager import get_default_path
+        from utils.path_manager import create_directories
+        from utils.validator import check_dependencies
+
         print("Ejecutando setup...")
         check_dependencies()
         create_directories(get_default_path())
         print("¡Setup completado exitosamente!")
     elif args.command == "video":
+        from core import downloader
+
         print(f"Descargando video desde: {args.url}")
         result = downloader.download_and_merge_video_audio(
             args.url,
@@ -340,6 +427,8 @@ def main():
         else:
             print("❌ Falló la descarga del video")
     elif args.command == "audio":
+        from core import audio
+
         print(f"Descargando audio desde: {args.url}")
         success = audio.download_audio(
             args.url,
@@ -350,11 +439,15 @@ def main():
             verbose=True,
             cookies_file=args.cookies_file
         )
-        if success:
+        if isinstance(success, str):
+            print(f"✅ Audio descargado exitosamente: {success}")
+        elif success:
             print("✅ Audio descargado exitosamente")
         else:
             print("❌ Falló la descarga del audio")
     elif args.command == "playlist":
+        from core import playlist
+
         print(f"Descargando playlist desde: {args.url}")
         if args.media_type == "video":
             playlist.download_playlist_video(
@@ -362,7 +455,8 @@ def main():
                 quality=args.quality,
                 output_path=args.output_path,
                 verbose=True,
-                cookies_file=args.cookies_file
+                cookies_file=args.cookies_file,
+                jobs=args.jobs
             )
         else:  # audio
             playlist.download_playlist_audio(
@@ -371,20 +465,58 @@ def main():
                 bitrate="best",
                 output_path=args.output_path,
                 verbose=True,
-                cookies_file=args.cookies_file
+                cookies_file=args.cookies_file,
+                jobs=args.jobs
             )
         print("✅ Playlist descargada exitosamente")
     elif args.command == "batch":
+        from core import batch
+
         print(f"Descargando en batch desde archivo: {args.file_path}")
+        if args.restart:
+            from core import ledger
+            ledger.reset_batch(args.file_path, args.media_type)
         batch.process_batch_download(
             args.file_path,
             output_path=args.output_path,
             media_type=args.media_type,
             config_option=args.config_option,
             verbose=True,
-            cookies_file=args.cookies_file
+            cookies_file=args.cookies_file,
+            jobs=args.jobs,
+            use_pipeline=args.pipeline
         )
         print("✅ Descarga batch completada")
+    elif args.command == "archive":
+        from core import archive
+        download_archive = archive.get_archive(args.media_type)
+        if args.action == "import":
+            added = download_archive.import_file(args.archive_file)
+            print(f"✅ {added} entradas nuevas importadas al archivo de {args.media_type}")
+        else:
+            exported = download_archive.export_file(args.archive_file)
+            print(f"✅ {exported} entradas exportadas a: {args.archive_file}")
+    elif args.command == "logs":
+        from utils import log_query
+        log_query.run_logs_command(
+            levels=args.level,
+            url=args.url,
+            platform=args.platform,
+            since=args.since,
+            until=args.until,
+            limit=args.limit,
+            follow=args.follow
+        )
+    elif args.command == "stats":
+        from core import stats
+        stats.print_stats(media_type=args.media_type)
+    elif args.command == "verify":
+        from core import verifier
+        reports = verifier.verify_directory(
+            args.directory, media_type=args.media_type, workers=args.jobs
+        )
+        if reports is None or any(r["status"] == verifier.CORRUPT for r in reports):
+            sys.exit(1)
     else:
         parser.print_help()
 
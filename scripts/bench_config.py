@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark: coste por llamada de get_config_value con la caché en memoria
+frente a releer y parsear config.json en cada llamada (comportamiento previo).
+
+Uso:
+    python scripts/bench_config.py [--calls N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config_manager  # noqa: E402
+
+
+def bench_uncached(calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        # Sin caché: se relee el archivo y se sondea la ruta de descargas.
+        config_manager.reload_config()
+        config_manager.get_config_value("max_retries")
+    return (time.perf_counter() - start) / calls
+
+
+def bench_cached(calls):
+    config_manager.get_config_value("max_retries")
+    start = time.perf_counter()
+    for _ in range(calls):
+        config_manager.get_config_value("max_retries")
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=2000)
+    options = parser.parse_args()
+
+    uncached = bench_uncached(options.calls)
+    cached = bench_cached(options.calls)
+    print(f"sin caché   {uncached * 1e6:10.1f} µs/llamada")
+    print(f"con caché   {cached * 1e6:10.1f} µs/llamada")
+    print(f"Ahorro por llamada: {(uncached - cached) * 1e6:.1f} µs ({uncached / cached:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
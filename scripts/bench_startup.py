@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: coste de arranque en frío del punto de entrada 'tud'.
+
+Ejecuta main.py con '-X importtime' en procesos nuevos y suma el tiempo
+propio de importación de los paquetes de tud (config, core, ui, utils). La
+biblioteca estándar que arrastran (argparse, locale, gettext...) se muestra
+aparte y no cuenta para el presupuesto: depende de la máquina y no del
+código de tud. Falla (código 1) si se supera el presupuesto o si un comando
+ligero importa módulos pesados que no necesita.
+
+Uso:
+    python scripts/bench_startup.py [--runs N] [--budget-ms MS]
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# Comandos medidos; ninguno descarga nada. Se ejecutan con un HOME vacío,
+# así que 'logs' no encuentra log que leer y solo mide sus importaciones.
+SCENARIOS = [
+    ["--help"],
+    ["audio", "--help"],
+    ["logs", "--help"],
+    ["logs", "--until", "2000-01-01"],
+]
+
+# Paquetes propios de tud; su tiempo es el que cuenta para el presupuesto
+PROJECT_PACKAGES = ("config", "core", "ui", "utils", "main")
+
+# Módulos que un comando que solo muestra ayuda no debe importar
+FORBIDDEN = (
+    "ui.tui",
+    "core.downloader",
+    "core.video",
+    "core.batch",
+    "yt_dlp",
+    "multiprocessing",
+    "numpy",
+)
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """Retorna {módulo: tiempo propio en µs} de la salida de -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(1))
+    return modules
+
+
+def is_project_module(name):
+    return any(name == p or name.startswith(p + ".") for p in PROJECT_PACKAGES)
+
+
+def run_once(args, home):
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=dict(os.environ, HOME=home),
+        check=False,
+    )
+    return time.perf_counter() - start, parse_importtime(process.stderr)
+
+
+def measure(args, runs, baseline, home):
+    """Mejor de runs ejecuciones: (proceso s, tud µs, stdlib µs, módulos)."""
+    best_wall, best = None, None
+    for _ in range(runs):
+        wall, imported = run_once([MAIN] + args, home)
+        modules = {name: us for name, us in imported.items() if name not in baseline}
+        project_us = sum(us for name, us in modules.items() if is_project_module(name))
+        if best is None or project_us < best[0]:
+            best = (project_us, sum(modules.values()) - project_us, modules)
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+    return (best_wall,) + best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=20.0,
+        help="Tiempo máximo de importación de los paquetes de tud por comando (ms)")
+    parser.add_argument(
+        "--top", type=int, default=5, help="Módulos más lentos a mostrar por comando")
+    options = parser.parse_args()
+
+    home = tempfile.mkdtemp(prefix="tud-bench-")
+    _, baseline = run_once(["-c", "pass"], home)
+    failed = False
+    for args in SCENARIOS:
+        wall, project_us, other_us, modules = measure(args, options.runs, baseline, home)
+        label = "tud " + " ".join(args)
+        over = project_us / 1000.0 > options.budget_ms
+        forbidden = sorted(
+            name for name in modules
+            if any(name == f or name.startswith(f + ".") for f in FORBIDDEN)
+        )
+        status = "FALLO" if over or forbidden else "ok"
+        print(
+            f"{label:<32} tud: {project_us / 1000.0:6.1f} ms   "
+            f"stdlib: {other_us / 1000.0:6.1f} ms   "
+            f"proceso: {wall * 1000.0:6.1f} ms   [{status}]"
+        )
+        for name, us in sorted(modules.items(), key=lambda item: -item[1])[:options.top]:
+            print(f"    {us / 1000.0:6.2f} ms  {name}")
+        if forbidden:
+            print(f"    importa módulos innecesarios: {', '.join(forbidden)}")
+        failed = failed or over or bool(forbidden)
+    shutil.rmtree(home, ignore_errors=True)
+
+    if failed:
+        print(f"Arranque por encima del presupuesto ({options.budget_ms:.1f} ms).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
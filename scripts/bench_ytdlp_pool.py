@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: coste por trabajo de yt-dlp lanzado como proceso nuevo frente al
+pool de procesos ya inicializados (core.ytdlp_pool).
+
+Uso:
+    python scripts/bench_ytdlp_pool.py [--runs N] [--args "--version"]
+
+Por defecto ejecuta 'yt-dlp --version', que mide solo el arranque (intérprete
++ importación de yt_dlp) sin tocar la red. Para medir con una URL real:
+    python scripts/bench_ytdlp_pool.py --args "--simulate --no-warnings URL"
+"""
+import argparse
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ytdlp_pool  # noqa: E402
+from core.downloader import build_termux_env  # noqa: E402
+
+
+def bench_subprocess(args, runs, env):
+    command = [shutil.which("yt-dlp") or "yt-dlp"] + args
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, env=env, check=False)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_pool(args, runs, env):
+    pool = ytdlp_pool.YtDlpPool(env)
+    timings = []
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            pool.run(args)
+            timings.append(time.perf_counter() - start)
+    finally:
+        pool.close()
+    return timings
+
+
+def report(name, timings):
+    warm = timings[1:] or timings
+    print(
+        f"{name:<12} primero: {timings[0] * 1000:8.1f} ms   "
+        f"media (resto): {sum(warm) / len(warm) * 1000:8.1f} ms"
+    )
+    return sum(warm) / len(warm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--args", default="--version")
+    options = parser.parse_args()
+
+    if not ytdlp_pool.is_available():
+        print("El módulo yt_dlp no está instalado en este intérprete.")
+        return 1
+
+    args = shlex.split(options.args)
+    env = build_termux_env()
+    sub = report("subprocess", bench_subprocess(args, options.runs, env))
+    pool = report("pool", bench_pool(args, options.runs, env))
+    print(f"Ahorro por trabajo: {(sub - pool) * 1000:.1f} ms ({sub / pool:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
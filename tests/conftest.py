@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Todo el estado de la aplicación (~/.termux_ultra_downloader: config, logs,
+# cachés, ledger, métricas) se aísla en un HOME temporal. Debe fijarse antes
+# de importar los módulos, que calculan sus rutas al importarse.
+os.environ["HOME"] = tempfile.mkdtemp(prefix="tud-tests-")
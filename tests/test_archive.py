@@ -0,0 +1,120 @@
+import pytest
+
+from core import archive
+from core.archive import DownloadArchive, archive_id_for_url
+
+
+@pytest.mark.parametrize("url, entry", [
+    ("https://youtu.be/dQw4w9WgXcQ?t=3", "youtube dQw4w9WgXcQ"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/abcdefghijk", "youtube abcdefghijk"),
+    ("https://www.tiktok.com/@u/video/7234567890123456789", "tiktok 7234567890123456789"),
+    ("https://x.com/u/status/123456", "twitter 123456"),
+    ("https://www.instagram.com/reel/Cabc123/", "instagram Cabc123"),
+])
+def test_archive_id_for_url(url, entry):
+    assert archive_id_for_url(url) == entry
+
+
+def test_archive_id_unknown_site():
+    assert archive_id_for_url("https://example.com/v.mp4") is None
+
+
+@pytest.fixture
+def archive_file(tmp_path):
+    return tmp_path / "download_archive_video.txt"
+
+
+def test_lookup_normalizes_entries(archive_file):
+    archive_file.write_text("Youtube  dQw4w9WgXcQ\ntiktok 123\nbasura\n", encoding="utf-8")
+    downloads = DownloadArchive(str(archive_file))
+
+    assert "youtube dQw4w9WgXcQ" in downloads
+    assert "YouTube dQw4w9WgXcQ" in downloads
+    assert "tiktok 123" in downloads
+    assert "tiktok 456" not in downloads
+    assert "" not in downloads
+    assert len(downloads) == 2
+
+
+def test_missing_file_is_empty(archive_file):
+    downloads = DownloadArchive(str(archive_file))
+
+    assert len(downloads) == 0
+    assert "youtube x" not in downloads
+
+
+def test_add_appends_once(archive_file):
+    downloads = DownloadArchive(str(archive_file))
+
+    assert downloads.add("youtube abc")
+    assert not downloads.add("Youtube abc")
+    assert not downloads.add("sin-id")
+    assert archive_file.read_text(encoding="utf-8") == "youtube abc\n"
+    assert "youtube abc" in downloads
+
+
+def test_sees_lines_appended_by_yt_dlp(archive_file):
+    archive_file.write_text("youtube a\n", encoding="utf-8")
+    downloads = DownloadArchive(str(archive_file))
+    assert "youtube b" not in downloads
+
+    with open(archive_file, "a", encoding="utf-8") as f:
+        f.write("youtube b\nyoutube c")  # última línea a medias
+    assert "youtube b" in downloads
+    assert "youtube c" not in downloads
+
+    with open(archive_file, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert "youtube c" in downloads
+
+
+def test_reloads_truncated_file(archive_file):
+    archive_file.write_text("youtube a\nyoutube b\n", encoding="utf-8")
+    downloads = DownloadArchive(str(archive_file))
+    assert "youtube a" in downloads
+
+    archive_file.write_text("tiktok 1\n", encoding="utf-8")
+    assert "youtube a" not in downloads
+    assert "tiktok 1" in downloads
+
+
+def test_merges_recent_entries_into_sorted_index(archive_file, monkeypatch):
+    monkeypatch.setattr(archive, "_MERGE_THRESHOLD", 4)
+    entries = [f"youtube id{i}" for i in range(10)]
+    archive_file.write_text("".join(e + "\n" for e in entries[:6]), encoding="utf-8")
+    downloads = DownloadArchive(str(archive_file))
+    assert len(downloads) == 6
+
+    for entry in entries[6:]:
+        downloads.add(entry)
+
+    assert len(downloads) == 10
+    assert all(entry in downloads for entry in entries)
+    assert "youtube id10" not in downloads
+
+
+def test_import_and_export(archive_file, tmp_path):
+    downloads = DownloadArchive(str(archive_file))
+    downloads.add("youtube a")
+    source = tmp_path / "yt-dlp-archive.txt"
+    source.write_text("youtube a\nYoutube b\nyoutube b\n\ntiktok 1\n", encoding="utf-8")
+
+    assert downloads.import_file(str(source)) == 2
+    assert downloads.import_file(str(source)) == 0
+    assert "tiktok 1" in downloads
+
+    destination = tmp_path / "export.txt"
+    assert downloads.export_file(str(destination)) == 3
+    assert destination.read_text(encoding="utf-8") == "youtube a\nyoutube b\ntiktok 1\n"
+
+
+def test_is_downloaded_uses_media_type_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(archive, "_archives", {})
+    archive.get_archive("video").add("youtube dQw4w9WgXcQ")
+
+    url = "https://youtu.be/dQw4w9WgXcQ"
+    assert archive.is_downloaded(url, "video")
+    assert not archive.is_downloaded(url, "audio")
+    assert not archive.is_downloaded("https://example.com/v.mp4", "video")
@@ -0,0 +1,135 @@
+import pytest
+
+from core import audio_planner, pipeline
+from core.audio_planner import COPY, REMUX, TRANSCODE
+
+# Formatos típicos de YouTube: Opus de más calidad y un AAC algo peor
+INFO = {
+    "duration": 200,
+    "formats": [
+        {"format_id": "251", "ext": "webm", "acodec": "opus", "vcodec": "none", "abr": 160},
+        {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 129},
+        {"format_id": "18", "ext": "mp4", "acodec": "mp4a.40.2", "vcodec": "avc1", "tbr": 500},
+    ],
+}
+
+
+@pytest.mark.parametrize("acodec, expected", [
+    ("mp4a.40.2", "aac"), ("opus", "opus"), ("pcm_s16le", "pcm"),
+    ("none", None), (None, None), ("ogg", "vorbis"),
+])
+def test_normalize_codec(acodec, expected):
+    assert audio_planner.normalize_codec(acodec) == expected
+
+
+@pytest.mark.parametrize("target, format_id, action, ext, avoided", [
+    ("m4a", "140", COPY, "m4a", True),
+    ("opus", "251", REMUX, "opus", False),
+    ("mp3", "251", TRANSCODE, "mp3", False),
+    ("best", "251", REMUX, "opus", False),
+])
+def test_plan_audio(target, format_id, action, ext, avoided):
+    plan = audio_planner.plan_audio(INFO, target)
+    assert plan["format"]["format_id"] == format_id
+    assert (plan["action"], plan["ext"], plan["avoided"]) == (action, ext, avoided)
+    assert plan["selector"] == f"{format_id}/bestaudio/best"
+
+
+def test_plan_audio_keeps_best_track_when_compatible_is_much_worse():
+    info = {"formats": [
+        {"format_id": "251", "ext": "webm", "acodec": "opus", "vcodec": "none", "abr": 160},
+        {"format_id": "139", "ext": "m4a", "acodec": "mp4a.40.5", "vcodec": "none", "abr": 48},
+    ]}
+    plan = audio_planner.plan_audio(info, "m4a")
+    assert plan["format"]["format_id"] == "251"
+    assert plan["action"] == TRANSCODE
+
+
+def test_plan_audio_missing_vcodec_is_not_audio_only():
+    # Un combinado sin 'vcodec' en el -J no debe tomarse por pista de audio
+    info = {"formats": [
+        {"format_id": "progressive", "ext": "mp4", "acodec": "mp4a.40.2", "tbr": 900},
+        {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 129},
+    ]}
+    plan = audio_planner.plan_audio(info, "m4a")
+    assert plan["format"]["format_id"] == "140"
+    assert plan["action"] == COPY
+
+
+def test_plan_audio_without_audio_formats():
+    assert audio_planner.plan_audio({"formats": [{"format_id": "1", "acodec": "none"}]}, "mp3") is None
+    assert audio_planner.plan_audio(None, "mp3") is None
+
+
+def test_downloaded_action_uses_the_real_format():
+    # El plan pedía 140 (AAC, copia) pero yt-dlp descargó 251 (Opus).
+    assert audio_planner.downloaded_action(INFO, "140", "m4a") == COPY
+    assert audio_planner.downloaded_action(INFO, "251", "m4a") == TRANSCODE
+    assert audio_planner.downloaded_action(INFO, "999", "m4a") is None
+
+
+def test_record_counts_avoided_only_when_no_transcode_happened():
+    plan = audio_planner.plan_audio(INFO, "m4a")
+    before = audio_planner.snapshot()
+    audio_planner.record(plan, 200)
+    audio_planner.record(plan, 200, TRANSCODE)
+    after = audio_planner.snapshot()
+    assert after[COPY] - before[COPY] == 1
+    assert after[TRANSCODE] - before[TRANSCODE] == 1
+    assert after["avoided"] - before["avoided"] == 1
+    assert after["avoided_seconds"] - before["avoided_seconds"] == 200
+
+
+@pytest.fixture
+def staged_audio(tmp_path, monkeypatch):
+    """Tarea de process_audio con ffprobe y ffmpeg simulados."""
+    source = tmp_path / "abc.webm"
+    source.write_bytes(b"audio")
+    commands = []
+
+    def run_ffmpeg(command, output_file):
+        commands.append(command)
+        with open(output_file, "wb") as f:
+            f.write(b"out")
+        return True, None
+
+    def stage(target, real_codec):
+        monkeypatch.setattr(pipeline.ffmpeg_utils, "get_ffmpeg_path", lambda: None)
+        monkeypatch.setattr(pipeline.media_inspector, "inspect_file", lambda path, ffprobe=None: {
+            "error": None,
+            "streams": [{"codec_type": "audio", "codec_name": real_codec}],
+        })
+        monkeypatch.setattr(pipeline, "_run_ffmpeg", run_ffmpeg)
+        plan = audio_planner.plan_audio(INFO, target)
+        return {
+            "kind": "audio", "url": "https://www.youtube.com/watch?v=abcdefghijk",
+            "platform": "YouTube", "job": None, "info": INFO, "source": str(source),
+            "output": str(tmp_path / f"abc.{plan['ext']}"), "format": target,
+            "plan": plan, "bitrate": "best", "archive": False,
+        }
+
+    return stage, commands
+
+
+def test_process_audio_transcodes_when_fallback_codec_differs(staged_audio):
+    stage, commands = staged_audio
+    # Plan: copiar AAC a m4a; el archivo descargado resultó ser Opus.
+    task = stage("m4a", "opus")
+    assert task["plan"]["action"] == COPY
+    assert pipeline.process_audio(task) == task["output"]
+    assert "copy" not in commands[0]
+    assert commands[0][commands[0].index("-c:a") + 1] == "aac"
+
+
+def test_process_audio_copies_when_real_codec_matches(staged_audio):
+    stage, commands = staged_audio
+    task = stage("m4a", "aac")
+    pipeline.process_audio(task)
+    assert commands[0][commands[0].index("-c:a") + 1] == "copy"
+
+
+def test_process_audio_best_keeps_real_codec_extension(staged_audio, tmp_path):
+    stage, commands = staged_audio
+    task = stage("best", "aac")
+    assert pipeline.process_audio(task) == str(tmp_path / "abc.m4a")
+    assert commands[0][commands[0].index("-c:a") + 1] == "copy"
@@ -0,0 +1,80 @@
+import pytest
+
+from core import archive, batch, ledger, verifier
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+CORRUPT = {"error": None, "duration": 0, "streams": []}
+HEALTHY = {
+    "error": None, "duration": 60.0,
+    "streams": [{"codec_type": "video", "codec_name": "h264"},
+                {"codec_type": "audio", "codec_name": "aac"}],
+}
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger, "LEDGER_FILE", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(ledger, "_migrated", False)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(archive, "_archives", {})
+    monkeypatch.setattr(verifier, "ffprobe_available", lambda: True)
+    monkeypatch.setattr(verifier, "log_message", lambda *args, **kwargs: None)
+    monkeypatch.setattr(batch, "log_message", lambda *args, **kwargs: None)
+    batch_file = tmp_path / "urls.txt"
+    batch_file.write_text(URL + "\n", encoding="utf-8")
+    return batch_file
+
+
+def test_corrupt_download_is_downloaded_again(tmp_path, state, monkeypatch):
+    output = tmp_path / "out"
+    final = output / "video.mp4"
+    attempts = []
+    probes = iter([CORRUPT, HEALTHY])
+
+    def download_video(url, output_path, **kwargs):
+        # Igual que yt-dlp con --download-archive y --no-overwrites
+        if archive.is_downloaded(url, "video"):
+            return True
+        attempts.append(url)
+        assert not final.exists()
+        final.write_bytes(b"video")
+        archive.get_archive("video").add(archive.archive_id_for_url(url))
+        return str(final)
+
+    monkeypatch.setattr(batch, "download_video", download_video)
+    monkeypatch.setattr(verifier.media_inspector, "inspect_file", lambda path: next(probes))
+
+    def run():
+        return batch.process_batch_download(
+            str(state), str(output), "video", "720p", False, None, jobs=1,
+        )
+
+    run()
+    assert attempts == [URL]
+    assert not archive.is_downloaded(URL, "video")
+    assert (output / "video.mp4.corrupt").read_bytes() == b"video"
+
+    run()
+    assert attempts == [URL, URL]
+    assert archive.is_downloaded(URL, "video")
+    assert ledger.get_batch_status(str(state), "video") == {"done": 1}
+
+    # Verificado: la tercera ejecución ya no descarga nada
+    assert run() == []
+    assert attempts == [URL, URL]
+
+
+def test_archive_remove_keeps_other_entries(tmp_path):
+    path = tmp_path / "download_archive_video.txt"
+    path.write_text("youtube a\nYoutube b\ntiktok 1\n", encoding="utf-8")
+    downloads = archive.DownloadArchive(str(path))
+    assert "youtube b" in downloads
+
+    assert downloads.remove("youtube b")
+    assert not downloads.remove("youtube b")
+
+    assert "youtube b" not in downloads
+    assert "youtube a" in downloads and "tiktok 1" in downloads
+    assert path.read_text(encoding="utf-8") == "youtube a\ntiktok 1\n"
+    assert list(tmp_path.iterdir()) == [path]
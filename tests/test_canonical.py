@@ -0,0 +1,51 @@
+import pytest
+
+from core.canonical import canonical_key, dedupe_urls, normalize_url
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"https://youtube.com/watch?v={VIDEO_ID}&t=42&si=abc",
+    f"https://m.youtube.com/watch?feature=share&v={VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?si=xyz",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}&utm_source=newsletter#comments",
+])
+def test_youtube_variants_share_a_key(url):
+    assert canonical_key(url) == ("YouTube", f"youtube_{VIDEO_ID}")
+
+
+def test_normalize_url_sorts_params_and_drops_tracking():
+    assert normalize_url("HTTP://Example.com/a/?b=2&a=1&utm_medium=x&fbclid=y#frag") == \
+        "https://example.com/a?a=1&b=2"
+
+
+@pytest.mark.parametrize("param", ["s", "t", "start", "ref", "app", "share_url"])
+def test_generic_urls_keep_platform_specific_params(param):
+    first = f"https://example.com/watch?{param}=123"
+    second = f"https://example.com/watch?{param}=456"
+    assert canonical_key(first) != canonical_key(second)
+    assert dedupe_urls([first, second]) == ([first, second], 0)
+
+
+def test_generic_urls_drop_universal_tracking_params():
+    first = "https://example.com/video/9?utm_source=a&gclid=1"
+    second = "https://example.com/video/9"
+    assert canonical_key(first) == canonical_key(second)
+
+
+def test_twitter_share_params_are_dropped():
+    assert canonical_key("https://x.com/user/status/123?s=20&t=abc") == \
+        canonical_key("https://twitter.com/user/status/123")
+
+
+def test_dedupe_keeps_first_occurrence_in_order():
+    urls = [
+        f"https://youtu.be/{VIDEO_ID}",
+        "https://example.com/a",
+        f"https://www.youtube.com/watch?v={VIDEO_ID}&t=10",
+        "https://example.com/a/",
+    ]
+    assert dedupe_urls(urls) == ([urls[0], urls[1]], 2)
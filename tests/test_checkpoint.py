@@ -0,0 +1,54 @@
+import pytest
+
+from core import checkpoint
+
+INFO = {"id": "abc"}
+VIDEO = {"format_id": "137", "ext": "mp4", "filesize": 5}
+AUDIO = {"format_id": "140", "ext": "m4a"}
+PLAN = {"video": VIDEO, "audio": AUDIO, "combined": None}
+
+
+@pytest.fixture(autouse=True)
+def quiet_log(monkeypatch):
+    monkeypatch.setattr(checkpoint, "log_message", lambda *args, **kwargs: None)
+
+
+def _write_components(directory, video=b"12345", audio=b"a"):
+    (directory / "abc.f137.mp4").write_bytes(video)
+    (directory / "abc.f140.m4a").write_bytes(audio)
+
+
+def test_paths(tmp_path):
+    assert checkpoint.component_path(str(tmp_path), INFO, VIDEO) == str(tmp_path / "abc.f137.mp4")
+    assert checkpoint.component_path(str(tmp_path), INFO, {"format_id": "x"}).endswith("abc.fx.mp4")
+    assert checkpoint.final_path(str(tmp_path), INFO, "mkv") == str(tmp_path / "abc.mkv")
+
+
+def test_verified_components(tmp_path):
+    _write_components(tmp_path)
+
+    assert checkpoint.verified_components(str(tmp_path), INFO, PLAN) == {
+        "video": str(tmp_path / "abc.f137.mp4"),
+        "audio": str(tmp_path / "abc.f140.m4a"),
+    }
+
+
+@pytest.mark.parametrize("setup", [
+    lambda d: _write_components(d, video=b"123"),          # tamaño distinto de 'filesize'
+    lambda d: _write_components(d, audio=b""),             # componente vacío
+    lambda d: (d / "abc.f137.mp4").write_bytes(b"12345"),  # falta el audio
+    lambda d: (_write_components(d), (d / "abc.f140.m4a.part").write_bytes(b"x")),
+])
+def test_incomplete_components_are_not_reused(tmp_path, setup):
+    setup(tmp_path)
+
+    assert checkpoint.verified_components(str(tmp_path), INFO, PLAN) is None
+
+
+def test_combined_or_missing_plan(tmp_path):
+    _write_components(tmp_path)
+
+    assert checkpoint.verified_components(str(tmp_path), INFO, None) is None
+    assert checkpoint.verified_components(str(tmp_path), {}, PLAN) is None
+    combined = {"video": None, "audio": None, "combined": {"format_id": "22"}}
+    assert checkpoint.verified_components(str(tmp_path), INFO, combined) is None
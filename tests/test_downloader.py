@@ -0,0 +1,33 @@
+import pytest
+
+from core.downloader import classify_yt_dlp_error
+
+
+@pytest.mark.parametrize("output", [
+    "ERROR: Postprocessing: Conversion failed!",
+    "[download] 100%\nERROR: Postprocessing: ffprobe and ffmpeg not found. Please install",
+    "ERROR: [EmbedThumbnail] abc123: Unable to embed thumbnail",
+])
+def test_postprocess_errors(output):
+    assert classify_yt_dlp_error(output) == "postprocess"
+
+
+@pytest.mark.parametrize("output", [
+    "ERROR: [youtube] abc123: Unable to download thumbnail: HTTP Error 404",
+    "ERROR: [instagram] abc123: ffprobe-like extractor message",
+    "ERROR: unable to download video data: <urlopen error timed out>",
+    "",
+    None,
+])
+def test_download_errors(output):
+    assert classify_yt_dlp_error(output) == "download"
+
+
+def test_stale_errors():
+    output = "ERROR: unable to download video data: HTTP Error 403: Forbidden"
+    assert classify_yt_dlp_error(output) == "stale"
+
+
+def test_only_error_lines_are_considered():
+    output = "[EmbedThumbnail] Embedding thumbnail\nERROR: unable to download video data: timed out"
+    assert classify_yt_dlp_error(output) == "download"
@@ -0,0 +1,65 @@
+import pytest
+
+from core.ffmpeg_utils import merge_codec_args
+
+
+def _probe(*streams):
+    return {
+        "error": None,
+        "streams": [{"codec_type": kind, "codec_name": name} for kind, name in streams],
+    }
+
+
+UNREADABLE = {"error": "ffprobe no encontrado", "streams": []}
+
+
+def test_copies_codecs_the_container_accepts():
+    args, modes = merge_codec_args(
+        _probe(("video", "h264")), _probe(("audio", "aac")), "/tmp/out.mp4"
+    )
+
+    assert args == ["-c:v", "copy", "-c:a", "copy"]
+    assert modes == {"video": "copia", "audio": "copia"}
+
+
+def test_transcodes_only_the_stream_that_does_not_fit():
+    args, modes = merge_codec_args(
+        _probe(("video", "vp9")), _probe(("audio", "opus")), "/tmp/out.MP4"
+    )
+
+    assert args == ["-c:v", "copy", "-c:a", "aac", "-b:a", "192k"]
+    assert modes == {"video": "copia", "audio": "recodificado (opus)"}
+
+
+def test_webm_transcodes_h264_and_aac():
+    args, modes = merge_codec_args(
+        _probe(("video", "h264")), _probe(("audio", "aac")), "/tmp/out.webm"
+    )
+
+    assert args[:2] == ["-c:v", "libvpx-vp9"]
+    assert args[args.index("-c:a") + 1] == "libopus"
+    assert modes == {"video": "recodificado (h264)", "audio": "recodificado (aac)"}
+
+
+def test_ignores_cover_art_streams():
+    video = _probe(("video", "mjpeg"), ("video", "vp8"))
+
+    args, modes = merge_codec_args(video, _probe(("audio", "mp3")), "/tmp/out.mp4")
+
+    assert args[:2] == ["-c:v", "libx264"]
+    assert modes["video"] == "recodificado (vp8)"
+    assert modes["audio"] == "copia"
+
+
+@pytest.mark.parametrize("output", ["/tmp/out.mp4", "/tmp/out.mkv"])
+def test_unreadable_components_are_copied(output):
+    args, modes = merge_codec_args(UNREADABLE, UNREADABLE, output)
+
+    assert args == ["-c:v", "copy", "-c:a", "copy"]
+    assert modes == {"video": "copia", "audio": "copia"}
+
+
+def test_mkv_accepts_any_codec():
+    args, _ = merge_codec_args(_probe(("video", "vp9")), _probe(("audio", "opus")), "/tmp/out.mkv")
+
+    assert args == ["-c:v", "copy", "-c:a", "copy"]
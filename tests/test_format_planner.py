@@ -0,0 +1,120 @@
+from core.format_planner import describe_plan, get_height_limit, plan_formats
+
+
+def _video(format_id, height, vcodec="avc1.640028", **extra):
+    return {"format_id": format_id, "height": height, "vcodec": vcodec,
+            "acodec": "none", "ext": "mp4", **extra}
+
+
+def _audio(format_id, acodec="mp4a.40.2", abr=128, **extra):
+    return {"format_id": format_id, "vcodec": "none", "acodec": acodec,
+            "abr": abr, "ext": "m4a", **extra}
+
+
+def _combined(format_id, height, **extra):
+    return {"format_id": format_id, "height": height, "vcodec": "avc1",
+            "acodec": "mp4a", "ext": "mp4", **extra}
+
+
+def test_height_limit():
+    assert get_height_limit("720p") == 720
+    assert get_height_limit("best") is None
+    assert get_height_limit("360p") == 360
+
+
+def test_picks_best_pair_within_quality():
+    info = {"formats": [
+        _video("137", 1080), _video("136", 720), _video("135", 480),
+        _audio("140", abr=128), _audio("139", abr=48),
+    ]}
+    plan = plan_formats(info, "720p")
+
+    assert plan["video"]["format_id"] == "136"
+    assert plan["audio"]["format_id"] == "140"
+    assert plan["combined"] is None
+    assert plan["selector"].startswith("136+140/")
+    assert plan["selector"].endswith("best[height<=720]")
+
+
+def test_prefers_mp4_codecs_at_same_height():
+    info = {"formats": [
+        _video("248", 1080, vcodec="vp9", tbr=3000), _video("137", 1080, tbr=2500),
+        _audio("251", acodec="opus", abr=160), _audio("140", abr=128),
+    ]}
+    plan = plan_formats(info, "1080p")
+
+    assert (plan["video"]["format_id"], plan["audio"]["format_id"]) == ("137", "140")
+
+
+def test_combined_only_platform():
+    info = {"formats": [_combined("sd", 480), _combined("hd", 720)]}
+    plan = plan_formats(info, "best")
+
+    assert plan["combined"]["format_id"] == "hd"
+    assert plan["video"] is None and plan["audio"] is None
+    assert describe_plan(plan) == "hd mp4 720p avc1"
+
+
+def test_higher_combined_beats_merge():
+    info = {"formats": [_video("v", 480), _audio("a"), _combined("c", 720)]}
+
+    assert plan_formats(info, "best")["combined"]["format_id"] == "c"
+
+
+def test_short_prefers_combined():
+    info = {"formats": [_video("v", 1080), _audio("a"), _combined("c", 720)]}
+    plan = plan_formats(info, "best", is_short=True)
+
+    assert plan["combined"]["format_id"] == "c"
+    assert plan["selector"] == "c/best[ext=mp4]/best"
+
+
+def test_unusable_formats():
+    assert plan_formats(None, "720p") is None
+    assert plan_formats({"formats": []}, "720p") is None
+    info = {"formats": [
+        {"format_id": "sb0", "vcodec": "none", "acodec": "none", "protocol": "mhtml"},
+        _combined("storyboard", 90, protocol="mhtml"),
+    ]}
+    assert plan_formats(info, "720p") is None
+
+
+def test_no_format_within_limit_falls_back_to_none():
+    info = {"formats": [_video("137", 1080), _combined("22", 1080)]}
+
+    assert plan_formats(info, "480p") is None
+
+
+def test_missing_acodec_is_unknown_not_absent():
+    # Combinados cuyo -J no trae 'acodec': antes se tomaban por solo video y
+    # no había plan (o se fusionaban con una pista de audio redundante).
+    info = {"formats": [
+        {"format_id": "sd", "height": 360, "vcodec": "avc1", "ext": "mp4"},
+        {"format_id": "hd", "height": 720, "vcodec": "avc1", "ext": "mp4"},
+    ]}
+    plan = plan_formats(info, "best")
+
+    assert plan["combined"]["format_id"] == "hd"
+    assert plan["selector"].startswith("hd/")
+
+
+def test_combined_without_any_codec_beats_lower_merge():
+    info = {"formats": [
+        {"format_id": "dash-v", "height": 480, "vcodec": "avc1", "acodec": "none"},
+        {"format_id": "dash-a", "vcodec": "none", "acodec": "mp4a"},
+        {"format_id": "progressive", "height": 720, "ext": "mp4"},
+    ]}
+    plan = plan_formats(info, "best")
+
+    assert plan["combined"]["format_id"] == "progressive"
+    assert describe_plan(plan) == "progressive mp4 720p"
+
+
+def test_ext_hints_mark_missing_streams():
+    info = {"formats": [
+        {"format_id": "v", "height": 720, "vcodec": "avc1", "audio_ext": "none"},
+        {"format_id": "a", "acodec": "mp4a", "video_ext": "none"},
+    ]}
+    plan = plan_formats(info, "best")
+
+    assert plan["selector"].startswith("v+a/")
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from core import ledger
+
+
+@pytest.fixture(autouse=True)
+def ledger_file(tmp_path, monkeypatch):
+    path = tmp_path / "jobs.db"
+    monkeypatch.setattr(ledger, "LEDGER_FILE", str(path))
+    monkeypatch.setattr(ledger, "_migrated", False)
+    return path
+
+
+def _row(batch, url, *columns):
+    with sqlite3.connect(ledger.LEDGER_FILE) as conn:
+        return conn.execute(
+            f"SELECT {', '.join(columns)} FROM jobs WHERE batch_file = ? AND url = ?",
+            (ledger._batch_key(batch), url),
+        ).fetchone()
+
+
+def test_register_batch_skips_done_entries(tmp_path):
+    batch = tmp_path / "urls.txt"
+    urls = ["https://a", "https://b", "https://c"]
+    assert ledger.register_batch(batch, "video", urls) == urls
+
+    ledger.mark_done(batch, "video", "https://a", output_path="/x/a.mp4")
+    ledger.mark_running(batch, "video", "https://b")
+
+    assert ledger.register_batch(batch, "video", urls) == ["https://b", "https://c"]
+    assert ledger.get_batch_status(batch, "video") == {"done": 1, "running": 1, "pending": 1}
+
+
+def test_corrupt_verification_requeues_entry(tmp_path):
+    batch = tmp_path / "urls.txt"
+    urls = ["https://a", "https://b"]
+    ledger.register_batch(batch, "audio", urls)
+    ledger.mark_done(batch, "audio", "https://a", output_path="/x/a.m4a")
+    ledger.mark_done(batch, "audio", "https://b", output_path="/x/b.m4a")
+
+    ledger.mark_verification(batch, "audio", "https://a", ledger.CORRUPT,
+                             detail="duración 3s de 180s esperados")
+    ledger.mark_verification(batch, "audio", "https://b", ledger.VERIFIED)
+
+    assert _row(batch, "https://a", "status", "verification", "verification_detail", "error") == (
+        "failed", "corrupt", "duración 3s de 180s esperados", None,
+    )
+    assert _row(batch, "https://b", "status", "verification") == ("done", "verified")
+    assert ledger.register_batch(batch, "audio", urls) == ["https://a"]
+
+
+def test_new_attempt_clears_verification(tmp_path):
+    batch = tmp_path / "urls.txt"
+    ledger.register_batch(batch, "video", ["https://a"])
+    ledger.mark_done(batch, "video", "https://a")
+    ledger.mark_verification(batch, "video", "https://a", ledger.CORRUPT, detail="sin audio")
+
+    ledger.mark_running(batch, "video", "https://a")
+
+    assert _row(batch, "https://a", "status", "verification", "verification_detail") == (
+        "running", None, None,
+    )
+
+
+def test_migrates_ledger_without_verification_columns(tmp_path, ledger_file):
+    with sqlite3.connect(ledger_file) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (batch_file TEXT NOT NULL, media_type TEXT NOT NULL, "
+            "url TEXT NOT NULL, position INTEGER NOT NULL, status TEXT NOT NULL, "
+            "output_path TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (batch_file, media_type, url))"
+        )
+    batch = tmp_path / "urls.txt"
+    ledger.register_batch(batch, "video", ["https://a"])
+    ledger.mark_verification(batch, "video", "https://a", ledger.VERIFIED)
+
+    assert _row(batch, "https://a", "verification", "verification_detail") == ("verified", None)
@@ -0,0 +1,49 @@
+import pytest
+
+from config.settings import get_log_file
+from utils.log_query import LogFilter, parse_time, scan
+from utils.logger import flush_logs, log_message
+
+URL = "https://www.youtube.com/watch?v=abcdefghijk"
+
+
+@pytest.fixture(scope="module")
+def log_data():
+    log_message("Descarga completada", "SUCCESS", URL, "YouTube")
+    log_message("Fallo de red\nsalida de yt-dlp", "ERROR", "https://www.tiktok.com/@a/video/1", "TikTok")
+    log_message("Mensaje sin plataforma", "INFO")
+    flush_logs()
+    with open(get_log_file(), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("platform", ["YouTube", "youtube", "YOUTUBE"])
+def test_platform_filter_ignores_case(log_data, platform):
+    entries = list(scan(log_data, LogFilter(platform=platform)))
+    assert [e.message for e in entries] == ["Descarga completada"]
+    assert entries[0].url == URL
+
+
+def test_platform_filter_with_multiline_message(log_data):
+    entries = list(scan(log_data, LogFilter(platform="tiktok")))
+    assert [e.level for e in entries] == ["ERROR"]
+    assert entries[0].message == "Fallo de red\nsalida de yt-dlp"
+
+
+def test_level_and_url_filters(log_data):
+    assert [e.message for e in scan(log_data, LogFilter(levels=["info"]))] == [
+        "Mensaje sin plataforma"
+    ]
+    assert [e.level for e in scan(log_data, LogFilter(url=URL))] == ["SUCCESS"]
+    assert list(scan(log_data, LogFilter(platform="YouTube", levels=["ERROR"]))) == []
+
+
+def test_time_range(log_data):
+    assert len(list(scan(log_data, LogFilter(since=parse_time("1h"))))) == 3
+    assert list(scan(log_data, LogFilter(until="2000-01-01 00:00:00"))) == []
+
+
+def test_parse_time_rejects_garbage():
+    assert parse_time("2024-05-01") == "2024-05-01 00:00:00"
+    with pytest.raises(ValueError):
+        parse_time("ayer")
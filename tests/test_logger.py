@@ -0,0 +1,78 @@
+import errno
+import os
+import types
+
+import pytest
+
+from utils import logger
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    path = tmp_path / "logs" / "downloader.log"
+    monkeypatch.setattr(logger, "get_log_file", lambda: str(path))
+    return path
+
+
+@pytest.fixture
+def no_flock(monkeypatch):
+    def flock(fd, operation):
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+
+    monkeypatch.setattr(logger, "fcntl", types.SimpleNamespace(LOCK_EX=2, flock=flock))
+
+
+def test_append_writes_batch(log_file):
+    logger._append(["uno", "dos"])
+    logger._append(["tres"])
+
+    assert log_file.read_text(encoding="utf-8") == "uno\ndos\ntres\n"
+
+
+def test_append_without_flock_still_writes(log_file, no_flock):
+    logger._append(["línea 1", "línea 2"])
+
+    assert log_file.read_text(encoding="utf-8") == "línea 1\nlínea 2\n"
+
+
+def test_append_rotates_when_full(log_file, monkeypatch):
+    monkeypatch.setattr(logger, "get_config_value", lambda key, default=None: 8)
+    log_file.parent.mkdir(parents=True)
+    log_file.write_text("antiguo\n", encoding="utf-8")
+
+    logger._append(["nuevo"])
+
+    assert log_file.read_text(encoding="utf-8") == "nuevo\n"
+    assert os.path.exists(f"{log_file}.1.gz")
+
+
+def test_append_without_flock_still_rotates(log_file, no_flock, monkeypatch):
+    monkeypatch.setattr(logger, "get_config_value", lambda key, default=None: 8)
+    log_file.parent.mkdir(parents=True)
+    log_file.write_text("antiguo\n", encoding="utf-8")
+
+    logger._append(["nuevo"])
+
+    assert log_file.read_text(encoding="utf-8") == "nuevo\n"
+    assert os.path.exists(f"{log_file}.1.gz")
+    assert not os.path.exists(f"{log_file}.lock")
+
+
+def test_lockfile_held_by_other_process(log_file, no_flock, monkeypatch):
+    monkeypatch.setattr(logger, "get_config_value", lambda key, default=None: 8)
+    monkeypatch.setattr(logger, "LOCKFILE_TIMEOUT", 0.05)
+    log_file.parent.mkdir(parents=True)
+    log_file.write_text("antiguo\n", encoding="utf-8")
+    lock = log_file.parent / "downloader.log.lock"
+    lock.write_text("", encoding="utf-8")
+
+    # Sin lock no se rota, pero el lote no se pierde
+    logger._append(["nuevo"])
+    assert log_file.read_text(encoding="utf-8") == "antiguo\nnuevo\n"
+    assert lock.exists()
+
+    # Un lock abandonado se descarta
+    os.utime(lock, (1, 1))
+    logger._append(["otro"])
+    assert log_file.read_text(encoding="utf-8") == "otro\n"
+    assert not lock.exists()
@@ -0,0 +1,157 @@
+import json
+import os
+import sys
+
+import pytest
+
+from core import media_inspector
+
+PROBE = {
+    "format": {"format_name": "mov,mp4,m4a", "duration": "12.500", "bit_rate": "800000"},
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1280,
+         "height": 720, "duration": "12.5", "bit_rate": "700000", "tags": {"x": "y"}},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "44100",
+         "channels": 2, "bit_rate": "N/A"},
+        {"index": 2, "codec_type": "video", "codec_name": "mjpeg"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    path = tmp_path / "cache" / "media_probe_cache.jsonl"
+    monkeypatch.setattr(media_inspector, "CACHE_FILE", str(path))
+    monkeypatch.setattr(media_inspector, "_cache", None)
+    monkeypatch.setattr(media_inspector, "_cache_lines", 0)
+    return path
+
+
+@pytest.fixture
+def fake_ffprobe(tmp_path):
+    """ffprobe simulado: imprime PROBE y anota cada archivo probado."""
+    calls = tmp_path / "calls.txt"
+    script = tmp_path / "ffprobe"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"open({str(calls)!r}, 'a').write(sys.argv[-1] + '\\n')\n"
+        "if sys.argv[-1].endswith('.txt'):\n"
+        "    sys.stderr.write('Invalid data found when processing input')\n"
+        "    sys.exit(1)\n"
+        f"print({json.dumps(json.dumps(PROBE))})\n",
+        encoding="utf-8",
+    )
+    script.chmod(0o755)
+    return str(script), calls
+
+
+def test_parse_converts_numbers_and_keeps_known_fields():
+    result = media_inspector._parse(PROBE)
+
+    assert result["format_name"] == "mov,mp4,m4a"
+    assert result["duration"] == 12.5
+    assert result["bit_rate"] == 800000
+    video, audio, cover = result["streams"]
+    assert video == {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1280,
+                     "height": 720, "duration": 12.5, "bit_rate": 700000}
+    assert audio["sample_rate"] == 44100 and audio["bit_rate"] is None
+    assert media_inspector.has_video(result) and media_inspector.has_audio(result)
+    assert not media_inspector.has_video({"streams": [cover]})
+
+
+def test_parse_empty_output():
+    result = media_inspector._parse({})
+
+    assert result["streams"] == [] and result["duration"] is None
+
+
+def test_inspect_files_caches_unchanged_files(tmp_path, fake_ffprobe, cache_file):
+    ffprobe, calls = fake_ffprobe
+    media = tmp_path / "a.mp4"
+    media.write_bytes(b"x")
+
+    first = media_inspector.inspect_files([str(media)], ffprobe)[str(media)]
+    assert first["error"] is None and first["size"] == 1
+    assert len(cache_file.read_text(encoding="utf-8").splitlines()) == 1
+
+    # Otra instancia: la caché se lee de disco y no se vuelve a probar
+    media_inspector._cache = None
+    assert media_inspector.inspect_file(str(media), ffprobe)["duration"] == 12.5
+    assert calls.read_text(encoding="utf-8").splitlines() == [str(media)]
+
+    media.write_bytes(b"xy")
+    os.utime(media, ns=(1, 1))
+    assert media_inspector.inspect_file(str(media), ffprobe)["size"] == 2
+    assert len(calls.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_inspect_files_errors(tmp_path, fake_ffprobe):
+    ffprobe, _ = fake_ffprobe
+    broken = tmp_path / "notas.txt"
+    broken.write_text("no es video", encoding="utf-8")
+    missing = str(tmp_path / "no-existe.mp4")
+
+    results = media_inspector.inspect_files([str(broken), missing], ffprobe)
+
+    assert results[str(broken)]["error"] == "Invalid data found when processing input"
+    assert results[missing]["error"] == "archivo no encontrado"
+    assert results[missing]["streams"] == []
+
+
+def test_inspect_files_without_ffprobe(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_inspector.shutil, "which", lambda name: None)
+    media = tmp_path / "a.mp4"
+    media.write_bytes(b"x")
+
+    assert media_inspector.inspect_file(str(media))["error"] == "ffprobe no encontrado"
+
+
+def _entry(path, probed_at):
+    return {"path": path, "stamp": [1, 1], "probed_at": probed_at,
+            "result": media_inspector._parse(PROBE)}
+
+
+def _cached_paths(cache_file):
+    lines = cache_file.read_text(encoding="utf-8").splitlines()
+    return sorted(json.loads(line)["path"] for line in lines)
+
+
+def test_compaction_keeps_entries_from_other_processes(cache_file, monkeypatch):
+    cache_file.parent.mkdir(parents=True)
+    cache_file.write_text(json.dumps(_entry("/a", 1)) + "\n", encoding="utf-8")
+    cache = media_inspector._load_cache()
+
+    # Otro proceso añade su resultado después de que este cargara la caché
+    with open(cache_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_entry("/otro", 2)) + "\n")
+
+    monkeypatch.setattr(media_inspector, "_cache_lines", 5000)
+    new = _entry("/b", 3)
+    cache[new["path"]] = new
+    media_inspector._save_cache(cache, [new])
+
+    assert _cached_paths(cache_file) == ["/a", "/b", "/otro"]
+    assert "/otro" in cache
+
+
+def test_compaction_retries_when_file_grows_meanwhile(cache_file, monkeypatch):
+    cache_file.parent.mkdir(parents=True)
+    cache_file.write_text(json.dumps(_entry("/a", 1)) + "\n", encoding="utf-8")
+    cache = media_inspector._load_cache()
+    merge = media_inspector._merge_from_disk
+    calls = []
+
+    def merge_then_append(cache):
+        size = merge(cache)
+        if not calls:
+            with open(cache_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(_entry("/tarde", 2)) + "\n")
+        calls.append(size)
+        return size
+
+    monkeypatch.setattr(media_inspector, "_merge_from_disk", merge_then_append)
+    assert media_inspector._compact(cache)
+
+    assert len(calls) == 2
+    assert _cached_paths(cache_file) == ["/a", "/tarde"]
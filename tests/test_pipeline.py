@@ -0,0 +1,99 @@
+import os
+import subprocess
+
+import pytest
+
+from core import ffmpeg_utils, pipeline
+
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch):
+    """ffmpeg simulado: escribe el archivo de salida y guarda cada comando."""
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        with open(command[-1], "wb") as f:
+            f.write(b"merged")
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(ffmpeg_utils.subprocess, "run", run)
+    monkeypatch.setattr(
+        ffmpeg_utils.media_inspector, "inspect_files",
+        lambda paths, ffprobe=None, workers=None: {
+            path: {"error": "ffprobe no encontrado", "streams": []} for path in paths
+        },
+    )
+    return commands
+
+
+def _video_task(tmp_path):
+    for name in ("abc.f137.mp4", "abc.f140.m4a"):
+        (tmp_path / name).write_bytes(b"x")
+    return {
+        "kind": "video", "url": "https://www.youtube.com/watch?v=abcdefghijk",
+        "platform": "YouTube", "job": None, "info": {"id": "abc", "title": "T"},
+        "video": str(tmp_path / "abc.f137.mp4"), "audio": str(tmp_path / "abc.f140.m4a"),
+        "output": str(tmp_path / "abc.mp4"), "archive": False,
+    }
+
+
+def test_process_video_without_ffprobe_uses_ffmpeg_from_path(tmp_path, monkeypatch, fake_ffmpeg):
+    monkeypatch.setattr(pipeline.ffmpeg_utils, "get_ffmpeg_path", lambda: None)
+    task = _video_task(tmp_path)
+    assert pipeline.process_video(task) == task["output"]
+    assert fake_ffmpeg[0][0] == "ffmpeg"
+    assert os.path.exists(task["output"])
+    assert not os.path.exists(task["video"])
+
+
+@pytest.mark.parametrize("title, stem", [
+    ("Canción: parte 1/2", "Canción_ parte 1_2"),
+    ('¿Qué? "live" <4K>', '¿Qué_ _live_ _4K_'),
+    ("...", "abc"),
+    (None, "abc"),
+])
+def test_title_stem(title, stem):
+    assert pipeline._title_stem({"title": title}, "abc") == stem
+
+
+def _audio_task(tmp_path, monkeypatch, ok):
+    staging = tmp_path / pipeline.STAGING_DIR
+    staging.mkdir()
+    source = staging / "abc.webm"
+    source.write_bytes(b"audio")
+    monkeypatch.setattr(pipeline.ffmpeg_utils, "get_ffmpeg_path", lambda: None)
+    monkeypatch.setattr(pipeline, "_source_action", lambda task, ffmpeg_dir: ("transcode", task["output"]))
+    monkeypatch.setattr(pipeline, "_run_ffmpeg", lambda command, output: (ok, None if ok else "boom"))
+    return {
+        "kind": "audio", "url": "u", "platform": "YouTube", "job": None,
+        "info": {}, "source": str(source), "output": str(tmp_path / "T.mp3"),
+        "format": "mp3", "plan": None, "bitrate": "best", "archive": False,
+    }
+
+
+@pytest.mark.parametrize("ok", [True, False])
+def test_process_audio_cleans_staging_dir(tmp_path, monkeypatch, ok):
+    task = _audio_task(tmp_path, monkeypatch, ok)
+    assert pipeline.process_audio(task) == (task["output"] if ok else False)
+    assert not os.path.exists(tmp_path / pipeline.STAGING_DIR)
+
+
+def test_process_video_embeds_downloaded_thumbnail(tmp_path, monkeypatch, fake_ffmpeg):
+    monkeypatch.setattr(pipeline.ffmpeg_utils, "get_ffmpeg_path", lambda: None)
+    task = _video_task(tmp_path)
+    thumbnail = tmp_path / "abc.thumb.webp"
+    thumbnail.write_bytes(b"img")
+    assert pipeline.process_video(task) == task["output"]
+    command = fake_ffmpeg[0]
+    assert command[command.index("-map", command.index("1:a:0")) + 1] == "2:v:0"
+    assert command[command.index("-disposition:v:1") + 1] == "attached_pic"
+    assert not thumbnail.exists()
+
+
+def test_with_cover_adds_cover_input_before_maps():
+    command = ["ffmpeg", "-y", "-i", "a.webm", "-map", "0:a:0", "-c:a", "copy"]
+    assert pipeline._with_cover(command, "t.jpg") == [
+        "ffmpeg", "-y", "-i", "a.webm", "-i", "t.jpg", "-map", "0:a:0", "-c:a", "copy",
+        "-map", "1:v:0", "-c:v", "mjpeg", "-disposition:v:0", "attached_pic",
+    ]
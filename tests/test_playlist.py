@@ -0,0 +1,93 @@
+import json
+from types import SimpleNamespace
+
+from core import playlist
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PL123"
+
+
+def _extract(monkeypatch, entries):
+    def run_yt_dlp(**kwargs):
+        return SimpleNamespace(stdout=json.dumps({"entries": entries}))
+
+    monkeypatch.setattr(playlist, "run_yt_dlp", run_yt_dlp)
+    return playlist.extract_playlist_entries(PLAYLIST_URL, False, None)
+
+
+def test_entries_are_ordered_by_playlist_index(monkeypatch):
+    entries = _extract(monkeypatch, [
+        {"url": "https://www.youtube.com/watch?v=bbbbbbbbbbb", "title": "B", "playlist_index": 2},
+        {"url": "https://www.youtube.com/watch?v=aaaaaaaaaaa", "title": "A", "playlist_index": 1},
+        None,
+    ])
+    assert [e["title"] for e in entries] == ["A", "B"]
+    assert all(e["available"] for e in entries)
+
+
+def test_bare_id_becomes_url_for_known_extractor(monkeypatch):
+    entries = _extract(monkeypatch, [
+        {"id": "aaaaaaaaaaa", "ie_key": "Youtube", "title": "A"},
+        {"url": "bbbbbbbbbbb", "ie_key": "Youtube", "title": "B"},
+    ])
+    assert [e["url"] for e in entries] == [
+        "https://www.youtube.com/watch?v=aaaaaaaaaaa",
+        "https://www.youtube.com/watch?v=bbbbbbbbbbb",
+    ]
+
+
+def test_entry_without_url_is_skipped(monkeypatch):
+    entries = _extract(monkeypatch, [
+        {"id": "12345", "ie_key": "SomeSite", "title": "Sin URL"},
+        {"url": "https://example.com/v/1", "title": "Con URL"},
+    ])
+    assert [e["title"] for e in entries] == ["Con URL"]
+
+
+def test_private_entries_are_marked_unavailable(monkeypatch):
+    entries = _extract(monkeypatch, [
+        {"url": "https://www.youtube.com/watch?v=aaaaaaaaaaa", "title": "[Private video]"},
+        {"url": "https://www.youtube.com/watch?v=bbbbbbbbbbb", "title": "B",
+         "availability": "needs_auth"},
+    ])
+    assert [e["available"] for e in entries] == [False, False]
+
+
+def test_missing_yt_dlp_returns_none(monkeypatch):
+    def run_yt_dlp(**kwargs):
+        raise FileNotFoundError("yt-dlp")
+
+    monkeypatch.setattr(playlist, "run_yt_dlp", run_yt_dlp)
+    assert playlist.extract_playlist_entries(PLAYLIST_URL, False, None) is None
+
+
+def _failing_playlist(monkeypatch):
+    monkeypatch.setattr(playlist, "log_message", lambda *args, **kwargs: None)
+    monkeypatch.setattr(playlist, "get_config_value", lambda key, default=None: {
+        "max_retries": 3, "parallel_jobs": 1,
+    }.get(key, default))
+    monkeypatch.setattr(playlist, "run_yt_dlp", lambda **kwargs: SimpleNamespace(stdout=json.dumps({
+        "entries": [{"url": "https://www.youtube.com/watch?v=aaaaaaaaaaa", "title": "A"}],
+    })))
+    calls = []
+
+    def download(url, *args, **kwargs):
+        calls.append(url)
+        return False
+
+    return calls, download
+
+
+def test_video_entries_retry_only_inside_download_video(monkeypatch):
+    calls, download = _failing_playlist(monkeypatch)
+    monkeypatch.setattr(playlist, "download_video", download)
+
+    assert not playlist.download_playlist_video(PLAYLIST_URL, "720p", "/tmp", False, None)
+    assert len(calls) == 1
+
+
+def test_audio_entries_retry_max_retries_times(monkeypatch):
+    calls, download = _failing_playlist(monkeypatch)
+    monkeypatch.setattr(playlist, "download_audio", download)
+
+    assert not playlist.download_playlist_audio(PLAYLIST_URL, "mp3", "best", "/tmp", False, None)
+    assert len(calls) == 3
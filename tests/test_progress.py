@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from core import progress
+
+
+@pytest.fixture
+def events(monkeypatch):
+    received = []
+    monkeypatch.setattr(progress, "_subscribers", [received.append])
+    return received
+
+
+def test_parse_progress_line():
+    line = "[download]  42.3% of ~  10.00MiB at    1.20MiB/s ETA 00:05 (frag 3/20)"
+
+    assert progress.parse_progress_line(line) == {
+        "percent": 42.3, "total": "10.00MiB", "speed": "1.20MiB/s", "eta": "00:05",
+    }
+
+
+def test_parse_progress_line_without_speed():
+    parsed = progress.parse_progress_line("[download] 100% of 3.50MiB")
+
+    assert parsed["percent"] == 100.0
+    assert parsed["speed"] is None and parsed["eta"] is None
+
+
+@pytest.mark.parametrize("line", [
+    "[download] Destination: video.mp4",
+    "[youtube] abc: Downloading webpage",
+    "",
+])
+def test_parse_progress_line_ignores_other_lines(line):
+    assert progress.parse_progress_line(line) is None
+
+
+def test_download_template_events(events):
+    handle = progress.make_line_parser("job", "https://u")
+    data = {"status": "downloading", "downloaded_bytes": 250,
+            "total_bytes": None, "total_bytes_estimate": 1000, "speed": 50.0, "eta": 15}
+
+    assert handle("out", progress.DOWNLOAD_MARKER + json.dumps(data))
+    assert handle("out", progress.DOWNLOAD_MARKER + json.dumps({"status": "finished"}))
+
+    first, last = events
+    assert (first.phase, first.percent, first.total_bytes, first.speed) == ("download", 25.0, 1000, 50.0)
+    assert (last.status, last.percent) == ("finished", 100.0)
+
+
+@pytest.mark.parametrize("postprocessor, phase", [
+    ("Merger", "merge"),
+    ("MoveFiles", "move"),
+    ("EmbedThumbnail", "postprocess"),
+])
+def test_postprocess_template_phases(events, postprocessor, phase):
+    handle = progress.make_line_parser("job", "https://u")
+    line = progress.POSTPROCESS_MARKER + json.dumps(
+        {"status": "started", "postprocessor": postprocessor}
+    )
+
+    assert handle("out", line)
+    assert [e.phase for e in events] == [phase]
+
+
+def test_extract_only_before_other_phases(events):
+    handle = progress.make_line_parser("job", "https://u")
+
+    assert not handle("out", "[youtube] abc: Downloading webpage")
+    assert handle("out", "[download]  10.0% of 1.00MiB at 1.00KiB/s ETA 10:00")
+    assert not handle("out", "[youtube] abc: Downloading m3u8 information")
+    assert not handle("err", "WARNING: algo")
+
+    assert [(e.phase, e.status) for e in events] == [
+        ("extract", "started"), ("download", "downloading"),
+    ]
+
+
+def test_malformed_template_lines_are_swallowed(events):
+    handle = progress.make_line_parser("job", "https://u")
+
+    assert handle("out", progress.DOWNLOAD_MARKER + "{roto")
+    assert events == []
+
+
+def test_broken_subscriber_does_not_stop_others(monkeypatch):
+    received = []
+
+    def broken(event):
+        raise RuntimeError("roto")
+
+    monkeypatch.setattr(progress, "_subscribers", [broken, received.append])
+    monkeypatch.setattr(progress, "log_message", lambda *args, **kwargs: None)
+    progress.publish(progress.ProgressEvent(job_id="j", url="u", phase="download"))
+
+    assert len(received) == 1
@@ -0,0 +1,141 @@
+import json
+import math
+
+import pytest
+
+from core import stats
+
+
+def _record(platform, wall_time, media_type="video", status="ok", downloaded=0, download=None):
+    return {
+        "platform": platform, "media_type": media_type, "status": status,
+        "wall_time": wall_time, "bytes": downloaded,
+        "phases": {"download": download} if download else {},
+    }
+
+
+def _history(*rows):
+    columns = stats._empty_columns()
+    stats._append_records(columns, [json.dumps(row) for row in rows])
+    return columns
+
+
+@pytest.mark.parametrize("values, percentile, expected", [
+    ([5.0], 50, 5.0),
+    ([5.0], 99, 5.0),
+    ([1.0, 2.0, 3.0, 4.0], 50, 2.5),
+    ([1.0, 2.0, 3.0, 4.0], 90, 3.7),
+    ([10.0, 20.0, 30.0, 40.0, 50.0], 99, 49.6),
+    ([10.0, 20.0, 30.0, 40.0, 50.0], 0, 10.0),
+    ([10.0, 20.0, 30.0, 40.0, 50.0], 100, 50.0),
+])
+def test_interpolate_matches_numpy_linear(values, percentile, expected):
+    assert stats._interpolate(values, percentile) == pytest.approx(expected)
+
+
+def test_append_records_skips_failed_and_bad_lines():
+    columns = stats._empty_columns()
+    stats._append_records(columns, [
+        json.dumps(_record("YouTube", 10, downloaded=1000, download=4)),
+        json.dumps(_record("YouTube", 10, status="error")),
+        json.dumps(_record("YouTube", 0)),
+        "{no es json",
+        json.dumps({"status": "ok", "wall_time": 2}),
+    ])
+
+    assert columns["platform"] == ["YouTube", "general"]
+    assert columns["media_type"] == ["video", "video"]
+    assert columns["duration"] == [10, 2]
+    assert columns["throughput"][0] == 250
+    assert math.isnan(columns["throughput"][1])
+
+
+def test_summarize_groups_and_totals(monkeypatch):
+    monkeypatch.setattr(stats, "_numpy", lambda: None)
+    history = _history(
+        _record("YouTube", 10, downloaded=100, download=10),
+        _record("YouTube", 20, downloaded=400, download=20),
+        _record("TikTok", 4),
+        _record("YouTube", 30, media_type="audio"),
+    )
+    summary = stats.summarize(history)
+
+    assert set(summary) == {
+        ("YouTube", "video"), ("TikTok", "video"), ("YouTube", "audio"),
+        ("*", "video"), ("*", "audio"),
+    }
+    youtube = summary[("YouTube", "video")]
+    assert youtube["count"] == 2
+    assert youtube["duration"] == pytest.approx((15.0, 19.0, 19.9))
+    assert youtube["throughput"] == pytest.approx((15.0, 19.0, 19.9))
+    assert summary[("TikTok", "video")]["throughput"] is None
+    assert summary[("*", "video")]["count"] == 3
+    assert summary[("*", "video")]["duration"][0] == pytest.approx(10.0)
+
+
+def test_summarize_empty_history():
+    assert stats.summarize(stats._empty_columns()) == {}
+
+
+def test_numpy_and_python_agree():
+    np = pytest.importorskip("numpy")
+    keys = ["a", "b", "a", "a", "b", "c"]
+    values = [3.0, 1.0, 1.0, 2.0, math.nan, math.nan]
+
+    python = stats._group_percentiles_python(keys, values)
+    vectorized = stats._group_percentiles_numpy(np, keys, values)
+
+    assert set(python) == set(vectorized) == {"a", "b"}
+    for key in python:
+        assert python[key][0] == vectorized[key][0]
+        assert python[key][1] == pytest.approx(vectorized[key][1])
+
+
+def test_load_history_reads_only_new_records(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    path.write_text(
+        json.dumps(_record("YouTube", 10)) + "\n" + json.dumps(_record("TikTok", 5)),
+        encoding="utf-8",
+    )
+    history = stats.load_history(str(path))
+    # La última línea (sin salto) queda pendiente
+    assert history["duration"] == [10]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n" + json.dumps(_record("YouTube", 8, media_type="audio")) + "\n")
+    parsed = []
+    original = stats._append_records
+    monkeypatch.setattr(
+        stats, "_append_records",
+        lambda columns, lines: (parsed.extend(lines), original(columns, lines)),
+    )
+
+    assert stats.load_history(str(path))["duration"] == [10, 5, 8]
+    assert len(parsed) == 2
+    assert stats.load_history(str(path), media_type="audio")["platform"] == ["YouTube"]
+
+
+def test_load_history_missing_file(tmp_path):
+    assert stats.load_history(str(tmp_path / "nada.jsonl")) == stats._empty_columns()
+
+
+def test_estimate_batch_eta_uses_platform_median_or_fallback():
+    history = _history(
+        _record("YouTube", 10), _record("YouTube", 20), _record("TikTok", 4),
+    )
+    summary = stats.summarize(history)
+    urls = [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://www.tiktok.com/@u/video/1",
+        "https://example.com/v.mp4",
+    ]
+
+    seconds, known = stats.estimate_batch_eta(urls, "video", summary=summary)
+    assert known == 2
+    # 15 (YouTube) + 4 (TikTok) + mediana global 10
+    assert seconds == pytest.approx(29.0)
+
+    seconds, _ = stats.estimate_batch_eta(urls, "video", jobs=2, summary=summary)
+    assert seconds == pytest.approx(14.5)
+    assert stats.estimate_batch_eta(urls, "audio", summary=summary) == (None, 0)
+    assert stats.estimate_batch_eta([], "video", summary=summary) == (None, 0)
@@ -0,0 +1,78 @@
+import pytest
+
+from core import verifier
+
+
+def _result(duration=60.0, streams=(("video", "h264", 60.0), ("audio", "aac", 60.0)), error=None):
+    return {
+        "error": error,
+        "duration": duration,
+        "streams": [
+            {"codec_type": kind, "codec_name": name, "duration": length}
+            for kind, name, length in streams
+        ],
+    }
+
+
+def test_healthy_video():
+    assert verifier.check(_result(), "video", expected_duration=61.0) == []
+
+
+def test_unreadable_file_reports_last_error_line():
+    result = _result(error="línea 1\nmoov atom not found")
+
+    assert verifier.check(result, "video") == ["no se puede leer: moov atom not found"]
+
+
+def test_missing_streams():
+    video_only = _result(streams=(("video", "h264", 60.0),))
+    cover_only = _result(streams=(("video", "mjpeg", None), ("audio", "aac", 60.0)))
+
+    assert verifier.check(video_only, "video") == ["sin stream de audio"]
+    assert verifier.check(cover_only, "video") == ["sin stream de video"]
+    assert verifier.check(cover_only, "audio") == []
+
+
+def test_truncated_against_expected_duration():
+    problems = verifier.check(_result(duration=30.0, streams=()), "audio", expected_duration=180.0)
+
+    assert problems == ["sin stream de audio", "truncado: dura 30.0s de 180.0s esperados"]
+    # Dentro del margen (2 s o el 2 %) no se considera truncado
+    assert verifier.check(_result(duration=177.0), "video", expected_duration=180.0) == []
+
+
+def test_zero_duration():
+    assert verifier.check(_result(duration=0), "video") == ["duración desconocida o cero"]
+
+
+def test_misaligned_streams():
+    result = _result(streams=(("video", "h264", 60.0), ("audio", "aac", 20.0)))
+
+    assert verifier.check(result, "video") == ["streams desalineados: difieren 40.0s"]
+
+
+@pytest.mark.parametrize("path, media_type", [
+    ("/x/cancion.M4A", "audio"),
+    ("/x/cancion.opus", "audio"),
+    ("/x/video.mp4", "video"),
+    ("/x/sin-extension", "video"),
+])
+def test_media_type_for(path, media_type):
+    assert verifier.media_type_for(path) == media_type
+
+
+def test_pool_reports_results(monkeypatch):
+    results = {"/ok.mp4": _result(), "/roto.mp4": _result(duration=0)}
+    monkeypatch.setattr(verifier.media_inspector, "inspect_file", lambda path: results[path])
+    monkeypatch.setattr(verifier, "log_message", lambda *args, **kwargs: None)
+    recorded = []
+
+    pool = verifier.VerificationPool(workers=2, on_result=recorded.append)
+    pool.submit("/ok.mp4", "video", key="a")
+    pool.submit("/roto.mp4", "video", key="b")
+    reports = {r["key"]: r for r in pool.wait()}
+
+    assert reports["a"]["status"] == verifier.VERIFIED
+    assert reports["b"]["status"] == verifier.CORRUPT
+    assert reports["b"]["problems"] == ["duración desconocida o cero"]
+    assert sorted(r["key"] for r in recorded) == ["a", "b"]
@@ -0,0 +1,69 @@
+import os
+import subprocess
+
+import pytest
+
+from core import video
+
+URL = "https://www.youtube.com/watch?v=abcdefghijk"
+INFO = {"id": "abcdefghijk", "formats": []}
+PLAN = {
+    "video": {"format_id": "137", "ext": "mp4"},
+    "audio": {"format_id": "140", "ext": "m4a"},
+    "selector": "137+140/best",
+}
+POSTPROCESS_ERROR = "ERROR: Postprocessing: Conversion failed!"
+
+
+@pytest.fixture
+def fake_download(tmp_path, monkeypatch):
+    """Entorno de download_video sin yt-dlp ni ffmpeg: cada intento de
+    yt-dlp falla en el postprocesado y la fusión local funciona."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    base_dir = tmp_path / "YouTube" / "video"
+    base_dir.mkdir(parents=True)
+    for fmt in (PLAN["video"], PLAN["audio"]):
+        (base_dir / f"{INFO['id']}.f{fmt['format_id']}.{fmt['ext']}").write_bytes(b"x")
+
+    settings = {"max_retries": 1, "use_download_archive": False}
+    monkeypatch.setattr(
+        video, "get_config_value", lambda key, default=None: settings.get(key, default)
+    )
+    monkeypatch.setattr(video.metrics, "start_job", lambda *args, **kwargs: None)
+    monkeypatch.setattr(video.metadata_cache, "get_info", lambda url, **kwargs: (INFO, None))
+    monkeypatch.setattr(video.format_planner, "plan_formats", lambda *args: PLAN)
+    monkeypatch.setattr(video.format_planner, "describe_plan", lambda plan: "")
+    monkeypatch.setattr(video.ffmpeg_utils, "get_ffmpeg_path", lambda: str(tmp_path))
+    monkeypatch.setattr(video.ffmpeg_utils, "check_ffmpeg", lambda path: True)
+    monkeypatch.setattr(video.ffmpeg_utils, "has_audio_stream", lambda path, ffmpeg_dir: True)
+
+    def merge(video_file, audio_file, output_file, ffmpeg_dir, metadata=None):
+        with open(output_file, "wb") as f:
+            f.write(b"merged")
+        os.remove(video_file)
+        os.remove(audio_file)
+        return True
+
+    monkeypatch.setattr(video.ffmpeg_utils, "manual_merge_and_cleanup", merge)
+
+    def run_yt_dlp(**kwargs):
+        raise subprocess.CalledProcessError(1, "yt-dlp", output="", stderr=POSTPROCESS_ERROR)
+
+    monkeypatch.setattr(video, "run_yt_dlp", run_yt_dlp)
+    return settings, str(base_dir / f"{INFO['id']}.mp4")
+
+
+def _download(tmp_path):
+    return video.download_video(URL, "720p", str(tmp_path), False, False, None)
+
+
+def test_merge_on_final_attempt_is_success(fake_download, tmp_path):
+    _, merged = fake_download
+    assert _download(tmp_path) == merged
+    assert os.path.exists(merged)
+
+
+def test_failed_post_process_after_merge_keeps_merged_file(fake_download, tmp_path):
+    settings, merged = fake_download
+    settings["max_retries"] = 3
+    assert _download(tmp_path) == merged
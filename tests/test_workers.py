@@ -0,0 +1,61 @@
+import re
+
+from core import pipeline
+from core.workers import run_jobs
+
+
+def _blocks(text):
+    """{etiqueta: líneas impresas bajo su cabecera}."""
+    text = re.sub(r"\x1b\[[0-9;]*m", "", text)
+    blocks = {}
+    current = None
+    for line in text.splitlines():
+        header = re.match(r"\[\d+/\d+\] (.+)", line)
+        if header:
+            current = header.group(1)
+            blocks[current] = []
+        elif line and current:
+            blocks[current].append(line)
+    return blocks
+
+
+def _work(item):
+    print(f"inicio {item}")
+    if item == "b":
+        raise ValueError("falló b")
+    print(f"fin {item}")
+    return item.upper()
+
+
+EXPECTED = {
+    "a": ["inicio a", "fin a"],
+    "b": ["inicio b", "Error inesperado en el trabajo: falló b"],
+    "c": ["inicio c", "fin c"],
+}
+
+
+def test_run_jobs_groups_output_per_job(capsys):
+    results = run_jobs(_work, ["a", "b", "c"], max_workers=3)
+
+    assert [r["result"] for r in results] == ["A", None, "C"]
+    assert isinstance(results[1]["error"], ValueError)
+    assert _blocks(capsys.readouterr().out) == EXPECTED
+
+
+def test_run_pipeline_prints_like_run_jobs(capsys):
+    def fetch(item):
+        print(f"inicio {item}")
+        if item == "b":
+            raise ValueError("falló b")
+        return None, item
+
+    def process(item):
+        print(f"fin {item}")
+        return item.upper()
+
+    results = pipeline.run_pipeline(
+        ["a", "b", "c"], fetch, process, network_workers=2, cpu_workers=2,
+    )
+
+    assert [r["result"] for r in results] == ["A", None, "C"]
+    assert _blocks(capsys.readouterr().out) == EXPECTED
@@ -0,0 +1,148 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import ytdlp_pool
+from utils import dependency_cache
+
+
+class _BrokenConn:
+    def __init__(self, error):
+        self.error = error
+
+    def send(self, payload):
+        pass
+
+    def recv(self):
+        raise self.error
+
+
+class _FakeWorker:
+    def __init__(self, error):
+        self.conn = _BrokenConn(error)
+        self.jobs = 0
+        self.stopped = False
+
+    def stop(self, timeout=2):
+        self.stopped = True
+
+
+@pytest.mark.parametrize("error", [
+    EOFError(), ConnectionResetError(), BrokenPipeError(), OSError("handle is closed"),
+])
+def test_dead_worker_fails_the_job_and_is_discarded(error):
+    pool = ytdlp_pool.YtDlpPool()
+    worker = _FakeWorker(error)
+    pool._idle.put(worker)
+    returncode, _, stderr = pool.run(["--version"])
+    assert returncode == 1
+    assert "terminó inesperadamente" in stderr
+    assert worker.stopped
+    assert pool._idle.empty()
+
+
+@pytest.mark.parametrize("module, binary, expected", [
+    ("2024.08.06", {"ok": True, "version": "2024.08.06"}, True),
+    ("2024.08.06", {"ok": True, "version": "2023.12.30"}, False),
+    ("2024.08.06", {"ok": False, "version": None}, False),
+    (None, {"ok": True, "version": "2024.08.06"}, False),
+])
+def test_pool_requires_the_same_yt_dlp_as_path(monkeypatch, module, binary, expected):
+    monkeypatch.setattr(ytdlp_pool, "_module_version", lambda: module)
+    monkeypatch.setattr(dependency_cache, "probe", lambda name, path=None: binary)
+    assert ytdlp_pool.is_available() is expected
+
+
+def test_pool_grows_with_concurrent_jobs(monkeypatch):
+    jobs = 6
+    barrier = threading.Barrier(jobs, timeout=5)
+    created = []
+
+    class BlockingConn:
+        def send(self, payload):
+            self.sent = payload
+
+        def recv(self):
+            # Cada trabajo espera a que todos estén en marcha a la vez
+            barrier.wait()
+            return ("exit", 0)
+
+    class Worker:
+        def __init__(self, context, env):
+            self.conn = BlockingConn()
+            self.jobs = 0
+            created.append(self)
+
+    monkeypatch.setattr(ytdlp_pool, "_Worker", Worker)
+    pool = ytdlp_pool.YtDlpPool()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda _: pool.run(["--version"]), range(jobs)))
+
+    assert [r[0] for r in results] == [0] * jobs
+    assert len(created) == jobs
+    # Los trabajadores quedan ociosos para los siguientes trabajos
+    barrier = threading.Barrier(1)
+    pool.run(["--version"])
+    assert len(created) == jobs
+
+
+def test_hung_worker_times_out_and_is_discarded():
+    class SilentConn:
+        def send(self, payload):
+            pass
+
+        def poll(self, timeout):
+            return False
+
+        def recv(self):
+            raise AssertionError("no debe bloquearse en recv")
+
+    worker = _FakeWorker(None)
+    worker.conn = SilentConn()
+    pool = ytdlp_pool.YtDlpPool()
+    pool._idle.put(worker)
+
+    returncode, _, stderr = pool.run(["https://example.com"], timeout=0.01)
+
+    assert returncode == 1
+    assert "no respondió" in stderr
+    assert worker.stopped
+    assert pool._idle.empty()
+
+
+def test_pipe_writers_never_send_concurrently():
+    class RecordingConn:
+        def __init__(self):
+            self.sending = False
+            self.overlaps = 0
+            self.messages = []
+
+        def send(self, message):
+            if self.sending:
+                self.overlaps += 1
+            self.sending = True
+            threading.Event().wait(0.0005)
+            self.messages.append(message)
+            self.sending = False
+
+    conn = RecordingConn()
+    lock = threading.Lock()
+    out = ytdlp_pool._PipeWriter(conn, "out", lock)
+    err = ytdlp_pool._PipeWriter(conn, "err", lock)
+
+    def write(writer, name):
+        for i in range(20):
+            writer.write(f"{name} {i}\n")
+
+    threads = [
+        threading.Thread(target=write, args=(writer, f"{writer is out}-{n}"))
+        for n in range(3) for writer in (out, err)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert conn.overlaps == 0
+    assert len(conn.messages) == 120
@@ -1,12 +1,12 @@
 import os
 import random
 import shutil
-import subprocess
 import re
 
 from config import settings
 from config.config_manager import get_default_path
 from utils.colors import Colors
+from utils.dependency_cache import probe
 from . import logos
 from .input_styles import get_random_input_style
 
@@ -93,6 +93,13 @@ def print_header(main_title="", current_context="", logo="", urlvideo_logo=""):
     print()  # Espacio final del encabezado
 
 
+def _dependency_status(result):
+    if not result["ok"]:
+        return f"{Colors.RED}No Instalado{Colors.RESET}"
+    version = f" ({result['version']})" if result["version"] else ""
+    return f"{Colors.GREEN}Instalado{version}{Colors.RESET}"
+
+
 def print_dashboard():
     """Imprime el dashboard principal, movido a tui.py para reutilización."""
     # Usamos print_header para el dashboard
@@ -103,26 +110,10 @@ def print_dashboard():
 
     print(f"{Colors.BOLD}Estado del Sistema:{Colors.RESET}")
 
-    # Estado de dependencias
-    try:
-        subprocess.run(
-            ["yt-dlp", "--version"],
-            capture_output=True,
-            check=True,
-        )
-        yt_dlp_status = f"{Colors.GREEN}Instalado{Colors.RESET}"
-    except (FileNotFoundError, subprocess.CalledProcessError):
-        yt_dlp_status = f"{Colors.RED}No Instalado{Colors.RESET}"
-
-    try:
-        subprocess.run(
-            ["ffmpeg", "-version"],
-            capture_output=True,
-            check=True,
-        )
-        ffmpeg_status = f"{Colors.GREEN}Instalado{Colors.RESET}"
-    except (FileNotFoundError, subprocess.CalledProcessError):
-        ffmpeg_status = f"{Colors.RED}No Instalado{Colors.RESET}"
+    # Estado de dependencias (caché de utils.dependency_cache: no ejecuta los
+    # binarios salvo que hayan cambiado desde la última comprobación)
+    yt_dlp_status = _dependency_status(probe("yt-dlp"))
+    ffmpeg_status = _dependency_status(probe("ffmpeg"))
 
     print(f"  - yt-dlp: {yt_dlp_status}   |   ffmpeg: {ffmpeg_status}")
     print(
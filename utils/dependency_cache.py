@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+from config.config_manager import CONFIG_FILE
+
+# Resultado de ejecutar '<binario> --version' para yt-dlp, ffmpeg y ffprobe,
+# guardado entre ejecuciones. La clave es la ruta real del binario junto con
+# su fecha de modificación y tamaño: mientras el archivo no cambie (una
+# actualización lo reescribe) no se vuelve a ejecutar. Los fallos no se
+# guardan, así que un binario roto se vuelve a probar la siguiente vez.
+CACHE_FILE = os.path.join(os.path.dirname(CONFIG_FILE), "dependencies.json")
+
+# Argumento de versión de cada herramienta (el resto usa '--version')
+VERSION_ARGS = {
+    "ffmpeg": ["-version"],
+    "ffprobe": ["-version"],
+}
+
+_entries = None
+_lock = threading.Lock()
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_FILE, encoding="utf-8") as f:
+                _entries = json.load(f)
+            if not isinstance(_entries, dict):
+                _entries = {}
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+
+def _save(entries):
+    tmp_path = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError:
+        pass  # Sin caché en disco se vuelve a ejecutar en la próxima sesión
+
+
+def _parse_version(name, output):
+    first_line = output.strip().splitlines()[0] if output.strip() else ""
+    words = first_line.split()
+    # "ffmpeg version 6.1.1 Copyright ..." -> "6.1.1"
+    if len(words) >= 3 and words[1] == "version":
+        return words[2]
+    return first_line or None
+
+
+def _run_version(path, name):
+    try:
+        process = subprocess.run(
+            [path] + VERSION_ARGS.get(name, ["--version"]),
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            check=False,
+        )
+    except OSError as e:
+        return {"ok": False, "version": None, "error": str(e)}
+    if process.returncode != 0:
+        return {"ok": False, "version": None, "error": process.stderr.strip()}
+    return {"ok": True, "version": _parse_version(name, process.stdout), "error": None}
+
+
+def probe(name, path=None):
+    """
+    Comprueba que una herramienta externa funciona y obtiene su versión.
+
+    Args:
+        name (str): Nombre de la herramienta ('yt-dlp', 'ffmpeg', 'ffprobe')
+        path (str): Ruta del ejecutable; si se omite se busca en el PATH
+
+    Returns:
+        dict: {'path', 'ok', 'version', 'error'}; 'ok' es False si no se
+              encuentra o no se puede ejecutar
+    """
+    path = path or shutil.which(name)
+    if not path:
+        return {"path": None, "ok": False, "version": None, "error": "no encontrado"}
+    real_path = os.path.realpath(path)
+    try:
+        stat = os.stat(real_path)
+    except OSError as e:
+        return {"path": path, "ok": False, "version": None, "error": str(e)}
+    stamp = [stat.st_mtime_ns, stat.st_size]
+
+    with _lock:
+        cached = _load().get(real_path)
+    if cached and cached.get("stamp") == stamp:
+        return {"path": path, "ok": True, "version": cached.get("version"), "error": None}
+
+    result = _run_version(path, name)
+    if result["ok"]:
+        with _lock:
+            entries = _load()
+            entries[real_path] = {"name": name, "stamp": stamp, "version": result["version"]}
+            _save(entries)
+    return dict(result, path=path)
+
+
+def invalidate(name=None):
+    """Olvida el resultado de una herramienta (o de todas si name es None)."""
+    with _lock:
+        entries = _load()
+        for key in [k for k, v in entries.items() if name is None or v.get("name") == name]:
+            del entries[key]
+        _save(entries)
@@ -0,0 +1,414 @@
+import gzip
+import json
+import mmap
+import os
+import re
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+from config.settings import get_log_file
+
+from .colors import Colors
+
+# Consultas sobre downloader.log y sus segmentos rotados (.N.gz) con el
+# formato de utils.logger:
+#   [YYYY-mm-dd HH:MM:SS] [LEVEL] mensaje [Platform: p] [URL: u]
+# Los mensajes de varias líneas (salida de yt-dlp) continúan en las líneas
+# siguientes hasta la próxima cabecera con fecha.
+#
+# El log se lee con mmap y, cuando hay un filtro literal (URL o nivel), se
+# salta de coincidencia en coincidencia con find() en lugar de recorrerlo
+# línea a línea. Un índice auxiliar (.downloader.log.idx) guarda el
+# rango de fechas de cada segmento comprimido, para no descomprimir los que
+# quedan fuera del rango pedido, y cada cuántos bytes del log activo empieza
+# qué fecha, para empezar a leer directamente en --since.
+
+LogEntry = namedtuple("LogEntry", ["timestamp", "level", "message", "platform", "url", "raw"])
+
+LEVELS = ("DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL")
+
+# Separación (en bytes) entre los puntos de control del índice del log activo
+INDEX_STEP = 64 * 1024
+
+TIMESTAMP_LEN = len("2000-01-01 00:00:00")
+_ENTRY_START_RE = re.compile(rb"\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\] \[")
+_ENTRY_RE = re.compile(
+    r"\[(?P<timestamp>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] \[(?P<level>[A-Z]+)\] "
+    r"(?P<message>.*?)(?: \[Platform: (?P<platform>[^\]\n]*)\])?"
+    r"(?: \[URL: (?P<url>[^\n]*)\])?\n?$",
+    re.S,
+)
+_RELATIVE_RE = re.compile(r"^(\d+)\s*([smhd])$")
+_LEVEL_COLORS = {
+    "ERROR": Colors.RED,
+    "CRITICAL": Colors.RED,
+    "WARNING": Colors.YELLOW,
+    "SUCCESS": Colors.GREEN,
+}
+
+
+def parse_time(value):
+    """
+    Convierte '2h', '30m', '1d', 'YYYY-mm-dd' o 'YYYY-mm-dd HH:MM[:SS]' en
+    una marca de tiempo con el formato del log (comparable como texto).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    relative = _RELATIVE_RE.match(value)
+    if relative:
+        amount, unit = int(relative.group(1)), relative.group(2)
+        delta = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}[unit]
+        moment = datetime.now() - timedelta(**{delta: amount})
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no válida: {value!r} (usa p. ej. '2h', '1d' o 'YYYY-mm-dd HH:MM')")
+
+
+class LogFilter:
+    """Criterios de una consulta; todos opcionales."""
+
+    def __init__(self, levels=None, url=None, platform=None, since=None, until=None):
+        self.levels = {lvl.upper() for lvl in levels} if levels else None
+        self.url = url
+        self.platform = platform.lower() if platform else None
+        self.since = since
+        self.until = until
+
+    def needle(self):
+        """Literal más selectivo para saltar entre coincidencias con find().
+        La plataforma no se usa: se compara sin distinguir mayúsculas
+        ('youtube' debe encontrar '[Platform: YouTube]')."""
+        if self.url:
+            return self.url.encode("utf-8")
+        if self.levels and len(self.levels) == 1:
+            return f"] [{next(iter(self.levels))}] ".encode("utf-8")
+        return None
+
+    def matches(self, entry):
+        if self.since and entry.timestamp < self.since:
+            return False
+        if self.until and entry.timestamp > self.until:
+            return False
+        if self.levels and entry.level not in self.levels:
+            return False
+        if self.url and self.url not in (entry.url or ""):
+            return False
+        if self.platform and self.platform != (entry.platform or "").lower():
+            return False
+        return True
+
+
+def parse_entry(raw):
+    """Interpreta una entrada (bytes, posiblemente de varias líneas)."""
+    text = raw.decode("utf-8", errors="replace")
+    match = _ENTRY_RE.match(text)
+    if not match:
+        return None
+    return LogEntry(
+        match.group("timestamp"),
+        match.group("level"),
+        match.group("message"),
+        match.group("platform"),
+        match.group("url"),
+        text.rstrip("\n"),
+    )
+
+
+def _is_entry_start(data, pos):
+    return (pos == 0 or data[pos - 1:pos] == b"\n") and _ENTRY_START_RE.match(data, pos)
+
+
+def _entry_start_before(data, pos, floor=0):
+    """Inicio de la entrada que contiene la posición pos."""
+    while pos > floor:
+        if _is_entry_start(data, pos):
+            return pos
+        pos = data.rfind(b"\n", floor, pos)
+        if pos < 0:
+            return floor
+        pos += 1
+        if _is_entry_start(data, pos):
+            return pos
+        pos -= 1
+    return floor
+
+
+def _entry_end(data, pos, end):
+    """Fin (exclusivo) de la entrada que empieza en pos."""
+    while True:
+        newline = data.find(b"\n", pos, end)
+        if newline < 0:
+            return end
+        pos = newline + 1
+        if pos >= end or _ENTRY_START_RE.match(data, pos):
+            return pos
+
+
+def _entry_start_from(data, pos, end):
+    """Primera cabecera de entrada en pos o después."""
+    if pos <= 0:
+        return 0
+    while pos < end:
+        if _is_entry_start(data, pos):
+            return pos
+        newline = data.find(b"\n", pos, end)
+        if newline < 0:
+            return end
+        pos = newline + 1
+    return end
+
+
+def scan(data, log_filter, start=0, end=None):
+    """
+    Genera las entradas de data[start:end] que cumplen el filtro.
+
+    data puede ser bytes o un mmap; con un filtro literal solo se examinan
+    las entradas que contienen ese literal.
+    """
+    end = len(data) if end is None else end
+    needle = log_filter.needle()
+    pos = _entry_start_from(data, start, end)
+    while pos < end:
+        if needle:
+            hit = data.find(needle, pos, end)
+            if hit < 0:
+                return
+            entry_start = _entry_start_before(data, hit, pos)
+        else:
+            entry_start = pos
+        entry_end = _entry_end(data, entry_start, end)
+        entry = parse_entry(data[entry_start:entry_end])
+        if entry and log_filter.until and entry.timestamp > log_filter.until:
+            return  # El log está en orden cronológico
+        if entry and log_filter.matches(entry):
+            yield entry
+        pos = entry_end
+
+
+def _first_timestamp(data, start=0):
+    pos = _entry_start_from(data, start, len(data))
+    if pos >= len(data):
+        return None
+    return bytes(data[pos + 1:pos + 1 + TIMESTAMP_LEN]).decode("ascii", errors="replace")
+
+
+def _last_timestamp(data):
+    pos = _entry_start_before(data, max(0, len(data) - 1))
+    if pos >= len(data):
+        return None
+    return bytes(data[pos + 1:pos + 1 + TIMESTAMP_LEN]).decode("ascii", errors="replace")
+
+
+def _index_path(log_file):
+    directory, name = os.path.split(log_file)
+    return os.path.join(directory, f".{name}.idx")
+
+
+def _load_index(log_file):
+    try:
+        with open(_index_path(log_file), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"segments": {}, "live": None}
+
+
+def _save_index(log_file, index):
+    path = _index_path(log_file)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # El índice es opcional: sin él solo se lee de más
+
+
+def list_segments(log_file=None):
+    """Segmentos del log, del más antiguo (.N.gz) al activo."""
+    log_file = log_file or get_log_file()
+    directory, name = os.path.split(log_file)
+    rotated = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        names = []
+    pattern = re.compile(re.escape(name) + r"\.(\d+)\.gz$")
+    for candidate in names:
+        match = pattern.match(candidate)
+        if match:
+            rotated.append((int(match.group(1)), os.path.join(directory, candidate)))
+    segments = [path for _, path in sorted(rotated, reverse=True)]
+    if os.path.exists(log_file):
+        segments.append(log_file)
+    return segments
+
+
+def _segment_range(path, index):
+    """(primera, última) fecha de un segmento comprimido, usando el índice."""
+    stat = os.stat(path)
+    key = os.path.basename(path)
+    cached = index["segments"].get(key)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["first"], cached["last"], None
+    with gzip.open(path, "rb") as f:
+        data = f.read()
+    first, last = _first_timestamp(data), _last_timestamp(data)
+    index["segments"][key] = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "first": first,
+        "last": last,
+    }
+    return first, last, data
+
+
+def _live_checkpoints(data, index):
+    """
+    Puntos de control [fecha, offset] del log activo, ampliados de forma
+    incremental. Se rehacen si el archivo fue vaciado por una rotación.
+    """
+    live = index.get("live")
+    head = _first_timestamp(data)
+    if not live or live["size"] > len(data) or live["head"] != head:
+        live = {"size": 0, "head": head, "checkpoints": []}
+    checkpoints = live["checkpoints"]
+    pos = live["size"]
+    next_mark = checkpoints[-1][1] + INDEX_STEP if checkpoints else 0
+    while True:
+        pos = _entry_start_from(data, max(pos, next_mark), len(data))
+        if pos >= len(data):
+            break
+        timestamp = bytes(data[pos + 1:pos + 1 + TIMESTAMP_LEN]).decode("ascii", errors="replace")
+        checkpoints.append([timestamp, pos])
+        next_mark = pos + INDEX_STEP
+    # Solo cuentan como indexados los bytes de entradas completas.
+    live["size"] = data.rfind(b"\n") + 1
+    index["live"] = live
+    return checkpoints
+
+
+def _start_offset(checkpoints, since):
+    """Offset del último punto de control anterior a since."""
+    offset = 0
+    for timestamp, position in checkpoints:
+        if timestamp >= since:
+            break
+        offset = position
+    return offset
+
+
+def query_logs(log_filter, log_file=None):
+    """Genera las entradas que cumplen el filtro en orden cronológico."""
+    log_file = log_file or get_log_file()
+    index = _load_index(log_file)
+    try:
+        for path in list_segments(log_file):
+            if path.endswith(".gz"):
+                first, last, data = _segment_range(path, index)
+                if first is None:
+                    continue
+                if log_filter.since and last and last < log_filter.since:
+                    continue
+                if log_filter.until and first > log_filter.until:
+                    continue
+                if data is None:
+                    with gzip.open(path, "rb") as f:
+                        data = f.read()
+                yield from scan(data, log_filter)
+            else:
+                yield from _query_live(path, log_filter, index)
+    finally:
+        _save_index(log_file, index)
+
+
+def _query_live(path, log_filter, index):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            checkpoints = _live_checkpoints(data, index)
+            start = _start_offset(checkpoints, log_filter.since) if log_filter.since else 0
+            for entry in scan(data, log_filter, start):
+                yield entry
+
+
+def follow_logs(log_filter, log_file=None, interval=0.5):
+    """
+    Muestra las entradas nuevas que cumplen el filtro a medida que se
+    escriben (como 'tail -f'); termina con Ctrl+C.
+    """
+    log_file = log_file or get_log_file()
+    position = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+    pending = b""
+    while True:
+        try:
+            size = os.path.getsize(log_file)
+        except OSError:
+            size = 0
+        if size < position:
+            # El log se rotó (se vació en el sitio): seguir desde el principio.
+            position, pending = 0, b""
+        if size > position:
+            with open(log_file, "rb") as f:
+                f.seek(position)
+                chunk = f.read(size - position)
+            position = size
+            data = pending + chunk
+            # La última entrada puede seguir creciendo (varias líneas): se
+            # retiene hasta ver la cabecera siguiente o una pausa sin cambios.
+            last_line = data.rfind(b"\n", 0, max(0, len(data) - 1)) + 1
+            last_start = _entry_start_before(data, last_line)
+            complete, pending = data[:last_start], data[last_start:]
+            for entry in scan(complete, log_filter):
+                print_entry(entry)
+        elif pending.endswith(b"\n"):
+            for entry in scan(pending, log_filter):
+                print_entry(entry)
+            pending = b""
+        time.sleep(interval)
+
+
+def print_entry(entry):
+    """Imprime una entrada coloreando su nivel."""
+    color = _LEVEL_COLORS.get(entry.level, "")
+    reset = Colors.RESET if color else ""
+    print(f"{color}{entry.raw}{reset}", flush=True)
+
+
+def run_logs_command(levels=None, url=None, platform=None, since=None, until=None,
+                     limit=None, follow=False):
+    """Punto de entrada del subcomando 'tud logs'."""
+    try:
+        log_filter = LogFilter(
+            levels=levels,
+            url=url,
+            platform=platform,
+            since=parse_time(since),
+            until=parse_time(until),
+        )
+    except ValueError as e:
+        print(f"{Colors.RED}ERROR: {e}{Colors.RESET}")
+        return False
+
+    entries = query_logs(log_filter)
+    if limit:
+        entries = deque(entries, maxlen=limit)
+    count = 0
+    for entry in entries:
+        print_entry(entry)
+        count += 1
+    if not follow:
+        print(f"{Colors.CYAN}{count} entradas encontradas.{Colors.RESET}")
+        return True
+
+    try:
+        follow_logs(log_filter)
+    except KeyboardInterrupt:
+        print()
+    return True
@@ -1,28 +1,246 @@
-# (Sin cambios)
+import atexit
+import gzip
 import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
 
-from config.settings import get_log_file, get_logs_dir
+from config.config_manager import get_config_value
+from config.settings import get_log_file
 
 from .colors import Colors
 
+try:
+    import fcntl
+except ImportError:  # Plataformas sin flock: se confía en O_APPEND
+    fcntl = None
 
-def log_message(message, level="INFO", url=None, platform=None):
-    """Escribe un mensaje en el archivo de log."""
-    try:
-        log_file = get_log_file()
-        logs_dir = get_logs_dir()
+# Las líneas se encolan y un hilo en segundo plano las escribe por lotes: un
+# solo open/write/close por lote en lugar de uno por mensaje. Cada lote se
+# escribe con O_APPEND y bajo flock para que varios procesos (trabajos en
+# paralelo, otra instancia de tud) no intercalen líneas.
+#
+# Al superar 'log_max_bytes' el log se rota: su contenido pasa comprimido a
+# downloader.log.1.gz (los anteriores se desplazan hasta 'log_backup_count') y
+# el archivo se vacía en el sitio, bajo el mismo flock, para que los demás
+# procesos sigan escribiendo en él.
+#
+# Algunos sistemas de archivos (el almacenamiento compartido de Android, donde
+# vive el log por defecto) no admiten flock: ahí el lock es un archivo
+# downloader.log.lock creado con O_CREAT|O_EXCL. Si no se consigue a tiempo,
+# el lote se escribe igualmente confiando en O_APPEND y la rotación queda
+# para el siguiente lote.
+
+# Espera máxima antes de escribir un lote incompleto
+FLUSH_INTERVAL = 0.5
+# Líneas máximas por escritura
+MAX_BATCH = 512
+
+# Espera máxima por el archivo de lock y antigüedad a partir de la cual se
+# considera abandonado (proceso terminado mientras lo tenía)
+LOCKFILE_TIMEOUT = 2.0
+LOCKFILE_STALE = 30.0
+
+# Marca encolada por flush_logs para escribir el lote en curso sin esperar
+_FLUSH = object()
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_closed = False
+_known_dirs = set()
+
+
+def _truncate(message):
+    """Recorta mensajes enormes (p. ej. salida completa de yt-dlp) conservando
+    el principio y el final, donde suelen estar el comando y el error."""
+    limit = get_config_value("log_max_message_chars", 8000)
+    if not limit or len(message) <= limit:
+        return message
+    head = limit // 4
+    tail = limit - head
+    omitted = len(message) - head - tail
+    return f"{message[:head]} [... {omitted} caracteres omitidos ...] {message[-tail:]}"
+
+
+def _format_entry(message, level, url, platform):
+    message = _truncate(str(message))
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_entry = f"[{timestamp}] [{level.upper()}] {message}"
+    if platform:
+        log_entry += f" [Platform: {platform}]"
+    if url:
+        log_entry += f" [URL: {url}]"
+    return log_entry
+
+
+def _rotated_name(log_file, index):
+    return f"{log_file}.{index}.gz"
+
+
+def _rotate(fd, log_file):
+    """Comprime el log actual en .1.gz, desplaza los anteriores y lo vacía.
+    Debe llamarse con el lock del log tomado (flock o archivo de lock)."""
+    backup_count = get_config_value("log_backup_count", 5)
+    if backup_count <= 0:
+        os.ftruncate(fd, 0)
+        return
+    oldest = _rotated_name(log_file, backup_count)
+    if os.path.exists(oldest):
+        os.remove(oldest)
+    for index in range(backup_count - 1, 0, -1):
+        source = _rotated_name(log_file, index)
+        if os.path.exists(source):
+            os.replace(source, _rotated_name(log_file, index + 1))
+
+    tmp_name = f"{_rotated_name(log_file, 1)}.tmp"
+    with open(log_file, "rb") as src, gzip.open(tmp_name, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_name, _rotated_name(log_file, 1))
+    os.ftruncate(fd, 0)
+
+
+def _acquire_lockfile(log_file):
+    """
+    Lock de respaldo para sistemas de archivos sin flock.
+
+    Returns:
+        str: Ruta del archivo de lock (a borrar al terminar), o None si no se
+             consiguió antes de LOCKFILE_TIMEOUT
+    """
+    path = f"{log_file}.lock"
+    deadline = time.monotonic() + LOCKFILE_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            return path
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > LOCKFILE_STALE:
+                    os.remove(path)
+                    continue
+            except OSError:  # Liberado entre medias
+                continue
+        except OSError:
+            return None
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.01)
+
+
+def _append(entries):
+    """Añade las líneas al log en una sola escritura protegida por flock
+    (o por el archivo de lock si flock no está disponible)."""
+    log_file = get_log_file()
+    logs_dir = os.path.dirname(log_file)
+    if logs_dir not in _known_dirs:
         os.makedirs(logs_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        _known_dirs.add(logs_dir)
+
+    data = "".join(entry + "\n" for entry in entries).encode("utf-8")
+    fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    lockfile = None
+    try:
+        locked = False
+        if fcntl:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                locked = True
+            except OSError:  # ENOSYS/EOPNOTSUPP
+                pass
+        if not locked:
+            lockfile = _acquire_lockfile(log_file)
+            locked = lockfile is not None
+        max_bytes = get_config_value("log_max_bytes", 5 * 1024 * 1024)
+        size = os.fstat(fd).st_size
+        if locked and max_bytes and size and size + len(data) > max_bytes:
+            _rotate(fd, log_file)
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)  # Cerrar el descriptor libera también el flock
+        if lockfile:
+            try:
+                os.remove(lockfile)
+            except OSError:
+                pass
+
+
+def _writer_loop():
+    while True:
+        items = [_queue.get()]
+        try:
+            while len(items) < MAX_BATCH and items[-1] is not _FLUSH:
+                items.append(_queue.get(timeout=FLUSH_INTERVAL))
+        except queue.Empty:
+            pass
+        entries = [item for item in items if item is not _FLUSH]
+        try:
+            if entries:
+                _append(entries)
+        except Exception as e:
+            print(f"{Colors.RED}Error al escribir en el log: {e}{Colors.RESET}")
+        finally:
+            for _ in items:
+                _queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=_writer_loop, name="tud-log-writer", daemon=True
+            )
+            _writer.start()
+
+
+def _reset_after_fork():
+    # El hilo escritor no sobrevive a un fork, y los hijos de multiprocessing
+    # terminan con os._exit sin ejecutar atexit: el hijo escribe directamente.
+    global _queue, _writer, _writer_lock, _closed
+    _queue = queue.Queue()
+    _writer = None
+    _writer_lock = threading.Lock()
+    _closed = True
 
-        log_entry = f"[{timestamp}] [{level.upper()}] {message}"
-        if platform:
-            log_entry += f" [Platform: {platform}]"
-        if url:
-            log_entry += f" [URL: {url}]"
 
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(log_entry + "\n")
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
+
+def log_message(message, level="INFO", url=None, platform=None):
+    """Escribe un mensaje en el archivo de log (de forma asíncrona)."""
+    try:
+        log_entry = _format_entry(message, level, url, platform)
+        if _closed:
+            # Después del cierre (p. ej. desde otros manejadores atexit) o en
+            # un proceso hijo se escribe directamente.
+            _append([log_entry])
+            return
+        _ensure_writer()
+        _queue.put(log_entry)
     except Exception as e:
         print(f"{Colors.RED}Error al escribir en el log: {e}{Colors.RESET}")
+
+
+def flush_logs():
+    """Bloquea hasta que todos los mensajes encolados estén escritos en disco."""
+    if _writer is not None and _writer.is_alive():
+        _queue.put(_FLUSH)
+        _queue.join()
+
+
+def _shutdown():
+    global _closed
+    flush_logs()
+    _closed = True
+
+
+atexit.register(_shutdown)
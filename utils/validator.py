@@ -2,6 +2,7 @@ import subprocess
 import sys
 
 from .colors import Colors
+from .dependency_cache import invalidate, probe
 
 
 def check_dependencies():
@@ -12,20 +13,16 @@ def check_dependencies():
     """
     print(f"{Colors.CYAN}[*] Verificando dependencias...{Colors.RESET}")
     missing = []
-    try:
-        subprocess.run(
-            ["yt-dlp", "--version"], capture_output=True, check=True, text=True
-        )
-        print(f"{Colors.GREEN}[+] yt-dlp encontrado.{Colors.RESET}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    yt_dlp = probe("yt-dlp")
+    if yt_dlp["ok"]:
+        print(f"{Colors.GREEN}[+] yt-dlp encontrado ({yt_dlp['version']}).{Colors.RESET}")
+    else:
         missing.append("yt-dlp (instalar con: pip install -r " "requirements.txt)")
 
-    try:
-        subprocess.run(
-            ["ffmpeg", "-version"], capture_output=True, check=True, text=True
-        )
-        print(f"{Colors.GREEN}[+] ffmpeg encontrado.{Colors.RESET}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    ffmpeg = probe("ffmpeg")
+    if ffmpeg["ok"]:
+        print(f"{Colors.GREEN}[+] ffmpeg encontrado ({ffmpeg['version']}).{Colors.RESET}")
+    else:
         missing.append("ffmpeg (instalar con: pkg install ffmpeg)")
 
     if missing:
@@ -53,6 +50,7 @@ def update_yt_dlp():
         subprocess.run(
             [sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"], check=True
         )
+        invalidate("yt-dlp")
         print(f"{Colors.GREEN}[+] yt-dlp actualizado exitosamente.{Colors.RESET}")
     except (subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"{Colors.RED}ERROR: No se pudo actualizar yt-dlp. {e}{Colors.RESET}")